@@ -7,6 +7,9 @@ from alembic import context
 from app.core.config import settings
 from app.db.users import User
 from app.db.credentials import Credentials
+from app.db.rate_limit import RateLimitBucket
+from app.db.tokens import RevokedToken, RefreshToken
+from app.db.health import VaultHealth
 from sqlmodel import SQLModel
 
 
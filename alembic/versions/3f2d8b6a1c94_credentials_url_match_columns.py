@@ -0,0 +1,217 @@
+"""credentials url match columns
+
+Revision ID: 3f2d8b6a1c94
+Revises: 9a6f3c1e7b20
+Create Date: 2026-10-19 15:04:37.552190
+
+"""
+
+import ipaddress
+from typing import Sequence, Union
+from urllib.parse import urlsplit
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2d8b6a1c94"
+down_revision: Union[str, None] = "9a6f3c1e7b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Frozen copy of app.core.urls as of this revision, so the backfill keeps
+# producing the same values whatever the application code becomes
+MULTI_LABEL_SUFFIXES = frozenset(
+    {
+        # Country code second level domains
+        "ac.uk", "co.uk", "gov.uk", "ltd.uk", "me.uk", "net.uk", "org.uk",
+        "plc.uk", "sch.uk", "nhs.uk", "police.uk",
+        "com.au", "net.au", "org.au", "edu.au", "gov.au", "asn.au", "id.au",
+        "co.nz", "net.nz", "org.nz", "govt.nz", "ac.nz", "school.nz",
+        "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp", "ed.jp", "gr.jp",
+        "co.kr", "ne.kr", "or.kr", "ac.kr", "go.kr", "re.kr",
+        "com.br", "net.br", "org.br", "gov.br", "edu.br",
+        "com.cn", "net.cn", "org.cn", "gov.cn", "edu.cn",
+        "com.hk", "net.hk", "org.hk", "gov.hk", "edu.hk",
+        "com.tw", "net.tw", "org.tw", "gov.tw", "edu.tw",
+        "com.sg", "net.sg", "org.sg", "gov.sg", "edu.sg",
+        "com.my", "net.my", "org.my", "gov.my", "edu.my",
+        "co.in", "net.in", "org.in", "gov.in", "ac.in", "firm.in", "gen.in",
+        "co.id", "or.id", "ac.id", "go.id", "web.id",
+        "co.il", "org.il", "net.il", "ac.il", "gov.il",
+        "co.za", "org.za", "net.za", "gov.za", "ac.za", "web.za",
+        "com.mx", "net.mx", "org.mx", "gob.mx", "edu.mx",
+        "com.ar", "net.ar", "org.ar", "gob.ar", "edu.ar",
+        "com.tr", "net.tr", "org.tr", "gov.tr", "edu.tr", "gen.tr",
+        "com.ua", "net.ua", "org.ua", "gov.ua", "edu.ua", "in.ua",
+        "com.az", "net.az", "org.az", "gov.az", "edu.az",
+        "com.pl", "net.pl", "org.pl", "gov.pl",
+        "com.ru", "net.ru", "org.ru",
+        "com.vn", "net.vn", "org.vn", "gov.vn", "edu.vn",
+        "com.ph", "net.ph", "org.ph", "gov.ph", "edu.ph",
+        "com.pk", "net.pk", "org.pk", "gov.pk", "edu.pk",
+        "com.sa", "net.sa", "org.sa", "gov.sa", "edu.sa",
+        "com.eg", "net.eg", "org.eg", "gov.eg", "edu.eg",
+        "com.ng", "net.ng", "org.ng", "gov.ng", "edu.ng",
+        "co.ke", "or.ke", "ne.ke", "go.ke", "ac.ke",
+        "co.th", "in.th", "or.th", "go.th", "ac.th",
+        # Hosting platforms
+        "github.io", "gitlab.io", "herokuapp.com", "appspot.com",
+        "blogspot.com", "azurewebsites.net", "cloudfront.net",
+        "netlify.app", "vercel.app", "pages.dev", "workers.dev",
+        "web.app", "firebaseapp.com", "onrender.com", "fly.dev",
+        "s3.amazonaws.com", "elasticbeanstalk.com",
+    }
+)  # fmt: skip
+
+
+def normalize_host(url: str | None) -> str | None:
+    """Return the lowercase ASCII host name of ``url``, or None if it has none.
+
+    Scheme-less values such as "example.com/login" are accepted, ports,
+    credentials and a trailing dot are dropped and international domain
+    names are converted to punycode.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if "://" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host.lower() or None
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def registrable_domain(host: str) -> str:
+    """Return the eTLD+1 of ``host``; IP addresses are returned unchanged."""
+    if is_ip_address(host):
+        return host
+    labels = host.split(".")
+    for i in range(len(labels)):
+        if ".".join(labels[i:]) in MULTI_LABEL_SUFFIXES:
+            return ".".join(labels[max(i - 1, 0) :])
+    return ".".join(labels[-2:])
+
+
+def reverse_host(host: str) -> str:
+    """Reverse the labels of ``host``: login.example.com -> com.example.login.
+
+    The trailing dot makes a parent domain a string prefix of its subdomains
+    only, com.example. is a prefix of com.example.login. but not of
+    com.examples.
+    """
+    if is_ip_address(host):
+        return host + "."
+    return ".".join(reversed(host.split("."))) + "."
+
+
+def url_match_columns(url: str | None) -> dict[str, str | None]:
+    """Values of the credential columns used for URL matching."""
+    host = normalize_host(url)
+    if not host:
+        return {"host_reversed": None, "registrable_domain": None}
+    return {
+        "host_reversed": reverse_host(host),
+        "registrable_domain": registrable_domain(host),
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column(
+        "credentials",
+        sa.Column(
+            "host_reversed", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+    )
+    op.add_column(
+        "credentials",
+        sa.Column(
+            "registrable_domain",
+            sqlmodel.sql.sqltypes.AutoString(length=255),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_credentials_user_id_registrable_domain",
+        "credentials",
+        ["user_id", "registrable_domain"],
+        unique=False,
+    )
+    # ### end Alembic commands ###
+
+    # Backfill the derived columns of existing credentials
+    credentials = sa.table(
+        "credentials",
+        sa.column("id", sa.Uuid()),
+        sa.column("url", sa.String()),
+        sa.column("host_reversed", sa.String()),
+        sa.column("registrable_domain", sa.String()),
+    )
+    update = (
+        credentials.update()
+        .where(credentials.c.id == sa.bindparam("b_id"))
+        .values(
+            host_reversed=sa.bindparam("b_host_reversed"),
+            registrable_domain=sa.bindparam("b_registrable_domain"),
+        )
+    )
+    connection = op.get_bind()
+    last_id = None
+    while True:
+        query = (
+            sa.select(credentials.c.id, credentials.c.url)
+            .where(credentials.c.url.is_not(None))
+            .order_by(credentials.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(credentials.c.id > last_id)
+        rows = connection.execute(query).all()
+        if not rows:
+            break
+        values = []
+        for id, url in rows:
+            columns = url_match_columns(url)
+            if columns["host_reversed"]:
+                values.append(
+                    {
+                        "b_id": id,
+                        "b_host_reversed": columns["host_reversed"],
+                        "b_registrable_domain": columns["registrable_domain"],
+                    }
+                )
+        if values:
+            connection.execute(update, values)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index("ix_credentials_user_id_registrable_domain", table_name="credentials")
+    op.drop_column("credentials", "registrable_domain")
+    op.drop_column("credentials", "host_reversed")
+    # ### end Alembic commands ###
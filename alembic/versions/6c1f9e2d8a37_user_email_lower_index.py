@@ -0,0 +1,36 @@
+"""user email lower index
+
+Revision ID: 6c1f9e2d8a37
+Revises: 2a7d5c9e4b16
+Create Date: 2026-10-19 18:52:17.903145
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6c1f9e2d8a37"
+down_revision: Union[str, None] = "2a7d5c9e4b16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fails if emails differing only by case already exist, those accounts
+    # have to be merged or renamed first
+    op.create_index(
+        "ix_user_email_lower", "user", [sa.text("lower(email)")], unique=True
+    )
+    op.drop_index(op.f("ix_user_email"), table_name="user")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f("ix_user_email"), "user", ["email"], unique=True)
+    op.drop_index("ix_user_email_lower", table_name="user")
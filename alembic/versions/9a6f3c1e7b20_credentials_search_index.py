@@ -0,0 +1,36 @@
+"""credentials search index
+
+Revision ID: 9a6f3c1e7b20
+Revises: 4d9b7e2a6c15
+Create Date: 2026-10-19 14:21:09.318274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9a6f3c1e7b20"
+down_revision: Union[str, None] = "4d9b7e2a6c15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.execute(
+        "CREATE INDEX ix_credentials_search ON credentials USING gin "
+        "(user_id, (coalesce(title, '') || ' ' || coalesce(url, '') || ' ' "
+        "|| username) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_credentials_search", table_name="credentials")
@@ -1,15 +1,23 @@
+import math
+import time
 from sqlmodel import Session
 from collections.abc import Generator
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import JWTError
 from pydantic import ValidationError
 from typing import Annotated
 from app.core.config import settings
+from app.core.cache import TTLCache
 from app.core.db import engine
+from app.core.rate_limit import RateLimit, rate_limiter
+from app.core.tracing import span
 from app.db.users import User
+from app.crud import users as crud_users
+from app.crud import tokens as crud_tokens
 from app.schemas.users import TokenPayload
+from app.utils import OAuth2RequestWithOTP
 
 
 reusable_oath2 = OAuth2PasswordBearer(
@@ -18,7 +26,9 @@ reusable_oath2 = OAuth2PasswordBearer(
 
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    # Objects stay loaded after commit, responses are built from them without
+    # another round trip. The session only lives for one request.
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
 
@@ -26,24 +36,96 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oath2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    """Get current user from token.
+# Maps a raw access token to its validated payload. Entries never outlive the
+# token's exp claim, so an expired token is decoded again and rejected.
+token_payloads: TTLCache[str, TokenPayload] = TTLCache(
+    maxsize=settings.TOKEN_PAYLOAD_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def decode_token_payload(token: str) -> TokenPayload:
+    """Verify the signature and expiry of an access token and parse its claims.
 
     Keyword arguments:
-    session -- SQLAlchemy session
     token -- JWT token
     """
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+
+
+def get_token_payload(token: TokenDep) -> TokenPayload:
+    """Get the validated payload of the access token, decoding it at most once
+    per worker while it is valid.
+
+    Keyword arguments:
+    token -- JWT token
+    """
+    token_data = token_payloads.get(token)
+    if token_data is None:
+        token_data = decode_token_payload(token)
+        token_payloads.set(token, token_data, ttl=token_data.exp - time.time())
+    return token_data
+
+
+TokenPayloadDep = Annotated[TokenPayload, Depends(get_token_payload)]
+
+
+def get_current_claims(
+    session: SessionDep, token_data: TokenPayloadDep
+) -> TokenPayload:
+    """Get the claims of the current user without loading the user row.
+
+    The token is trusted as long as it was not revoked and its version matches
+    the user's current token version, which is bumped whenever the password,
+    activation or privileges change and is served from a per-worker cache.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    token_data -- Validated token payload
+    """
+    with span("get_current_claims"):
+        token_version = crud_users.get_token_version(
+            session=session, user_id=token_data.sub
+        )
+        if token_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        if token_version != token_data.token_version or crud_tokens.is_token_revoked(
+            session=session, jti=token_data.jti
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+    if not token_data.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
+        )
+    return token_data
+
+
+CurrentClaims = Annotated[TokenPayload, Depends(get_current_claims)]
+
+
+def get_current_user(session: SessionDep, claims: CurrentClaims) -> User:
+    """Get current user from token.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    claims -- Claims of the current user
+    """
+    with span("get_current_user"):
+        user = session.get(User, claims.sub)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -58,18 +140,90 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
-    """Get current superuser.
+def get_current_active_superuser(claims: CurrentClaims) -> TokenPayload:
+    """Get the claims of the current superuser.
 
     Keyword arguments:
-    current_user -- Current user
+    claims -- Claims of the current user
     """
-    if not current_user.is_superuser:
+    if not claims.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges",
         )
-    return current_user
+    return claims
+
+
+CurrentSuperUser = Annotated[TokenPayload, Depends(get_current_active_superuser)]
+
+
+def enforce_rate_limits(
+    scope: str,
+    request: Request,
+    email: str,
+    ip_limit: RateLimit,
+    email_limit: RateLimit,
+) -> None:
+    """Reject the request with 429 when the client IP or the target email has
+    run out of tokens. The IP bucket is checked first so a single client
+    spraying many emails is stopped without touching the email buckets.
+
+    Keyword arguments:
+    scope -- name of the protected operation, used to namespace buckets
+    request -- incoming request, used to read the client IP
+    email -- email address targeted by the request
+    ip_limit -- bucket parameters applied per client IP
+    email_limit -- bucket parameters applied per target email
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = rate_limiter.check(
+        scope,
+        [
+            (f"ip:{client_ip}", ip_limit),
+            (f"email:{email.strip().lower()}", email_limit),
+        ],
+    )
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
 
 
-CurrentSuperUser = Annotated[User, Depends(get_current_active_superuser)]
+def login_rate_limit(
+    request: Request, form_data: Annotated[OAuth2RequestWithOTP, Depends()]
+) -> None:
+    """Throttle login attempts before any password hash is verified."""
+    enforce_rate_limits(
+        "login",
+        request,
+        form_data.username,
+        ip_limit=RateLimit(
+            capacity=settings.LOGIN_RATE_LIMIT_IP_CAPACITY,
+            per_minute=settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE,
+        ),
+        email_limit=RateLimit(
+            capacity=settings.LOGIN_RATE_LIMIT_EMAIL_CAPACITY,
+            per_minute=settings.LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE,
+        ),
+    )
+
+
+def password_recovery_rate_limit(request: Request, email: str) -> None:
+    """Throttle password recovery requests before an email is rendered."""
+    enforce_rate_limits(
+        "password-recovery",
+        request,
+        email,
+        ip_limit=RateLimit(
+            capacity=settings.PASSWORD_RECOVERY_RATE_LIMIT_IP_CAPACITY,
+            per_minute=settings.PASSWORD_RECOVERY_RATE_LIMIT_IP_PER_MINUTE,
+        ),
+        email_limit=RateLimit(
+            capacity=settings.PASSWORD_RECOVERY_RATE_LIMIT_EMAIL_CAPACITY,
+            per_minute=settings.PASSWORD_RECOVERY_RATE_LIMIT_EMAIL_PER_MINUTE,
+        ),
+    )
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException
-from typing import Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import Annotated, Any
 from sqlmodel import select, func
 from app.api.dependencies import SessionDep
 from app.db.credentials import (
@@ -8,10 +8,16 @@ from app.db.credentials import (
     CredentialsAdminUpdate,
     Credentials,
     CredentialAdminDetail,
+    CredentialAdminSearchResult,
+    CredentialsAdminSearchPublic,
 )
 from app.schemas.credentials import Password
 from app.schemas.users import Message
 from app.crud import credentials as crud_credentials
+from app.crud import health as crud_health
+from app.db.health import VaultHealthPublic, VaultHealthAdminPublic
+from app.db.users import User
+from app.utils import decode_search_cursor, encode_search_cursor
 from uuid import UUID
 
 router = APIRouter(prefix="/credentials", tags=["admin:credentials"])
@@ -40,6 +46,55 @@ def read_credentials(
     return CredentialsPublic(count=count, data=credentials)
 
 
+@router.get("/health", response_model=VaultHealthAdminPublic)
+def read_vault_health_summary(session: SessionDep) -> Any:
+    """Retrieve the health counters summed over all vaults."""
+
+    return crud_health.get_vault_health_summary(session=session)
+
+
+@router.get("/health/{user_id}", response_model=VaultHealthPublic)
+def read_vault_health(session: SessionDep, user_id: UUID) -> Any:
+    """Retrieve the health counters of a user's vault."""
+
+    return crud_health.get_vault_health(session=session, user_id=user_id)
+
+
+@router.get("/search", response_model=CredentialsAdminSearchPublic)
+def search_credentials(
+    session: SessionDep,
+    q: Annotated[str, Query(min_length=3, max_length=255)],
+    user_id: UUID = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: str | None = None,
+) -> Any:
+    """Search credentials of all users, or of user_id if provided."""
+
+    after = None
+    if cursor:
+        after = decode_search_cursor(cursor)
+        if not after:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    results = crud_credentials.search_credentials(
+        session=session, query=q, user_id=user_id, limit=limit, after=after
+    )
+    next_cursor = None
+    if len(results) == limit:
+        credential, rank = results[-1]
+        next_cursor = encode_search_cursor(rank=rank, id=credential.id)
+
+    return CredentialsAdminSearchPublic(
+        data=[
+            CredentialAdminSearchResult.model_validate(
+                credential, update={"rank": rank}
+            )
+            for credential, rank in results
+        ],
+        next_cursor=next_cursor,
+    )
+
+
 @router.get("/{credential_id}", response_model=CredentialAdminDetail)
 def read_credential(session: SessionDep, credential_id: UUID) -> Any:
     """Retrieve a specific credential by ID."""
@@ -77,18 +132,14 @@ def update_credential(
 ) -> Any:
     """Update an existing credential for user_id."""
 
-    db_credential = crud_credentials.get_credentials_by_id(
-        session=session, credential_id=credential_id
-    )
-
-    if not db_credential:
-        raise HTTPException(status_code=404, detail="Credential not found")
+    if credential_in.user_id and not session.get(User, credential_in.user_id):
+        raise HTTPException(status_code=404, detail="User not found")
 
     credential = crud_credentials.update_credentials(
-        session=session, db_credentials=db_credential, credentials_in=credential_in
+        session=session, credential_id=credential_id, credentials_in=credential_in
     )
     if not credential:
-        raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="Credential not found")
 
     return credential
 
@@ -97,14 +148,11 @@ def update_credential(
 def delete_credential(session: SessionDep, credential_id: UUID) -> Any:
     """Delete a specific credential."""
 
-    db_credential = crud_credentials.get_credentials_by_id(
+    deleted = crud_credentials.delete_credentials(
         session=session, credential_id=credential_id
     )
 
-    if not db_credential:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Credential not found")
 
-    session.delete(db_credential)
-    session.commit()
-
     return Message(message="Credential deleted successfully")
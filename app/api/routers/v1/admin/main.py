@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends
-from app.api.routers.v1.admin import users, credentials
+from app.api.routers.v1.admin import users, credentials, stats, profiles
 from app.api.dependencies import get_current_active_superuser
 
 
@@ -10,3 +10,5 @@ admin_router = APIRouter(
 
 admin_router.include_router(users.router)
 admin_router.include_router(credentials.router)
+admin_router.include_router(stats.router)
+admin_router.include_router(profiles.router)
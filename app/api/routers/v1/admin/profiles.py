@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from typing import Any
+from app.core.profiling import get_profile, list_profiles
+from app.schemas.admin import ProfileInfo, ProfilesPublic
+
+
+router = APIRouter(prefix="/profiles", tags=["admin:profiles"])
+
+
+@router.get("/", response_model=ProfilesPublic)
+def read_profiles(skip: int = 0, limit: int = 100) -> Any:
+    """Retrieve the request profiles saved by this worker's host, newest first."""
+    profiles = list_profiles()
+    data = []
+    for path, stat in profiles[skip : skip + limit]:
+        data.append(
+            ProfileInfo(
+                name=path.name,
+                size=stat.st_size,
+                created_at=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            )
+        )
+    return ProfilesPublic(data=data, count=len(profiles))
+
+
+@router.get("/{name}", response_class=FileResponse)
+def download_profile(name: str) -> Any:
+    """Download a profile as collapsed stacks, for flamegraph.pl or speedscope."""
+    path = get_profile(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from typing import Any
+from app.api.dependencies import token_payloads
+from app.core.rate_limit import rate_limiter
+from app.core.slow_queries import summarize_slow_queries
+from app.crud.users import token_versions
+from app.schemas.admin import CacheStats, RateLimitCounters, SlowQuery
+
+
+router = APIRouter(prefix="/stats", tags=["admin:stats"])
+
+
+@router.get("/rate-limits", response_model=dict[str, RateLimitCounters])
+def read_rate_limit_stats() -> Any:
+    """Retrieve allowed/rejected counters per rate limit scope for this worker."""
+    return rate_limiter.stats()
+
+
+@router.get("/caches", response_model=dict[str, CacheStats])
+def read_cache_stats() -> Any:
+    """Retrieve hit/miss counters of the authentication caches of this worker."""
+    return {
+        "token_payloads": token_payloads.stats(),
+        "token_versions": token_versions.stats(),
+    }
+
+
+@router.get("/slow-queries", response_model=list[SlowQuery])
+def read_slow_queries(limit: int = 20) -> Any:
+    """Retrieve the statements of the slow query log that took the most time."""
+    return summarize_slow_queries(limit=limit)
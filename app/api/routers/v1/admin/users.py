@@ -2,12 +2,20 @@ from fastapi import APIRouter, Depends, HTTPException, Response
 from typing import Any
 from sqlmodel import select, func
 import pyotp
-from app.db.users import UsersPublic, User, UserCreate, UserUpdate, AdminPublic
+from app.db.users import (
+    UsersPublic,
+    User,
+    UserCreate,
+    UserUpdate,
+    AdminPublic,
+    UserDeletionStatus,
+    UserDeletionsPublic,
+)
 from app.schemas.users import Message
 from app.api.dependencies import SessionDep, CurrentSuperUser
 from app.crud import users as crud_users
 from app.schemas.admin import ChangePassword
-from app.core.security import get_password_hash
+from app.core.breach import is_breached_password
 from app.core.config import settings
 from app.crud.base import save_to_db
 from uuid import UUID
@@ -29,6 +37,22 @@ def read_users(*, session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
     return UsersPublic(data=users, count=count)
 
 
+@router.get("/deletions", response_model=UserDeletionsPublic)
+def read_pending_deletions(*, session: SessionDep) -> Any:
+    """Retrieve users waiting to be purged and their remaining credentials"""
+
+    pending = crud_users.get_pending_deletions(session=session)
+    return UserDeletionsPublic(
+        data=[
+            UserDeletionStatus.model_validate(
+                user, update={"remaining_credentials": remaining}
+            )
+            for user, remaining in pending
+        ],
+        count=len(pending),
+    )
+
+
 @router.get("/{user_id}", response_model=AdminPublic)
 def read_user(*, session: SessionDep, user_id: UUID) -> Any:
     """Read user based on user_id"""
@@ -44,16 +68,18 @@ def read_user(*, session: SessionDep, user_id: UUID) -> Any:
 def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     """Create New Users"""
 
-    user = crud_users.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    if is_breached_password(user_in.password):
         raise HTTPException(
             status_code=400,
-            detail="The user with this email already exists in the system.",
+            detail={"password": "Password has appeared in a data breach"},
         )
-
     user = crud_users.create_user(session=session, user_create=user_in)
+    if not user:
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists in the system.",
+        )
 
-    save_to_db(session=session, instance=user, refresh=True)
     return user
 
 
@@ -72,7 +98,7 @@ def enable_2fa(session: SessionDep, user_id: UUID) -> Any:
     if not user.otp_secret:
         user.otp_secret = pyotp.random_base32()
     user.is_otp = True
-    save_to_db(session=session, instance=user, refresh=True)
+    save_to_db(session=session, instance=user)
 
     res = crud_users.create_totp_qr(user=user, issuer_name=settings.PROJECT_NAME)
     return Response(res, media_type="image/png")
@@ -109,6 +135,10 @@ def update_user(*, session: SessionDep, user_id: UUID, user_in: UserUpdate) -> A
                 status_code=409,
                 detail="The user with this email already exists in the system",
             )
+    if user_in.is_active and user.deletion_requested_at:
+        raise HTTPException(
+            status_code=409, detail="The user is scheduled for deletion"
+        )
     user = crud_users.update_user(session=session, db_user=user, user_in=user_in)
 
     return user
@@ -128,13 +158,19 @@ def change_password(
         raise HTTPException(
             status_code=404, detail="The user can't exists in the system."
         )
-    if user.id == current_superuser.id:
+    if user.id == current_superuser.sub:
         raise HTTPException(
             status_code=403, detail="Use the personal password-change endpoint."
         )
+    if is_breached_password(payload.new_password):
+        raise HTTPException(
+            status_code=400,
+            detail={"new_password": "Password has appeared in a data breach"},
+        )
 
-    user.hashed_password = get_password_hash(payload.new_password)
-    save_to_db(session=session, instance=user)
+    crud_users.update_password(
+        session=session, db_user=user, password=payload.new_password
+    )
 
     return Message(message="User password successfully changed.")
 
@@ -153,7 +189,6 @@ def delete_user(*, session: SessionDep, user_id: UUID) -> Any:
             status_code=403, detail="You can not delete superuser account"
         )
 
-    session.delete(user)
-    session.commit()
+    crud_users.request_user_deletion(session=session, db_user=user)
 
-    return Message(message="User deleted successfully.")
+    return Message(message="User scheduled for deletion.")
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from typing import Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import Annotated, Any
 from sqlmodel import select, func
 from app.api.dependencies import (
     SessionDep,
-    CurrentUser,
+    CurrentClaims,
 )
 from app.db.credentials import (
     CredentialsCreate,
@@ -12,10 +12,20 @@ from app.db.credentials import (
     Credentials,
     CredentialDetail,
     CredentialsAdminUpdate,
+    CredentialSearchResult,
+    CredentialsSearchPublic,
+    CredentialMatch,
+    CredentialsMatchPublic,
+    CredentialReuseGroup,
+    CredentialsReusePublic,
 )
 from app.schemas.credentials import Password
 from app.schemas.users import Message
 from app.crud import credentials as crud_credentials
+from app.crud import health as crud_health
+from app.db.health import VaultHealthPublic
+from app.core.urls import normalize_host
+from app.utils import decode_search_cursor, encode_search_cursor
 from uuid import UUID
 
 router = APIRouter(prefix="/credentials", tags=["credentials"])
@@ -23,16 +33,16 @@ router = APIRouter(prefix="/credentials", tags=["credentials"])
 
 @router.get("/", response_model=CredentialsPublic)
 def read_credentials(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep, claims: CurrentClaims, skip: int = 0, limit: int = 100
 ) -> Any:
     """Retrieve a list of credentials for the current user."""
 
-    count_statement = select(func.count()).where(Credentials.user_id == current_user.id)
+    count_statement = select(func.count()).where(Credentials.user_id == claims.sub)
     count = session.exec(count_statement).one()
 
     statement = (
         select(Credentials)
-        .where(Credentials.user_id == current_user.id)
+        .where(Credentials.user_id == claims.sub)
         .offset(skip)
         .limit(limit)
     )
@@ -40,14 +50,90 @@ def read_credentials(
     return CredentialsPublic(count=count, data=credentials)
 
 
+@router.get("/search", response_model=CredentialsSearchPublic)
+def search_credentials(
+    session: SessionDep,
+    claims: CurrentClaims,
+    q: Annotated[str, Query(min_length=3, max_length=255)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: str | None = None,
+) -> Any:
+    """Search the current user's credentials by title, url and username."""
+
+    after = None
+    if cursor:
+        after = decode_search_cursor(cursor)
+        if not after:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    results = crud_credentials.search_credentials(
+        session=session, query=q, user_id=claims.sub, limit=limit, after=after
+    )
+    next_cursor = None
+    if len(results) == limit:
+        credential, rank = results[-1]
+        next_cursor = encode_search_cursor(rank=rank, id=credential.id)
+
+    return CredentialsSearchPublic(
+        data=[
+            CredentialSearchResult.model_validate(credential, update={"rank": rank})
+            for credential, rank in results
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/match", response_model=CredentialsMatchPublic)
+def match_credentials(
+    session: SessionDep,
+    claims: CurrentClaims,
+    url: Annotated[str, Query(max_length=2048)],
+) -> Any:
+    """Retrieve the current user's credentials matching a site URL for autofill."""
+
+    host = normalize_host(url)
+    if not host:
+        raise HTTPException(status_code=400, detail="Invalid URL")
+
+    matches = crud_credentials.match_credentials(
+        session=session, host=host, user_id=claims.sub
+    )
+    return CredentialsMatchPublic(
+        data=[
+            CredentialMatch.model_validate(credential, update={"match": match})
+            for credential, match in matches
+        ]
+    )
+
+
+@router.get("/health", response_model=VaultHealthPublic)
+def read_vault_health(session: SessionDep, claims: CurrentClaims) -> Any:
+    """Retrieve the counts of weak, reused, old and breached credentials."""
+
+    return crud_health.get_vault_health(session=session, user_id=claims.sub)
+
+
+@router.get("/reuse", response_model=CredentialsReusePublic)
+def read_reused_credentials(session: SessionDep, claims: CurrentClaims) -> Any:
+    """Retrieve groups of the current user's credentials sharing a password."""
+
+    groups = crud_credentials.get_reused_credentials(
+        session=session, user_id=claims.sub
+    )
+    return CredentialsReusePublic(
+        count=len(groups),
+        data=[CredentialReuseGroup(count=len(group), data=group) for group in groups],
+    )
+
+
 @router.get("/{credential_id}", response_model=CredentialDetail)
 def read_credential(
-    session: SessionDep, credential_id: UUID, current_user: CurrentUser
+    session: SessionDep, credential_id: UUID, claims: CurrentClaims
 ) -> Any:
     """Retrieve a specific credential by ID for the current user."""
 
     credential = crud_credentials.get_credentials_by_id(
-        session=session, user_id=current_user.id, credential_id=credential_id
+        session=session, user_id=claims.sub, credential_id=credential_id
     )
 
     if not credential:
@@ -58,13 +144,13 @@ def read_credential(
 
 @router.post("/", response_model=CredentialDetail, status_code=201)
 def create_credential(
-    session: SessionDep, credentials_in: CredentialsCreate, current_user: CurrentUser
+    session: SessionDep, credentials_in: CredentialsCreate, claims: CurrentClaims
 ) -> Any:
     """Create new credentials for the current user."""
 
     credentials_data = CredentialsCreate.model_validate(credentials_in)
     credentials = crud_credentials.create_credentials(
-        session=session, credentials_create=credentials_data, user_id=current_user.id
+        session=session, credentials_create=credentials_data, user_id=claims.sub
     )
 
     return credentials
@@ -75,33 +161,32 @@ def update_credential(
     session: SessionDep,
     credential_id: UUID,
     credential_in: CredentialsUpdate,
-    current_user: CurrentUser,
+    claims: CurrentClaims,
 ) -> Any:
     """Update an existing credential for the current user."""
 
-    db_credential = crud_credentials.get_credentials_by_id(
-        session=session, user_id=current_user.id, credential_id=credential_id
-    )
-
-    if not db_credential:
-        raise HTTPException(status_code=404, detail="Credential not found")
-
     credential_update = CredentialsAdminUpdate.model_validate(credential_in)
     credential = crud_credentials.update_credentials(
-        session=session, db_credentials=db_credential, credentials_in=credential_update
+        session=session,
+        credential_id=credential_id,
+        credentials_in=credential_update,
+        user_id=claims.sub,
     )
 
+    if not credential:
+        raise HTTPException(status_code=404, detail="Credential not found")
+
     return credential
 
 
 @router.get("/{credential_id}/show-password", response_model=Password)
 def show_password(
-    session: SessionDep, credential_id: UUID, current_user: CurrentUser
+    session: SessionDep, credential_id: UUID, claims: CurrentClaims
 ) -> Any:
     """Retrieve the password of a specific credential for the current user."""
 
     credential_password = crud_credentials.get_credential_password(
-        session=session, user_id=current_user.id, credential_id=credential_id
+        session=session, user_id=claims.sub, credential_id=credential_id
     )
 
     if not credential_password:
@@ -112,18 +197,15 @@ def show_password(
 
 @router.delete("/{credential_id}", response_model=Message)
 def delete_credential(
-    session: SessionDep, credential_id: UUID, current_user: CurrentUser
+    session: SessionDep, credential_id: UUID, claims: CurrentClaims
 ) -> Any:
     """Delete a specific credential for the current user."""
 
-    db_credential = crud_credentials.get_credentials_by_id(
-        session=session, user_id=current_user.id, credential_id=credential_id
+    deleted = crud_credentials.delete_credentials(
+        session=session, credential_id=credential_id, user_id=claims.sub
     )
 
-    if not db_credential:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Credential not found")
 
-    session.delete(db_credential)
-    session.commit()
-
     return Message(message="Credential deleted successfully")
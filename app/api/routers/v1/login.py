@@ -1,20 +1,34 @@
-from app.api.dependencies import SessionDep
+from app.api.dependencies import (
+    SessionDep,
+    CurrentClaims,
+    login_rate_limit,
+    password_recovery_rate_limit,
+)
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from typing import Annotated
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 import pyotp
 from datetime import datetime, timezone
-from app.crud.users import authenticate, get_user_by_email
+from app.crud.users import authenticate, get_user_by_email, update_password
 from app.crud.base import save_to_db
-from app.schemas.users import Token, Message, NewPassword
-from app.core.security import create_access_token, get_password_hash
+from app.crud.tokens import (
+    get_refresh_token,
+    issue_refresh_token,
+    revoke_refresh_token_family,
+    revoke_token,
+    rotate_refresh_token,
+)
+from app.db.users import User
+from app.schemas.users import Token, Message, NewPassword, RefreshTokenRequest
+from app.core.security import create_access_token
+from app.core.breach import is_breached_password
 from app.core.config import settings
 from app.utils import (
     generate_reset_token,
     generate_reset_password_email,
     verify_reset_token,
-    send_email,
+    queue_email,
     OAuth2RequestWithOTP,
 )
 
@@ -22,7 +36,17 @@ from app.utils import (
 router = APIRouter(tags=["login"])
 
 
-@router.post("/login/access-token")
+def create_user_access_token(user: User) -> str:
+    return create_access_token(
+        subject=user.id,
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        is_superuser=user.is_superuser,
+        is_active=user.is_active,
+        token_version=user.token_version,
+    )
+
+
+@router.post("/login/access-token", dependencies=[Depends(login_rate_limit)])
 def login_access_token(
     session: SessionDep, form_data: Annotated[OAuth2RequestWithOTP, Depends()]
 ) -> Token:
@@ -37,18 +61,48 @@ def login_access_token(
             raise HTTPException(401, "Invalid or missing OTP")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_user_access_token(user)
+    refresh_token = issue_refresh_token(session=session, user_id=user.id)
     user.last_login = datetime.now(timezone.utc)
     save_to_db(session=session, instance=user)
 
+    return Token(access_token=access_token, refresh_token=refresh_token)
+
+
+@router.post("/login/refresh-token")
+def login_refresh_token(session: SessionDep, body: RefreshTokenRequest) -> Token:
+    """Exchange a refresh token for a new access token and refresh token."""
+    rotated = rotate_refresh_token(session=session, token=body.refresh_token)
+    if not rotated:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    user, refresh_token = rotated
+
     return Token(
-        access_token=create_access_token(
-            subject=user.id, expires_delta=access_token_expires
-        )
+        access_token=create_user_access_token(user), refresh_token=refresh_token
     )
 
 
-@router.post("/password-recovery/{email}")
+@router.post("/logout")
+def logout(
+    session: SessionDep, claims: CurrentClaims, body: RefreshTokenRequest | None = None
+) -> Message:
+    """Revoke this request's access token and, if given, its refresh token chain."""
+    if body:
+        db_token = get_refresh_token(session=session, token=body.refresh_token)
+        if db_token and db_token.user_id == claims.sub:
+            revoke_refresh_token_family(session=session, family_id=db_token.family_id)
+    revoke_token(
+        session=session,
+        jti=claims.jti,
+        expires_at=datetime.fromtimestamp(claims.exp, tz=timezone.utc),
+    )
+    return Message(message="Logged out successfully.")
+
+
+@router.post(
+    "/password-recovery/{email}",
+    dependencies=[Depends(password_recovery_rate_limit)],
+)
 def password_recovery(
     session: SessionDep, email: str, background_tasks: BackgroundTasks
 ) -> Message:
@@ -66,8 +120,8 @@ def password_recovery(
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    background_tasks.add_task(
-        send_email,
+    queue_email(
+        background_tasks,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -93,7 +147,11 @@ def password_reset(session: SessionDep, body: NewPassword) -> Message:
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    hashed_password = get_password_hash(body.new_password)
-    user.hashed_password = hashed_password
-    session.commit()
+    if is_breached_password(body.new_password):
+        raise HTTPException(
+            status_code=400,
+            detail="Password has appeared in a data breach",
+        )
+
+    update_password(session=session, db_user=user, password=body.new_password)
     return Message(message="Password updated successfully.")
@@ -13,11 +13,12 @@ from app.db.users import (
 from app.schemas.users import Message, ChangePassword
 from app.crud import users as crud_users
 from app.api.dependencies import SessionDep, CurrentUser
-from app.core.security import verify_password, get_password_hash
+from app.core.security import verify_password
+from app.core.breach import is_breached_password
 from app.utils import (
     generate_reset_token,
     generate_new_account_activate_email,
-    send_email,
+    queue_email,
     verify_reset_token,
 )
 from app.core.config import settings
@@ -33,14 +34,18 @@ def create_user(
 ) -> Any:
     """Create a new user."""
 
-    user = crud_users.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    if is_breached_password(user_in.password):
         raise HTTPException(
             status_code=400,
-            detail="The user with this email already exists in the system.",
+            detail={"password": "Password has appeared in a data breach"},
         )
     user_create = UserCreate.model_validate(user_in)
     user = crud_users.create_user(session=session, user_create=user_create)
+    if not user:
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists in the system.",
+        )
 
     activate_user_token = generate_reset_token(email=user.email)
     email_data = generate_new_account_activate_email(
@@ -48,8 +53,8 @@ def create_user(
         email=user.email,
         token=activate_user_token,
     )
-    background_tasks.add_task(
-        send_email,
+    queue_email(
+        background_tasks,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -72,8 +77,12 @@ def activate_user(*, session: SessionDep, token: str) -> Any:
             status_code=404,
             detail="The user with this email does not exist in the system.",
         )
+    if user.deletion_requested_at:
+        raise HTTPException(
+            status_code=409, detail="The user is scheduled for deletion"
+        )
     user.is_active = True
-    save_to_db(session=session, instance=user, refresh=True)
+    save_to_db(session=session, instance=user)
     return user
 
 
@@ -87,7 +96,7 @@ def enable_2fa(session: SessionDep, current_user: CurrentUser):
     if not current_user.otp_secret:
         current_user.otp_secret = pyotp.random_base32()
     current_user.is_otp = True
-    save_to_db(session=session, instance=current_user, refresh=True)
+    save_to_db(session=session, instance=current_user)
     res = crud_users.create_totp_qr(
         user=current_user, issuer_name=settings.PROJECT_NAME
     )
@@ -127,8 +136,15 @@ def change_password(
             detail={"new_password": "New password must be different from the old one"},
         )
 
-    current_user.hashed_password = get_password_hash(payload.new_password)
-    save_to_db(session=session, instance=current_user)
+    if is_breached_password(payload.new_password):
+        raise HTTPException(
+            status_code=400,
+            detail={"new_password": "Password has appeared in a data breach"},
+        )
+
+    crud_users.update_password(
+        session=session, db_user=current_user, password=payload.new_password
+    )
     return Message(message="Password changed successfully")
 
 
@@ -161,7 +177,6 @@ def delete_user(*, session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
+    crud_users.request_user_deletion(session=session, db_user=current_user)
 
-    return Message(message="User deleted successfully")
+    return Message(message="User scheduled for deletion")
@@ -0,0 +1,80 @@
+import hashlib
+import mmap
+import threading
+from pathlib import Path
+from app.core.config import settings
+
+MAGIC = b"PWSHA1\x00\x01"
+DIGEST_SIZE = hashlib.sha1().digest_size
+
+
+class BreachIndexError(Exception):
+    pass
+
+
+class BreachIndex:
+    """Sorted SHA-1 digests of breached passwords, searched through ``mmap``.
+
+    The file holds an 8 byte header followed by unique 20 byte digests in
+    ascending order, as written by app.scripts.build_breach_index. Lookups
+    are a binary search over the mapping, so only the few pages they touch
+    are read from disk and shared between worker processes by the page cache.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise BreachIndexError(f"{self.path} is empty")
+        size = len(self._mmap) - len(MAGIC)
+        if self._mmap[: len(MAGIC)] != MAGIC or size % DIGEST_SIZE:
+            self.close()
+            raise BreachIndexError(f"{self.path} is not a breach index")
+        self.count = size // DIGEST_SIZE
+
+    def _digest_at(self, index: int) -> bytes:
+        offset = len(MAGIC) + index * DIGEST_SIZE
+        return self._mmap[offset : offset + DIGEST_SIZE]
+
+    def contains_digest(self, digest: bytes) -> bool:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._digest_at(middle) < digest:
+                low = middle + 1
+            else:
+                high = middle
+        return low < self.count and self._digest_at(low) == digest
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(hashlib.sha1(password.encode()).digest())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+
+_index: BreachIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_breach_index() -> BreachIndex | None:
+    """Open BREACHED_PASSWORDS_PATH on first use, None when it is not set."""
+    global _index
+    if not settings.BREACHED_PASSWORDS_PATH:
+        return None
+    with _index_lock:
+        if _index is None or _index.path != Path(settings.BREACHED_PASSWORDS_PATH):
+            _index = BreachIndex(settings.BREACHED_PASSWORDS_PATH)
+        return _index
+
+
+def is_breached_password(password: str) -> bool:
+    index = get_breach_index()
+    return index is not None and password in index
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, computed_field, EmailStr, model_validator
 from pydantic_core import MultiHostUrl
+from typing import Literal
 from typing_extensions import Self
 
 
@@ -17,8 +18,21 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "PW-Manager"
     # JWT settings
     SECRET_KEY: str
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Access tokens are short lived, clients renew them with a refresh token
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
     ALGORITHM: str = "HS256"
+    # How long a worker trusts its cached copy of a user's token version
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
+    TOKEN_VERSION_CACHE_SIZE: int = 10_000
+    # Decoded access tokens, kept until they expire (0 disables the cache)
+    TOKEN_PAYLOAD_CACHE_SIZE: int = 10_000
+    # Revoked token ids are mirrored in a per-worker Bloom filter kept in sync
+    # through LISTEN/NOTIFY. Without the listener every check hits the database.
+    TOKEN_REVOCATION_LISTENER_ENABLED: bool = True
+    TOKEN_REVOCATION_REFRESH_SECONDS: int = 300
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
 
     FRONTEND_URL: str
 
@@ -28,8 +42,22 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str = ""
     POSTGRES_DB: str = ""
+    # Connection pool of each worker process (SQLAlchemy QueuePool)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
 
     FERNET_KEY: str
+    # Key of the credential password fingerprints used for reuse detection,
+    # derived from FERNET_KEY when unset. Changing it requires running
+    # app.scripts.backfill_fingerprints
+    CREDENTIAL_FINGERPRINT_KEY: str | None = None
+    # Index built by app.scripts.build_breach_index. When set, account
+    # passwords found in it are rejected and such credentials are flagged
+    BREACHED_PASSWORDS_PATH: str | None = None
+    # Credentials whose password was not changed for this long count as old
+    # in the vault health report
+    CREDENTIAL_PASSWORD_MAX_AGE_DAYS: int = 365
 
     @computed_field
     @property
@@ -80,6 +108,58 @@ class Settings(BaseSettings):
 
     EMAIL_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Rate limiting (token buckets: capacity is the burst size,
+    # *_PER_MINUTE is how many tokens are refilled each minute)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "postgres"] = "memory"
+    LOGIN_RATE_LIMIT_IP_CAPACITY: int = 20
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 10
+    LOGIN_RATE_LIMIT_EMAIL_CAPACITY: int = 5
+    LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE: float = 1
+    PASSWORD_RECOVERY_RATE_LIMIT_IP_CAPACITY: int = 5
+    PASSWORD_RECOVERY_RATE_LIMIT_IP_PER_MINUTE: float = 1
+    PASSWORD_RECOVERY_RATE_LIMIT_EMAIL_CAPACITY: int = 3
+    PASSWORD_RECOVERY_RATE_LIMIT_EMAIL_PER_MINUTE: float = 0.1
+
+    # Prometheus metrics served at /metrics, per worker process
+    METRICS_ENABLED: bool = True
+
+    # Statement count and database time of each request, reported in the
+    # Server-Timing header. The same statement executed this many times in
+    # one request is logged as a possible N+1 query.
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_STATS_N_PLUS_ONE_THRESHOLD: int = 10
+
+    # Sampling profiler: requests of superusers sending "X-Profile: 1" and a
+    # PROFILE_SAMPLE_RATE share of all requests are profiled into PROFILE_DIR
+    # (collapsed stacks for flamegraph.pl or speedscope). Disabled when unset.
+    # "X-Profile: memory" and PROFILE_MODE="memory" trace allocations with
+    # tracemalloc instead, keeping PROFILE_MEMORY_FRAMES frames per allocation.
+    PROFILE_DIR: str | None = None
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5
+    PROFILE_MAX_FILES: int = 100
+    PROFILE_MODE: Literal["cpu", "memory"] = "cpu"
+    PROFILE_MEMORY_FRAMES: int = 25
+
+    # Slow query log: statements slower than SLOW_QUERY_THRESHOLD_MS are
+    # written to a rotating JSON lines file, with their plan when
+    # SLOW_QUERY_EXPLAIN is set. EXPLAIN ANALYZE runs the statement again, keep
+    # it to staging or a low SLOW_QUERY_SAMPLE_RATE. Disabled when unset.
+    SLOW_QUERY_LOG_PATH: str | None = None
+    SLOW_QUERY_THRESHOLD_MS: float = 200
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    SLOW_QUERY_EXPLAIN: bool = False
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 3
+
+    # Tracing: spans of a TRACING_SAMPLE_RATE share of requests are exported
+    # as OTLP/JSON to TRACING_FILE_PATH ("file") or kept in the worker's
+    # memory ("memory", for tests). Disabled when unset.
+    TRACING_EXPORTER: Literal["file", "memory"] | None = None
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0
+
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
         if not self.EMAILS_FROM_NAME:
@@ -1,15 +1,18 @@
-from sqlmodel import Session, create_engine, select
+from sqlmodel import Session, create_engine
 from app.core.config import settings
-from app.db.users import User, UserCreate
-from app.crud.users import create_user
+from app.db.users import UserCreate
+from app.crud.users import create_user, get_user_by_email
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+)
 
 
 def init_db(session: Session) -> None:
-    user = session.exec(
-        select(User).where(User.email == settings.FIRST_SUPERUSER_EMAIL)
-    ).first()
+    user = get_user_by_email(session=session, email=settings.FIRST_SUPERUSER_EMAIL)
     if not user:
         user_in = UserCreate(
             username=settings.FIRST_SUPERUSER_USERNAME,
@@ -0,0 +1,329 @@
+import bisect
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+from starlette.routing import Match
+
+Labels = tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class of the metrics rendered in the Prometheus text format.
+
+    Values are kept per label values tuple, in the order of ``labelnames``.
+    Metrics are local to the worker process.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """Yield (suffix, formatted labels, value) for every sample."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield "", _format_labels(self.labelnames, labels), value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """Gauge set by the application, or read from ``callback`` when scraped.
+
+    The callback returns the current value per label values tuple.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        callback: Callable[[], dict[Labels, float]] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        if self.callback:
+            for labels, value in self.callback().items():
+                yield "", _format_labels(self.labelnames, labels), value
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: count of each bucket (not cumulative), sum, count
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            item = self._values.get(labels)
+            if item is None:
+                item = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = item
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, labels: Labels = ()) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    def get_count(self, labels: Labels = ()) -> int:
+        item = self._values.get(labels)
+        return sum(item[0]) if item else 0
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        with self._lock:
+            values = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._values.items()
+            ]
+        bounds = [*self.buckets, float("inf")]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield (
+                    "_bucket",
+                    _format_labels(self.labelnames, labels, le),
+                    cumulative,
+                )
+            yield "_sum", _format_labels(self.labelnames, labels), total
+            yield "_count", _format_labels(self.labelnames, labels), cumulative
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            if not getattr(metric, "callback", None):
+                metric.clear()
+
+
+registry = Registry()
+
+http_requests_total: Counter = registry.register(
+    Counter(
+        "http_requests_total",
+        "Number of HTTP requests by route id, method and status.",
+        ("route", "method", "status"),
+    )
+)
+http_request_duration_seconds: Histogram = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route id, method and status.",
+        ("route", "method", "status"),
+    )
+)
+http_requests_in_progress: Gauge = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "Number of HTTP requests being processed.",
+        ("method",),
+    )
+)
+password_hash_duration_seconds: Histogram = registry.register(
+    Histogram(
+        "password_hash_duration_seconds",
+        "Time spent hashing and verifying account passwords with bcrypt.",
+        ("operation",),
+        buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+    )
+)
+credential_cipher_duration_seconds: Histogram = registry.register(
+    Histogram(
+        "credential_cipher_duration_seconds",
+        "Time spent encrypting and decrypting credential passwords with Fernet.",
+        ("operation",),
+        buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+    )
+)
+email_queue_depth: Gauge = registry.register(
+    Gauge("email_queue_depth", "Number of emails scheduled but not sent yet.")
+)
+emails_sent_total: Counter = registry.register(
+    Counter("emails_sent_total", "Number of emails sent by result.", ("result",))
+)
+
+
+def register_pool_metrics(engine: Any) -> None:
+    """Expose the connection pool state of ``engine``, read when scraped."""
+
+    def pool_stats() -> dict[Labels, float]:
+        pool = engine.pool
+        return {
+            (state,): getattr(pool, state)()
+            for state in ("size", "checkedin", "checkedout", "overflow")
+            if hasattr(pool, state)
+        }
+
+    registry.register(
+        Gauge(
+            "db_pool_connections",
+            "Database connection pool state (size, checkedin, checkedout, overflow).",
+            ("state",),
+            callback=pool_stats,
+        )
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests.
+
+    Requests are labelled with the unique id of the matched route (e.g.
+    ``credentials-read_credentials``), the path of other routes, or
+    ``unmatched``; raw paths are never used so label cardinality stays
+    bounded.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec((method,))
+            labels = (route_id(scope), method, str(status))
+            http_requests_total.inc(labels)
+            http_request_duration_seconds.observe(time.perf_counter() - start, labels)
+
+
+def route_id(scope: dict) -> str:
+    route = scope.get("route")
+    if route is None:
+        # Plain Starlette routes (docs, openapi.json) do not record themselves
+        app = scope.get("app")
+        for candidate in getattr(app, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+        else:
+            return "unmatched"
+    return getattr(route, "unique_id", None) or getattr(route, "path", "unmatched")
@@ -0,0 +1,294 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from stat import S_ISREG
+from types import CodeType
+from typing import Any, Callable
+from jose import jwt
+from jose.exceptions import JWTError
+from app.core.config import settings
+from app.core.metrics import route_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# Values of the X-Profile header and the profiler they select
+PROFILE_MODES = {b"1": "cpu", b"cpu": "cpu", b"memory": "memory"}
+PROFILE_SUFFIX = ".folded"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+# Innermost frames of threads waiting for work, not worth a sample
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+WORKER_THREAD_NAME = "AnyIO worker thread"
+
+
+class SamplingProfiler:
+    """Sample the Python stacks of the event loop and threadpool threads every
+    ``interval`` seconds from a background thread.
+
+    Samples are aggregated as collapsed stacks ("outer;inner count"), the
+    input format of flamegraph.pl and speedscope. The sampled threads are
+    shared by every request in flight, so concurrent requests show up in the
+    profile too.
+    """
+
+    def __init__(self, interval: float, loop_thread_id: int) -> None:
+        self.interval = interval
+        self.loop_thread_id = loop_thread_id
+        self.samples: Counter[str] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_qualname} ({_short_path(code.co_filename)})"
+            self._labels[code] = label
+        return label
+
+    def _thread_ids(self) -> set[int]:
+        ids = {
+            thread.ident
+            for thread in threading.enumerate()
+            if thread.name == WORKER_THREAD_NAME and thread.ident is not None
+        }
+        ids.add(self.loop_thread_id)
+        return ids
+
+    def _run(self) -> None:
+        thread_ids = self._thread_ids()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            # Threads are started on demand by the threadpool
+            thread_ids = self._thread_ids()
+
+
+class MemoryProfiler:
+    """Trace the Python allocations made while a request runs with tracemalloc.
+
+    ``peak`` is the highest traced memory reached above the level at start,
+    in bytes. The stacks returned by ``stop`` count the bytes still allocated
+    at that point by allocation stack, in the collapsed stacks format of
+    SamplingProfiler. Like its samples, they include the allocations of the
+    other requests in flight.
+    """
+
+    def __init__(self, frames: int) -> None:
+        self.frames = frames
+        self.peak = 0
+        self._baseline = 0
+        self._started = False
+
+    def start(self) -> None:
+        # Tracing may already be on, e.g. with PYTHONTRACEMALLOC
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+
+    def stop(self) -> Counter[str]:
+        self.peak = tracemalloc.get_traced_memory()[1] - self._baseline
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        if self._started:
+            tracemalloc.stop()
+        stacks: Counter[str] = Counter()
+        for statistic in snapshot.statistics("traceback"):
+            stack = ";".join(
+                f"{_short_path(frame.filename)}:{frame.lineno}"
+                for frame in statistic.traceback
+            )
+            stacks[stack] += statistic.size
+        return stacks
+
+
+def _short_path(filename: str) -> str:
+    for prefix in sys.path:
+        if prefix and filename.startswith(prefix):
+            return filename[len(prefix) :].lstrip(os.sep)
+    return filename
+
+
+def write_profile(samples: Counter[str], route: str, mode: str = "cpu") -> Path:
+    """Save ``samples`` to PROFILE_DIR and drop the oldest profiles beyond
+    PROFILE_MAX_FILES."""
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    name = f"{timestamp}-{route}-{mode}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+    path = directory / re.sub(r"[^\w.-]", "_", name)
+    path.write_text(
+        "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+    )
+
+    profiles = list_profiles()
+    for old, _ in profiles[settings.PROFILE_MAX_FILES :]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def list_profiles() -> list[tuple[Path, os.stat_result]]:
+    """Saved profiles with their stat, newest first.
+
+    Workers sharing PROFILE_DIR delete old profiles at any time, files gone
+    before they could be stat'ed are skipped.
+    """
+    if not settings.PROFILE_DIR or not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in Path(settings.PROFILE_DIR).iterdir():
+        if not PROFILE_NAME.match(entry.name):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        if S_ISREG(stat.st_mode):
+            profiles.append((entry, stat))
+    return sorted(profiles, key=lambda profile: profile[1].st_mtime, reverse=True)
+
+
+def get_profile(name: str) -> Path | None:
+    if not PROFILE_NAME.match(name):
+        return None
+    return next((path for path, _ in list_profiles() if path.name == name), None)
+
+
+def is_superuser_token(headers: list[tuple[bytes, bytes]]) -> bool:
+    """Whether the request carries a valid access token of a superuser.
+
+    Revocation is not checked here; the token only unlocks profiling of the
+    request it is sent with.
+    """
+    authorization = dict(headers).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except JWTError:
+        return False
+    return payload.get("type") == "access" and bool(payload.get("is_superuser"))
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests sent by a superuser with an
+    ``X-Profile`` header, and a PROFILE_SAMPLE_RATE share of all requests.
+
+    ``X-Profile: 1`` or ``cpu`` samples the stacks, ``X-Profile: memory``
+    traces allocations; sampled requests use PROFILE_MODE. One request is
+    profiled at a time per worker. The name of the saved profile is returned
+    in the ``X-Profile-Id`` response header, and memory profiles report the
+    peak in ``X-Profile-Peak-Memory``, in bytes.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self._lock = threading.Lock()
+
+    def profile_mode(self, scope: dict) -> str | None:
+        """The profiler to run on the request, None to not profile it."""
+        headers = scope.get("headers", [])
+        mode = PROFILE_MODES.get(dict(headers).get(PROFILE_HEADER, b"").lower())
+        if mode and is_superuser_token(headers):
+            return mode
+        if random.random() < settings.PROFILE_SAMPLE_RATE:
+            return settings.PROFILE_MODE
+        return None
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not settings.PROFILE_DIR:
+            await self.app(scope, receive, send)
+            return
+        mode = self.profile_mode(scope)
+        if mode is None or not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_name: str | None = None
+        body: list[dict] = []
+        start_message: dict | None = None
+
+        # The response is held back until the profile is saved, so its name
+        # can be returned in a header
+        async def send_wrapper(message: dict) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            else:
+                body.append(message)
+
+        profiler: SamplingProfiler | MemoryProfiler
+        if mode == "memory":
+            profiler = MemoryProfiler(settings.PROFILE_MEMORY_FRAMES)
+        else:
+            profiler = SamplingProfiler(
+                settings.PROFILE_INTERVAL_MS / 1000, threading.get_ident()
+            )
+        started_at = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            samples = profiler.stop()
+            self._lock.release()
+            try:
+                profile_name = write_profile(samples, route_id(scope), mode).name
+            except OSError:
+                logger.exception("Could not save profile")
+            logger.info(
+                "Profiled %s (%s) in %.1f ms: %s",
+                scope["path"],
+                mode,
+                (time.perf_counter() - started_at) * 1000,
+                profile_name,
+            )
+
+        if start_message is not None:
+            headers = list(start_message.get("headers", []))
+            if profile_name:
+                headers.append((b"x-profile-id", profile_name.encode("latin-1")))
+            if isinstance(profiler, MemoryProfiler):
+                headers.append((b"x-profile-peak-memory", str(profiler.peak).encode()))
+            start_message = {**start_message, "headers": headers}
+            await send(start_message)
+        for message in body:
+            await send(message)
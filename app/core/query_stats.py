@@ -0,0 +1,117 @@
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """SQL statements executed while handling one request."""
+
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+    warned: bool = False
+    # ASGI scope of the request, its route is set once routing is done
+    scope: dict | None = None
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times, most frequent first."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def get_query_stats() -> QueryStats | None:
+    return _query_stats.get()
+
+
+@contextmanager
+def collect_query_stats(scope: dict | None = None) -> Iterator[QueryStats]:
+    """Count the statements executed in this context, including the worker
+    threads sync endpoints and dependencies run in, as they copy the context."""
+    stats = QueryStats(scope=scope)
+    reset_token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(reset_token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None:
+        conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    start = conn.info.pop("query_start", None)
+    if stats is None or start is None:
+        return
+    stats.duration += time.perf_counter() - start
+    stats.count += 1
+    stats.statements[statement] += 1
+
+    threshold = settings.QUERY_STATS_N_PLUS_ONE_THRESHOLD
+    if not stats.warned and stats.statements[statement] >= threshold:
+        # Same SQL over and over with different parameters: usually a lazy
+        # relationship loaded in a loop
+        stats.warned = True
+        logger.warning(
+            "Possible N+1 query, executed %d times in one request: %s",
+            stats.statements[statement],
+            " ".join(statement.split())[:500],
+        )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware reporting the statement count and database time of each
+    request in a ``Server-Timing`` header, e.g. ``db;dur=3.1;desc="4 queries"``.
+
+    Statements run by background tasks, after the response started, are not
+    included.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_query_stats(scope) as stats:
+
+            async def send_wrapper(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            server_timing(stats).encode("latin-1"),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
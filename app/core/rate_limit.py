@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Protocol
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.db import engine
+from app.db.rate_limit import RateLimitBucket
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket parameters.
+
+    capacity -- maximum number of tokens (burst size)
+    per_minute -- tokens added back to the bucket every minute
+    """
+
+    capacity: int
+    per_minute: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+class RateLimitBackend(Protocol):
+    def consume(self, key: str, limit: RateLimit) -> tuple[bool, float]: ...
+
+    def reset(self) -> None: ...
+
+
+class InMemoryBackend:
+    """Buckets local to the current process.
+
+    Keys are kept in LRU order and the oldest ones are dropped once
+    ``max_keys`` is reached, so a client spraying random emails can not grow
+    the table without bound. A dropped bucket is equivalent to a full one.
+    """
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: RateLimit) -> tuple[bool, float]:
+        """Take one token from the bucket of ``key``.
+
+        Returns whether the call is allowed and the tokens left afterwards.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class PostgresBackend:
+    """Buckets stored in the ``ratelimitbucket`` table, shared by all workers.
+
+    Refill, consumption and the allow decision happen in a single upsert so
+    concurrent workers never race on the same bucket.
+    """
+
+    consume_statement = text(
+        """
+        INSERT INTO ratelimitbucket (key, tokens, allowed, updated_at)
+        VALUES (:key, :capacity - 1, true, now())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = {refilled} - CASE WHEN {refilled} >= 1 THEN 1 ELSE 0 END,
+            allowed = {refilled} >= 1,
+            updated_at = now()
+        RETURNING allowed, tokens
+        """.format(
+            refilled="LEAST(:capacity, ratelimitbucket.tokens + EXTRACT("
+            "EPOCH FROM now() - ratelimitbucket.updated_at) * :rate)"
+        )
+    )
+    prune_statement = text(
+        "DELETE FROM ratelimitbucket "
+        "WHERE updated_at < now() - make_interval(secs => :max_idle)"
+    )
+
+    def __init__(
+        self, engine: Engine, prune_every: int = 1000, max_idle_seconds: int = 3600
+    ) -> None:
+        self.engine = engine
+        self.prune_every = prune_every
+        self.max_idle_seconds = max_idle_seconds
+        self._calls = 0
+
+    def consume(self, key: str, limit: RateLimit) -> tuple[bool, float]:
+        self._calls += 1
+        with self.engine.begin() as connection:
+            allowed, tokens = connection.execute(
+                self.consume_statement,
+                {"key": key, "capacity": limit.capacity, "rate": limit.per_second},
+            ).one()
+            if self._calls % self.prune_every == 0:
+                # Idle buckets have refilled completely, dropping them is lossless
+                connection.execute(
+                    self.prune_statement, {"max_idle": self.max_idle_seconds}
+                )
+        return allowed, tokens
+
+    def reset(self) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(delete(RateLimitBucket))
+
+
+class RateLimiter:
+    """Checks token buckets and keeps per-scope allowed/rejected counters.
+
+    Counters are local to the worker process.
+    """
+
+    def __init__(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+        self._counters: Counter[tuple[str, str]] = Counter()
+        self._lock = threading.Lock()
+
+    def check(self, scope: str, buckets: list[tuple[str, RateLimit]]) -> float | None:
+        """Consume a token from each ``(key, limit)`` bucket within ``scope``.
+
+        Buckets are checked in order and the first empty one rejects the
+        request without touching the remaining ones. Returns ``None`` when the
+        request is allowed, otherwise the number of seconds after which a new
+        token will be available.
+        """
+        retry_after = None
+        for key, limit in buckets:
+            allowed, tokens = self.backend.consume(f"{scope}:{key}", limit)
+            if not allowed:
+                retry_after = (
+                    (1 - tokens) / limit.per_second if limit.per_second else 60.0
+                )
+                break
+        with self._lock:
+            self._counters[
+                (scope, "allowed" if retry_after is None else "rejected")
+            ] += 1
+        return retry_after
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            counters = dict(self._counters)
+        result: dict[str, dict[str, int]] = {}
+        for (scope, outcome), value in counters.items():
+            result.setdefault(scope, {"allowed": 0, "rejected": 0})[outcome] = value
+        return result
+
+    def reset(self) -> None:
+        self.backend.reset()
+        with self._lock:
+            self._counters.clear()
+
+
+def get_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return PostgresBackend(engine)
+    return InMemoryBackend()
+
+
+rate_limiter = RateLimiter(get_backend())
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import math
+import select
+import threading
+import time
+from sqlalchemy import delete, func
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select as sql_select
+from app.core.config import settings
+from app.db.tokens import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "token_revoked"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Membership tests can return false positives at roughly ``error_rate`` once
+    ``capacity`` items were added, but never false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+        # Request threads and the listener thread add concurrently, an
+        # unguarded read-modify-write of a byte could drop another add's bit
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """Per-worker view of revoked token ids.
+
+    A Bloom filter answers "definitely not revoked" from memory; only
+    positives need a database lookup. A background thread keeps the filter in
+    sync by listening on the ``token_revoked`` channel and rebuilds it from
+    the table every TOKEN_REVOCATION_REFRESH_SECONDS, which also drops pruned
+    entries and recovers notifications missed while disconnected. Until the
+    first rebuild succeeds every token is reported as possibly revoked.
+    """
+
+    def __init__(self) -> None:
+        self._bloom = self._new_filter(0)
+        self._ready = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _new_filter(count: int) -> BloomFilter:
+        return BloomFilter(
+            capacity=max(settings.TOKEN_REVOCATION_BLOOM_CAPACITY, count * 2),
+            error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def add(self, jti: str) -> None:
+        self._bloom.add(jti)
+
+    def might_be_revoked(self, jti: str) -> bool:
+        return not self._ready or jti in self._bloom
+
+    def rebuild(self, engine: Engine) -> None:
+        """Prune expired revocations and reload the filter from the table."""
+        with Session(engine) as session:
+            session.exec(
+                delete(RevokedToken).where(RevokedToken.expires_at < func.now())
+            )
+            session.commit()
+            jtis = session.exec(sql_select(RevokedToken.jti)).all()
+        bloom = self._new_filter(len(jtis))
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._ready = True
+
+    def start(self, engine: Engine) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen, args=(engine,), name="token-revocation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._ready = False
+
+    def _listen(self, engine: Engine) -> None:
+        while not self._stop.is_set():
+            try:
+                with engine.connect().execution_options(
+                    isolation_level="AUTOCOMMIT"
+                ) as connection:
+                    connection.exec_driver_sql(f"LISTEN {REVOCATION_CHANNEL}")
+                    # Listen first so nothing committed during the load is missed
+                    self.rebuild(engine)
+                    self._consume_notifications(engine, connection)
+            except Exception:
+                self._ready = False
+                logger.exception("Token revocation listener failed, reconnecting")
+                self._stop.wait(5)
+
+    def _consume_notifications(self, engine: Engine, connection: Connection) -> None:
+        dbapi_connection = connection.connection.driver_connection
+        next_rebuild = time.monotonic() + settings.TOKEN_REVOCATION_REFRESH_SECONDS
+        while not self._stop.is_set():
+            readable, _, _ = select.select([dbapi_connection], [], [], 1.0)
+            if readable:
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self.add(dbapi_connection.notifies.pop(0).payload)
+            if time.monotonic() >= next_rebuild:
+                self.rebuild(engine)
+                next_rebuild = (
+                    time.monotonic() + settings.TOKEN_REVOCATION_REFRESH_SECONDS
+                )
+
+
+revocation_list = RevocationList()
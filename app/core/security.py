@@ -1,35 +1,98 @@
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
+import hashlib
+import hmac
+import secrets
 from jose import jwt
 from typing import Any
 from datetime import datetime, timedelta, timezone
+import uuid
 from app.core.config import settings
+from app.core.metrics import (
+    credential_cipher_duration_seconds,
+    password_hash_duration_seconds,
+)
+from app.core.tracing import span
 
 key = settings.FERNET_KEY
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 fernet = Fernet(key.encode())
+fingerprint_key = (
+    settings.CREDENTIAL_FINGERPRINT_KEY.encode()
+    if settings.CREDENTIAL_FINGERPRINT_KEY
+    else hmac.digest(key.encode(), b"credential-fingerprint", "sha256")
+)
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    *,
+    is_superuser: bool,
+    is_active: bool,
+    token_version: int,
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject), "type": "access"}
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "type": "access",
+        "is_superuser": is_superuser,
+        "is_active": is_active,
+        "token_version": token_version,
+        "jti": uuid.uuid4().hex,
+    }
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
 
 
+def create_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random 256-bit values, a fast digest is enough to
+    # make the stored hashes useless without turning every refresh into bcrypt
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with password_hash_duration_seconds.time(("verify",)), span("bcrypt.verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with password_hash_duration_seconds.time(("hash",)), span("bcrypt.hash"):
+        return pwd_context.hash(password)
 
 
 def get_credential_password_hash(password: str) -> str:
-    return fernet.encrypt(password.encode()).decode()
+    with credential_cipher_duration_seconds.time(("encrypt",)), span("fernet.encrypt"):
+        return fernet.encrypt(password.encode()).decode()
 
 
 def decrypt_credential_password(hashed_password: str) -> str:
-    return fernet.decrypt(hashed_password.encode()).decode()
+    with credential_cipher_duration_seconds.time(("decrypt",)), span("fernet.decrypt"):
+        return fernet.decrypt(hashed_password.encode()).decode()
+
+
+def is_weak_password(password: str) -> bool:
+    classes = sum(
+        (
+            any(c.islower() for c in password),
+            any(c.isupper() for c in password),
+            any(c.isdigit() for c in password),
+            any(not c.isalnum() for c in password),
+        )
+    )
+    return len(password) < 12 or classes < 3
+
+
+def get_credential_password_fingerprint(password: str, user_id: uuid.UUID) -> str:
+    # Keyed by owner so equal passwords of different users never share a
+    # fingerprint, reuse is only detectable within a vault
+    return hmac.new(
+        fingerprint_key, user_id.bytes + password.encode(), hashlib.sha256
+    ).hexdigest()
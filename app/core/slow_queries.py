@@ -0,0 +1,206 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.metrics import route_id
+from app.core.query_stats import get_query_stats
+
+logger = logging.getLogger(__name__)
+
+# Slow statements are written one JSON object per line to this logger, whose
+# only handler is the rotating SLOW_QUERY_LOG_PATH file
+slow_query_logger = logging.getLogger("app.slow_queries")
+slow_query_logger.propagate = False
+_handler: RotatingFileHandler | None = None
+_handler_lock = threading.Lock()
+
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+SAVEPOINT = "slow_query_explain"
+
+# Bound values are inlined by psycopg2 and printed back by EXPLAIN, e.g.
+# "Index Cond: (lower((email)::text) = 'admin@example.com'::text)"
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+CONDITION_LINE = re.compile(r"^(\s*(?:->\s*)?)((?:[\w-]+ )*(?:Cond|Filter|Key)): (.*)$")
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Describe the parameters of a statement by type, never by value, so
+    passwords and tokens bound to it do not end up in the log."""
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "row": parameters_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def redact_plan(plan: str) -> str:
+    """Replace the constants of a text EXPLAIN output with ``?``, so values
+    bound to the statement do not end up in the log."""
+    lines = []
+    for line in plan.splitlines():
+        line = STRING_LITERAL.sub("'?'", line)
+        match = CONDITION_LINE.match(line)
+        if match and not match.group(2).startswith("Rows Removed"):
+            indent, label, condition = match.groups()
+            line = f"{indent}{label}: {NUMBER.sub('?', condition)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def explain(conn, cursor, statement: str, parameters: Any) -> str:
+    """EXPLAIN ``statement`` on the connection it ran on.
+
+    With ANALYZE the statement runs again, so it is done inside a savepoint
+    that is rolled back: writes are undone and a failure does not abort the
+    request's transaction. Outside a transaction only the plan is shown.
+    Constants are redacted from the returned plan.
+    """
+    analyze = conn.in_transaction()
+    options = "ANALYZE, BUFFERS, " if analyze else ""
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if analyze:
+            explain_cursor.execute(f"SAVEPOINT {SAVEPOINT}")
+        try:
+            explain_cursor.execute(
+                f"EXPLAIN ({options}FORMAT TEXT) {statement}", parameters
+            )
+            return redact_plan("\n".join(row[0] for row in explain_cursor.fetchall()))
+        finally:
+            if analyze:
+                explain_cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+                explain_cursor.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+    finally:
+        explain_cursor.close()
+
+
+def get_slow_query_handler() -> RotatingFileHandler:
+    """Open SLOW_QUERY_LOG_PATH on first use, or again once it changed."""
+    global _handler
+    path = str(Path(settings.SLOW_QUERY_LOG_PATH).absolute())
+    with _handler_lock:
+        if _handler is None or _handler.baseFilename != path:
+            if _handler is not None:
+                slow_query_logger.removeHandler(_handler)
+                _handler.close()
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            _handler = RotatingFileHandler(
+                path,
+                maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+            )
+            slow_query_logger.addHandler(_handler)
+            slow_query_logger.setLevel(logging.INFO)
+        return _handler
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if settings.SLOW_QUERY_LOG_PATH:
+        conn.info["slow_query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("slow_query_start", None)
+    if start is None or not settings.SLOW_QUERY_LOG_PATH:
+        return
+    duration = time.perf_counter() - start
+    if duration * 1000 < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+    if random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+        return
+
+    stats = get_query_stats()
+    record: dict[str, Any] = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration * 1000, 3),
+        "route": route_id(stats.scope) if stats and stats.scope else None,
+        "statement": statement,
+        "parameters": parameters_shape(parameters, executemany),
+        "explain": None,
+    }
+    if (
+        settings.SLOW_QUERY_EXPLAIN
+        and not executemany
+        and conn.dialect.name == "postgresql"
+        and statement.lstrip().lower().startswith(EXPLAINABLE)
+    ):
+        try:
+            record["explain"] = explain(conn, cursor, statement, parameters)
+        except Exception as e:
+            record["explain_error"] = str(e)
+
+    try:
+        get_slow_query_handler()
+        slow_query_logger.info(json.dumps(record, default=str))
+    except OSError:
+        logger.exception("Could not write the slow query log")
+
+
+def read_slow_queries() -> Iterator[dict[str, Any]]:
+    """Records of the slow query log, oldest rotated file first."""
+    if not settings.SLOW_QUERY_LOG_PATH:
+        return
+    path = Path(settings.SLOW_QUERY_LOG_PATH)
+    files = [
+        path.with_name(f"{path.name}.{i}")
+        for i in range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)
+    ]
+    files.append(path)
+    for file in files:
+        if not file.is_file():
+            continue
+        with open(file) as lines:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize_slow_queries(limit: int = 20) -> list[dict[str, Any]]:
+    """Group the logged statements and return the ``limit`` ones that took the
+    most time in total, with the latest plan captured for each."""
+    groups: dict[str, dict[str, Any]] = {}
+    for record in read_slow_queries():
+        statement = " ".join(record["statement"].split())
+        group = groups.setdefault(
+            statement,
+            {
+                "statement": statement,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": set(),
+                "last_seen": None,
+                "explain": None,
+            },
+        )
+        group["count"] += 1
+        group["total_ms"] += record["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+        if record.get("route"):
+            group["routes"].add(record["route"])
+        group["last_seen"] = record["time"]
+        group["explain"] = record.get("explain") or group["explain"]
+
+    summary = sorted(groups.values(), key=lambda group: -group["total_ms"])[:limit]
+    for group in summary:
+        group["mean_ms"] = group["total_ms"] / group["count"]
+        group["routes"] = sorted(group["routes"])
+    return summary
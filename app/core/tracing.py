@@ -0,0 +1,255 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.metrics import route_id
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+MAX_STATEMENT_LENGTH = 1000
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_OK
+    # Finished spans of the trace, shared by every span in it
+    trace: list["Span"] = field(default_factory=list, repr=False)
+
+    def child(self, name: str, kind: int, attributes: dict[str, Any]) -> "Span":
+        return Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_span_id=self.span_id,
+            kind=kind,
+            attributes=attributes,
+            trace=self.trace,
+        )
+
+    def end(self, error: BaseException | None = None) -> None:
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status = STATUS_ERROR
+            self.attributes["exception.type"] = type(error).__name__
+        self.trace.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1_000_000
+
+    def to_otlp(self) -> dict[str, Any]:
+        """The span as in the OTLP/JSON encoding of OpenTelemetry."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_request(spans: list[Span]) -> dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest holding ``spans``."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": settings.PROJECT_NAME},
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app"},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class InMemoryExporter:
+    """Keep the spans of the last ``maxlen`` traces of this worker."""
+
+    def __init__(self, maxlen: int) -> None:
+        self.traces: deque[list[Span]] = deque(maxlen=maxlen)
+
+    def export(self, spans: list[Span]) -> None:
+        self.traces.append(spans)
+
+    def clear(self) -> None:
+        self.traces.clear()
+
+
+class FileExporter:
+    """Append one OTLP/JSON request per trace to TRACING_FILE_PATH, a format
+    the OpenTelemetry Collector file receiver and most trace viewers read."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        line = json.dumps(otlp_request(spans), separators=(",", ":"))
+        with self._lock, open(settings.TRACING_FILE_PATH, "a") as file:
+            file.write(line + "\n")
+
+
+memory_exporter = InMemoryExporter(maxlen=1000)
+file_exporter = FileExporter()
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def span(
+    name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any
+) -> Iterator[Span | None]:
+    """Time the block as a child of the current span.
+
+    Outside a traced request nothing is recorded and None is yielded.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = parent.child(name, kind, attributes)
+    reset_token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current_span.reset(reset_token)
+
+
+def export(spans: list[Span]) -> None:
+    if settings.TRACING_EXPORTER == "memory":
+        memory_exporter.export(spans)
+    elif settings.TRACING_EXPORTER == "file":
+        file_exporter.export(spans)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is not None:
+        conn.info["trace_span"] = parent.child(
+            "db.query",
+            SPAN_KIND_CLIENT,
+            {
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            },
+        )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = conn.info.pop("trace_span", None)
+    if current is not None:
+        current.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware tracing a TRACING_SAMPLE_RATE share of the requests.
+
+    The request is the root span; spans opened with ``span()`` while it runs,
+    in the event loop or a threadpool thread, and every SQL statement become
+    its descendants. The trace is exported once the response and its
+    background tasks are done.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if (
+            scope["type"] != "http"
+            or not settings.TRACING_EXPORTER
+            or random.random() >= settings.TRACING_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        root = Span(
+            name=f"{scope['method']} {scope['path']}",
+            trace_id=os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            kind=SPAN_KIND_SERVER,
+            attributes={"http.method": scope["method"], "url.path": scope["path"]},
+        )
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+            await send(message)
+
+        reset_token = _current_span.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(reset_token)
+            route = route_id(scope)
+            root.attributes["http.route"] = route
+            root.name = f"{scope['method']} {route}"
+            root.end(error)
+            export(sorted(root.trace, key=lambda span: span.start_ns))
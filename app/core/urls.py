@@ -0,0 +1,118 @@
+import ipaddress
+from urllib.parse import urlsplit
+
+# Public suffixes made of more than one label. Anything not listed here is
+# treated as a single label suffix, so the registrable domain of
+# login.example.com is example.com while the one of shop.example.co.uk is
+# example.co.uk. Hosting suffixes where every subdomain belongs to a different
+# owner are listed too, so user.github.io never matches other.github.io.
+MULTI_LABEL_SUFFIXES = frozenset(
+    {
+        # Country code second level domains
+        "ac.uk", "co.uk", "gov.uk", "ltd.uk", "me.uk", "net.uk", "org.uk",
+        "plc.uk", "sch.uk", "nhs.uk", "police.uk",
+        "com.au", "net.au", "org.au", "edu.au", "gov.au", "asn.au", "id.au",
+        "co.nz", "net.nz", "org.nz", "govt.nz", "ac.nz", "school.nz",
+        "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp", "ed.jp", "gr.jp",
+        "co.kr", "ne.kr", "or.kr", "ac.kr", "go.kr", "re.kr",
+        "com.br", "net.br", "org.br", "gov.br", "edu.br",
+        "com.cn", "net.cn", "org.cn", "gov.cn", "edu.cn",
+        "com.hk", "net.hk", "org.hk", "gov.hk", "edu.hk",
+        "com.tw", "net.tw", "org.tw", "gov.tw", "edu.tw",
+        "com.sg", "net.sg", "org.sg", "gov.sg", "edu.sg",
+        "com.my", "net.my", "org.my", "gov.my", "edu.my",
+        "co.in", "net.in", "org.in", "gov.in", "ac.in", "firm.in", "gen.in",
+        "co.id", "or.id", "ac.id", "go.id", "web.id",
+        "co.il", "org.il", "net.il", "ac.il", "gov.il",
+        "co.za", "org.za", "net.za", "gov.za", "ac.za", "web.za",
+        "com.mx", "net.mx", "org.mx", "gob.mx", "edu.mx",
+        "com.ar", "net.ar", "org.ar", "gob.ar", "edu.ar",
+        "com.tr", "net.tr", "org.tr", "gov.tr", "edu.tr", "gen.tr",
+        "com.ua", "net.ua", "org.ua", "gov.ua", "edu.ua", "in.ua",
+        "com.az", "net.az", "org.az", "gov.az", "edu.az",
+        "com.pl", "net.pl", "org.pl", "gov.pl",
+        "com.ru", "net.ru", "org.ru",
+        "com.vn", "net.vn", "org.vn", "gov.vn", "edu.vn",
+        "com.ph", "net.ph", "org.ph", "gov.ph", "edu.ph",
+        "com.pk", "net.pk", "org.pk", "gov.pk", "edu.pk",
+        "com.sa", "net.sa", "org.sa", "gov.sa", "edu.sa",
+        "com.eg", "net.eg", "org.eg", "gov.eg", "edu.eg",
+        "com.ng", "net.ng", "org.ng", "gov.ng", "edu.ng",
+        "co.ke", "or.ke", "ne.ke", "go.ke", "ac.ke",
+        "co.th", "in.th", "or.th", "go.th", "ac.th",
+        # Hosting platforms
+        "github.io", "gitlab.io", "herokuapp.com", "appspot.com",
+        "blogspot.com", "azurewebsites.net", "cloudfront.net",
+        "netlify.app", "vercel.app", "pages.dev", "workers.dev",
+        "web.app", "firebaseapp.com", "onrender.com", "fly.dev",
+        "s3.amazonaws.com", "elasticbeanstalk.com",
+    }
+)  # fmt: skip
+
+
+def normalize_host(url: str | None) -> str | None:
+    """Return the lowercase ASCII host name of ``url``, or None if it has none.
+
+    Scheme-less values such as "example.com/login" are accepted, ports,
+    credentials and a trailing dot are dropped and international domain
+    names are converted to punycode.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if "://" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host.lower() or None
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def registrable_domain(host: str) -> str:
+    """Return the eTLD+1 of ``host``; IP addresses are returned unchanged."""
+    if is_ip_address(host):
+        return host
+    labels = host.split(".")
+    for i in range(len(labels)):
+        if ".".join(labels[i:]) in MULTI_LABEL_SUFFIXES:
+            return ".".join(labels[max(i - 1, 0) :])
+    return ".".join(labels[-2:])
+
+
+def reverse_host(host: str) -> str:
+    """Reverse the labels of ``host``: login.example.com -> com.example.login.
+
+    The trailing dot makes a parent domain a string prefix of its subdomains
+    only, com.example. is a prefix of com.example.login. but not of
+    com.examples.
+    """
+    if is_ip_address(host):
+        return host + "."
+    return ".".join(reversed(host.split("."))) + "."
+
+
+def url_match_columns(url: str | None) -> dict[str, str | None]:
+    """Values of the credential columns used for URL matching."""
+    host = normalize_host(url)
+    if not host:
+        return {"host_reversed": None, "registrable_domain": None}
+    return {
+        "host_reversed": reverse_host(host),
+        "registrable_domain": registrable_domain(host),
+    }
@@ -5,12 +5,11 @@ from typing import TypeVar
 T = TypeVar("T")
 
 
-def save_to_db(
-    *, session: Session, instance: T, commit: bool = True, refresh: bool = False
-) -> T:
+def save_to_db(*, session: Session, instance: T, commit: bool = True) -> T:
+    # Sessions are created with expire_on_commit=False and every default is
+    # generated client side, so the instance is complete after the commit
+    # without reloading it
     session.add(instance)
     if commit:
         session.commit()
-    if refresh:
-        session.refresh(instance)
     return instance
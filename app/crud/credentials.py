@@ -1,13 +1,24 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func, or_, and_, cast, update, delete
+from sqlalchemy import REAL
 from uuid import UUID
 from app.db.credentials import (
     Credentials,
     CredentialsCreate,
     CredentialsUpdate,
     CredentialsAdminUpdate,
+    credentials_search_document,
 )
 from app.db.users import User
-from app.core.security import get_credential_password_hash, decrypt_credential_password
+from app.core.security import (
+    get_credential_password_hash,
+    get_credential_password_fingerprint,
+    decrypt_credential_password,
+    is_weak_password,
+)
+from app.crud.health import CredentialHealth, record_credential_change
+from datetime import datetime, timezone
+from app.core.breach import is_breached_password
+from app.core.urls import registrable_domain, reverse_host, url_match_columns
 from app.crud.base import save_to_db
 
 
@@ -38,34 +49,136 @@ def create_credentials(
             "hashed_password": get_credential_password_hash(
                 credentials_create.password
             ),
+            "password_fingerprint": get_credential_password_fingerprint(
+                credentials_create.password, user_id
+            ),
+            "is_breached": is_breached_password(credentials_create.password),
+            "is_weak": is_weak_password(credentials_create.password),
+            "password_changed_at": datetime.now(timezone.utc),
+            **url_match_columns(credentials_create.url),
         },
     )
-    save_to_db(session=session, instance=db_obj, refresh=True)
+    record_credential_change(
+        session=session,
+        credential_id=db_obj.id,
+        before=None,
+        after=CredentialHealth.of(db_obj),
+    )
+    save_to_db(session=session, instance=db_obj)
     return db_obj
 
 
+# Columns a credential's vault health depends on, see CredentialHealth.of
+HEALTH_COLUMNS = (
+    Credentials.user_id,
+    Credentials.password_fingerprint,
+    Credentials.is_weak,
+    Credentials.is_breached,
+    Credentials.password_changed_at,
+    Credentials.created_at,
+)
+
+
 def update_credentials(
     *,
     session: Session,
-    db_credentials: Credentials,
+    credential_id: UUID,
     credentials_in: CredentialsAdminUpdate,
+    user_id: UUID | None = None,
 ) -> Credentials | None:
+    """Update a credential in a single UPDATE ... RETURNING statement.
+
+    Returns None when the credential does not exist or, with user_id, does
+    not belong to that user. The previous values needed for the vault health
+    counters are returned by the same statement through a locked self join.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    credential_id -- id of the credential to update
+    credentials_in -- fields to change
+    user_id -- only update the credential if it belongs to this user
+    """
     credentials_data = credentials_in.model_dump(exclude_unset=True, exclude_none=True)
-    if "password" in credentials_data:
-        credentials_data["hashed_password"] = get_credential_password_hash(
-            credentials_data.pop("password")
-        )
+    owner_id = credentials_data.get("user_id", user_id)
+    password = credentials_data.pop("password", None)
+    if password is not None:
+        credentials_data["hashed_password"] = get_credential_password_hash(password)
+        credentials_data["is_breached"] = is_breached_password(password)
+        credentials_data["is_weak"] = is_weak_password(password)
+        credentials_data["password_changed_at"] = datetime.now(timezone.utc)
+        if owner_id:
+            credentials_data["password_fingerprint"] = (
+                get_credential_password_fingerprint(password, owner_id)
+            )
+    if "url" in credentials_data:
+        credentials_data.update(url_match_columns(credentials_data["url"]))
+
+    old = select(Credentials.id, *HEALTH_COLUMNS).where(Credentials.id == credential_id)
+    if user_id:
+        old = old.where(Credentials.user_id == user_id)
+    old = old.with_for_update().subquery("old")
+    statement = (
+        update(Credentials)
+        .where(Credentials.id == old.c.id)
+        .values(**credentials_data)
+        .returning(Credentials, *(old.c[column.key] for column in HEALTH_COLUMNS))
+        .execution_options(populate_existing=True)
+    )
+    row = session.exec(statement).first()
+    if not row:
+        session.rollback()
+        return None
+    db_credentials = row[0]
 
-    if "user_id" in credentials_data:
-        user = session.get(User, credentials_data["user_id"])
-        if not user:
-            return None
+    # Fingerprints are keyed by owner; when the owner was not known up front
+    # or changed without a new password, compute it from the returned row
+    if (password is not None and not owner_id) or (
+        password is None and db_credentials.user_id != row.user_id
+    ):
+        db_credentials.password_fingerprint = get_credential_password_fingerprint(
+            password or decrypt_credential_password(db_credentials.hashed_password),
+            db_credentials.user_id,
+        )
 
-    db_credentials.sqlmodel_update(credentials_data)
-    save_to_db(session=session, instance=db_credentials, refresh=True)
+    record_credential_change(
+        session=session,
+        credential_id=credential_id,
+        before=CredentialHealth.of(row),
+        after=CredentialHealth.of(db_credentials),
+    )
+    session.commit()
     return db_credentials
 
 
+def delete_credentials(
+    *, session: Session, credential_id: UUID, user_id: UUID | None = None
+) -> bool:
+    """Delete a credential with a single DELETE ... RETURNING statement.
+
+    Returns False when the credential does not exist or, with user_id, does
+    not belong to that user.
+    """
+    statement = (
+        delete(Credentials)
+        .where(Credentials.id == credential_id)
+        .returning(*HEALTH_COLUMNS)
+    )
+    if user_id:
+        statement = statement.where(Credentials.user_id == user_id)
+    row = session.exec(statement).first()
+    if not row:
+        return False
+
+    record_credential_change(
+        session=session,
+        credential_id=credential_id,
+        before=CredentialHealth.of(row),
+        after=None,
+    )
+    session.commit()
+    return True
+
+
 def get_credential_password(
     *, session: Session, user_id: UUID, credential_id: UUID
 ) -> str | None:
@@ -75,3 +188,151 @@ def get_credential_password(
     if not credentials:
         return None
     return decrypt_credential_password(credentials.hashed_password)
+
+
+def search_credentials(
+    *,
+    session: Session,
+    query: str,
+    user_id: UUID | None = None,
+    limit: int = 20,
+    after: tuple[float, UUID] | None = None,
+) -> list[tuple[Credentials, float]]:
+    """Search credentials by title, url and username, best matches first.
+
+    A credential matches when the query is a substring of the search document
+    or is similar enough to one of its words (pg_trgm word similarity). Both
+    conditions are answered by the ix_credentials_search trigram index.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    query -- text to search for
+    user_id -- restrict the search to the credentials of this user
+    limit -- maximum number of results
+    after -- (rank, id) of the last result of the previous page
+    """
+    rank = func.word_similarity(query, credentials_search_document)
+    pattern = (
+        "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    )
+    statement = select(Credentials, rank.label("rank")).where(
+        or_(
+            credentials_search_document.ilike(pattern, escape="\\"),
+            credentials_search_document.self_group().op("%>")(query),
+        )
+    )
+    if user_id:
+        statement = statement.where(Credentials.user_id == user_id)
+    if after:
+        last_rank, last_id = after
+        # word_similarity returns real, compare in the same precision
+        last_rank = cast(last_rank, REAL)
+        statement = statement.where(
+            or_(rank < last_rank, and_(rank == last_rank, Credentials.id > last_id))
+        )
+    statement = statement.order_by(rank.desc(), Credentials.id).limit(limit)
+    return [(credentials, rank) for credentials, rank in session.exec(statement)]
+
+
+def match_credentials(
+    *, session: Session, host: str, user_id: UUID
+) -> list[tuple[Credentials, str]]:
+    """Return the user's credentials for sites sharing the registrable domain of
+    host, best matches first.
+
+    Matches are classified as "exact" (same host), "subdomain" (host is a
+    subdomain of the saved one) or "domain" (only the eTLD+1 is shared).
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    host -- normalized host name, see app.core.urls.normalize_host
+    user_id -- owner of the credentials
+    """
+    statement = select(Credentials).where(
+        Credentials.user_id == user_id,
+        Credentials.registrable_domain == registrable_domain(host),
+    )
+    host_reversed = reverse_host(host)
+    matches = []
+    for credentials in session.exec(statement):
+        if credentials.host_reversed == host_reversed:
+            match = "exact"
+        elif host_reversed.startswith(credentials.host_reversed):
+            match = "subdomain"
+        else:
+            match = "domain"
+        matches.append((credentials, match))
+
+    order = {"exact": 0, "subdomain": 1, "domain": 2}
+    matches.sort(key=lambda item: (order[item[1]], item[0].title))
+    return matches
+
+
+def get_reused_credentials(
+    *, session: Session, user_id: UUID
+) -> list[list[Credentials]]:
+    """Return the user's credentials grouped by shared password.
+
+    Only groups of two or more credentials are returned, largest first.
+    Credentials without a fingerprint (not backfilled yet) are ignored.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    user_id -- owner of the credentials
+    """
+    reused = (
+        select(Credentials.password_fingerprint)
+        .where(
+            Credentials.user_id == user_id,
+            Credentials.password_fingerprint.is_not(None),
+        )
+        .group_by(Credentials.password_fingerprint)
+        .having(func.count() > 1)
+    )
+    statement = (
+        select(Credentials)
+        .where(
+            Credentials.user_id == user_id,
+            Credentials.password_fingerprint.in_(reused),
+        )
+        .order_by(Credentials.password_fingerprint, Credentials.title)
+    )
+    groups: dict[str, list[Credentials]] = {}
+    for credentials in session.exec(statement):
+        groups.setdefault(credentials.password_fingerprint, []).append(credentials)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def backfill_password_fingerprints(
+    *, session: Session, batch_size: int = 500, recompute: bool = False
+) -> int:
+    """Compute missing password fingerprints, returns the number of updated rows.
+
+    Rows are processed in primary key order and committed per batch, so the
+    job can be interrupted and restarted. With recompute every fingerprint is
+    rewritten, which is needed after changing CREDENTIAL_FINGERPRINT_KEY.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    batch_size -- number of credentials decrypted and committed at once
+    recompute -- also rewrite existing fingerprints
+    """
+    updated = 0
+    last_id = None
+    while True:
+        statement = select(Credentials).order_by(Credentials.id).limit(batch_size)
+        if not recompute:
+            statement = statement.where(Credentials.password_fingerprint.is_(None))
+        if last_id:
+            statement = statement.where(Credentials.id > last_id)
+        batch = session.exec(statement).all()
+        if not batch:
+            return updated
+        for credentials in batch:
+            credentials.password_fingerprint = get_credential_password_fingerprint(
+                decrypt_credential_password(credentials.hashed_password),
+                credentials.user_id,
+            )
+        last_id = batch[-1].id
+        session.commit()
+        updated += len(batch)
@@ -0,0 +1,201 @@
+from sqlmodel import Session, select, func, cast, Integer, true
+from sqlalchemy.dialects.postgresql import insert
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from app.core.config import settings
+from app.db.credentials import Credentials
+from app.db.health import VaultHealth, VaultHealthPublic, VaultHealthAdminPublic
+
+
+@dataclass(frozen=True)
+class CredentialHealth:
+    """The attributes of a credential that count towards its vault health.
+
+    Built from a Credentials instance or from any row carrying the same
+    columns, such as the result of an UPDATE/DELETE ... RETURNING.
+    """
+
+    user_id: UUID
+    password_fingerprint: str | None
+    is_weak: bool
+    is_breached: bool
+    password_month: str
+
+    @classmethod
+    def of(cls, credentials: Credentials) -> "CredentialHealth":
+        changed_at = credentials.password_changed_at or credentials.created_at
+        return cls(
+            user_id=credentials.user_id,
+            password_fingerprint=credentials.password_fingerprint,
+            is_weak=credentials.is_weak,
+            is_breached=credentials.is_breached,
+            password_month=changed_at.strftime("%Y-%m"),
+        )
+
+
+def get_vault_health_for_update(*, session: Session, user_id: UUID) -> VaultHealth:
+    """Return the health row of a user, creating it if needed, locked until commit."""
+    session.exec(
+        insert(VaultHealth)
+        .values(user_id=user_id, months={})
+        .on_conflict_do_nothing(index_elements=[VaultHealth.user_id])
+    )
+    statement = (
+        select(VaultHealth)
+        .where(VaultHealth.user_id == user_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return session.exec(statement).one()
+
+
+def count_other_reuses(
+    *, session: Session, credential_id: UUID, health: CredentialHealth
+) -> int:
+    if not health.password_fingerprint:
+        return 0
+    statement = select(func.count()).where(
+        Credentials.user_id == health.user_id,
+        Credentials.password_fingerprint == health.password_fingerprint,
+        Credentials.id != credential_id,
+    )
+    return session.exec(statement).one()
+
+
+def record_credential_change(
+    *,
+    session: Session,
+    credential_id: UUID,
+    before: CredentialHealth | None,
+    after: CredentialHealth | None,
+) -> None:
+    """Apply a credential write to the health counters of its owner(s).
+
+    Runs in the caller's transaction and does not commit. The owner's health
+    row stays locked until then, so concurrent writes to one vault are applied
+    one after the other.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    credential_id -- id of the written credential
+    before -- health of the credential before the write, None when created
+    after -- health of the credential after the write, None when deleted
+    """
+    if before == after:
+        return
+    for health, sign in ((before, -1), (after, 1)):
+        if health is None:
+            continue
+        vault_health = get_vault_health_for_update(
+            session=session, user_id=health.user_id
+        )
+        # A password shared with exactly one other credential makes both of
+        # them reused, with more only this credential changes the count
+        others = count_other_reuses(
+            session=session, credential_id=credential_id, health=health
+        )
+        reused = 2 if others == 1 else 1 if others > 1 else 0
+
+        vault_health.total += sign
+        vault_health.weak += sign * health.is_weak
+        vault_health.breached += sign * health.is_breached
+        vault_health.reused += sign * reused
+        months = dict(vault_health.months)
+        months[health.password_month] = months.get(health.password_month, 0) + sign
+        if not months[health.password_month]:
+            del months[health.password_month]
+        vault_health.months = months
+        session.add(vault_health)
+
+
+def old_password_cutoff() -> str:
+    """First month whose passwords are not considered old."""
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        days=settings.CREDENTIAL_PASSWORD_MAX_AGE_DAYS
+    )
+    return cutoff.strftime("%Y-%m")
+
+
+def get_vault_health(*, session: Session, user_id: UUID) -> VaultHealthPublic:
+    vault_health = session.get(VaultHealth, user_id)
+    if not vault_health:
+        return VaultHealthPublic()
+    cutoff = old_password_cutoff()
+    return VaultHealthPublic(
+        total=vault_health.total,
+        weak=vault_health.weak,
+        reused=vault_health.reused,
+        breached=vault_health.breached,
+        old=sum(
+            count for month, count in vault_health.months.items() if month < cutoff
+        ),
+    )
+
+
+def get_vault_health_summary(*, session: Session) -> VaultHealthAdminPublic:
+    """Sum the health counters of every user."""
+    users, total, weak, reused, breached = session.exec(
+        select(
+            func.count(),
+            func.coalesce(func.sum(VaultHealth.total), 0),
+            func.coalesce(func.sum(VaultHealth.weak), 0),
+            func.coalesce(func.sum(VaultHealth.reused), 0),
+            func.coalesce(func.sum(VaultHealth.breached), 0),
+        ).where(VaultHealth.total > 0)
+    ).one()
+    months = func.jsonb_each_text(VaultHealth.months).table_valued("key", "value")
+    old = session.exec(
+        select(func.coalesce(func.sum(cast(months.c.value, Integer)), 0))
+        .select_from(VaultHealth)
+        .join(months, true())
+        .where(months.c.key < old_password_cutoff())
+    ).one()
+    return VaultHealthAdminPublic(
+        users=users, total=total, weak=weak, reused=reused, breached=breached, old=old
+    )
+
+
+def rebuild_vault_health(*, session: Session, user_id: UUID) -> VaultHealth:
+    """Recompute the health row of a user from its credentials and commit it.
+
+    Used to fill the table for existing vaults and to repair drifted counters.
+    """
+    vault_health = get_vault_health_for_update(session=session, user_id=user_id)
+
+    total, weak, breached = session.exec(
+        select(
+            func.count(),
+            func.count().filter(Credentials.is_weak),
+            func.count().filter(Credentials.is_breached),
+        ).where(Credentials.user_id == user_id)
+    ).one()
+    reuse_groups = (
+        select(func.count().label("size"))
+        .where(
+            Credentials.user_id == user_id,
+            Credentials.password_fingerprint.is_not(None),
+        )
+        .group_by(Credentials.password_fingerprint)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    reused = session.exec(select(func.coalesce(func.sum(reuse_groups.c.size), 0))).one()
+    month = func.to_char(
+        func.coalesce(Credentials.password_changed_at, Credentials.created_at),
+        "YYYY-MM",
+    )
+    months = session.exec(
+        select(month, func.count())
+        .where(Credentials.user_id == user_id)
+        .group_by(month)
+    ).all()
+
+    vault_health.total = total
+    vault_health.weak = weak
+    vault_health.breached = breached
+    vault_health.reused = reused
+    vault_health.months = dict(months)
+    session.add(vault_health)
+    session.commit()
+    return vault_health
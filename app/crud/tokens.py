@@ -0,0 +1,118 @@
+from sqlmodel import Session, select, func, update
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+from app.db.tokens import RevokedToken, RefreshToken
+from app.db.users import User
+from app.core.config import settings
+from app.core.revocation import REVOCATION_CHANNEL, revocation_list
+from app.core.security import create_refresh_token, hash_refresh_token
+
+
+def revoke_token(*, session: Session, jti: str, expires_at: datetime) -> None:
+    """Revoke an access token and notify every worker about it."""
+    statement = (
+        insert(RevokedToken)
+        .values(jti=jti, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+    )
+    session.exec(statement)
+    # NOTIFY is delivered to listeners when the transaction commits
+    session.exec(select(func.pg_notify(REVOCATION_CHANNEL, jti)))
+    session.commit()
+    revocation_list.add(jti)
+
+
+def is_token_revoked(*, session: Session, jti: str) -> bool:
+    """Check whether a token was revoked.
+
+    The in-memory Bloom filter rules out almost every valid token; the table is
+    only queried when the filter reports a possible match.
+    """
+    if not revocation_list.might_be_revoked(jti):
+        return False
+    return session.get(RevokedToken, jti) is not None
+
+
+def issue_refresh_token(
+    *, session: Session, user_id: UUID, family_id: UUID | None = None
+) -> str:
+    """Store a new refresh token and return its plain value.
+
+    The caller is responsible for committing the session.
+    """
+    token = create_refresh_token()
+    db_obj = RefreshToken(
+        user_id=user_id,
+        family_id=family_id or uuid4(),
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.now(timezone.utc)
+        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    session.add(db_obj)
+    return token
+
+
+def revoke_refresh_token_family(*, session: Session, family_id: UUID) -> None:
+    """Revoke every token of a family. The caller commits the session."""
+    statement = (
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+    session.exec(statement)
+
+
+def revoke_user_refresh_tokens(*, session: Session, user_id: UUID) -> None:
+    """Revoke every refresh token of a user. The caller commits the session."""
+    statement = (
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+    session.exec(statement)
+
+
+def get_refresh_token(
+    *, session: Session, token: str, for_update: bool = False
+) -> RefreshToken | None:
+    statement = select(RefreshToken).where(
+        RefreshToken.token_hash == hash_refresh_token(token)
+    )
+    if for_update:
+        statement = statement.with_for_update()
+    return session.exec(statement).first()
+
+
+def rotate_refresh_token(*, session: Session, token: str) -> tuple[User, str] | None:
+    """Exchange a refresh token for a new one of the same family.
+
+    Returns the owner and the new token, or None when the token is unknown,
+    expired, revoked or its owner is inactive. A token that was already used
+    is treated as stolen and its whole family is revoked.
+    """
+    db_token = get_refresh_token(session=session, token=token, for_update=True)
+    if not db_token:
+        return None
+
+    now = datetime.now(timezone.utc)
+    if db_token.used_at or db_token.revoked_at:
+        revoke_refresh_token_family(session=session, family_id=db_token.family_id)
+        session.commit()
+        return None
+    if db_token.expires_at <= now:
+        session.rollback()
+        return None
+
+    user = session.get(User, db_token.user_id)
+    if not user or not user.is_active:
+        session.rollback()
+        return None
+
+    db_token.used_at = now
+    session.add(db_token)
+    new_token = issue_refresh_token(
+        session=session, user_id=user.id, family_id=db_token.family_id
+    )
+    session.commit()
+    return user, new_token
@@ -1,31 +1,181 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone
+from uuid import UUID
 import pyotp
 import io, qrcode
 from app.db.users import User, UserCreate, UserUpdate
+from app.db.credentials import Credentials
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
+from app.core.tracing import span
 from app.crud.base import save_to_db
+from app.crud.tokens import revoke_user_refresh_tokens
 
+# Fields whose change must invalidate access tokens already issued to a user
+TOKEN_VERSION_FIELDS = ("is_active", "is_superuser")
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+token_versions: TTLCache[UUID, int] = TTLCache(
+    maxsize=settings.TOKEN_VERSION_CACHE_SIZE,
+    ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+)
+
+
+def create_user(*, session: Session, user_create: UserCreate) -> User | None:
+    """Insert a new user, returns None if the email is already registered.
+
+    The unique email index decides in a single INSERT ... ON CONFLICT DO
+    NOTHING RETURNING statement, so concurrent signups with the same email
+    can not both succeed.
+    """
     db_obj = User.model_validate(
         user_create,
         update={"hashed_password": get_password_hash(user_create.password)},
     )
-
-    save_to_db(session=session, instance=db_obj, refresh=True)
-    return db_obj
+    statement = (
+        insert(User)
+        .values(**db_obj.model_dump())
+        .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+        .returning(User)
+    )
+    user = session.exec(statement).scalar_one_or_none()
+    session.commit()
+    return user
 
 
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> User:
     user_data = user_in.model_dump(exclude_unset=True)
+    revoke_tokens = any(
+        field in user_data and user_data[field] != getattr(db_user, field)
+        for field in TOKEN_VERSION_FIELDS
+    )
     db_user.sqlmodel_update(user_data)
+    if revoke_tokens:
+        db_user.token_version += 1
+        revoke_user_refresh_tokens(session=session, user_id=db_user.id)
+
+    save_to_db(session=session, instance=db_user)
+    if revoke_tokens:
+        token_versions.pop(db_user.id)
+    return db_user
+
+
+def update_password(*, session: Session, db_user: User, password: str) -> User:
+    """Set a new password and invalidate every token issued before."""
+    user_id = db_user.id
+    db_user.hashed_password = get_password_hash(password)
+    db_user.token_version += 1
+    revoke_user_refresh_tokens(session=session, user_id=user_id)
+
+    save_to_db(session=session, instance=db_user)
+    token_versions.pop(user_id)
+    return db_user
+
 
-    save_to_db(session=session, instance=db_user, refresh=True)
+def request_user_deletion(*, session: Session, db_user: User) -> User:
+    """Mark a user for deletion by the purge worker and lock them out now."""
+    user_id = db_user.id
+    db_user.deletion_requested_at = datetime.now(timezone.utc)
+    db_user.is_active = False
+    db_user.token_version += 1
+    revoke_user_refresh_tokens(session=session, user_id=user_id)
+
+    save_to_db(session=session, instance=db_user)
+    token_versions.pop(user_id)
     return db_user
 
 
+def purge_user(*, session: Session, user_id: UUID, batch_size: int = 1000) -> int:
+    """Delete a user pending deletion, returns the number of deleted credentials.
+
+    Credentials are deleted batch_size rows per transaction so no lock is
+    held for long, then the user row is removed and the database cascades
+    to the remaining dependent rows. An interrupted purge resumes where it
+    stopped.
+
+    Keyword arguments:
+    session -- SQLAlchemy session
+    user_id -- id of a user whose deletion was requested
+    batch_size -- number of credentials deleted per transaction
+    """
+    pending = select(User.id).where(
+        User.id == user_id, User.deletion_requested_at.is_not(None)
+    )
+    if not session.exec(pending).first():
+        return 0
+
+    deleted = 0
+    while True:
+        batch = (
+            select(Credentials.id)
+            .where(Credentials.user_id == user_id)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = session.exec(
+            delete(Credentials)
+            .where(Credentials.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    session.exec(
+        delete(User)
+        .where(User.id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    token_versions.pop(user_id)
+    return deleted
+
+
+def purge_pending_users(*, session: Session, batch_size: int = 1000) -> int:
+    """Purge every user pending deletion, oldest request first."""
+    statement = (
+        select(User.id)
+        .where(User.deletion_requested_at.is_not(None))
+        .order_by(User.deletion_requested_at)
+    )
+    user_ids = session.exec(statement).all()
+    for user_id in user_ids:
+        purge_user(session=session, user_id=user_id, batch_size=batch_size)
+    return len(user_ids)
+
+
+def get_pending_deletions(*, session: Session) -> list[tuple[User, int]]:
+    """Return users pending deletion with their number of remaining credentials."""
+    statement = (
+        select(User, func.count(Credentials.id))
+        .outerjoin(Credentials, Credentials.user_id == User.id)
+        .where(User.deletion_requested_at.is_not(None))
+        .group_by(User.id)
+        .order_by(User.deletion_requested_at)
+    )
+    return [(user, count) for user, count in session.exec(statement)]
+
+
+def get_token_version(*, session: Session, user_id: UUID) -> int | None:
+    """Return the token version of a user or None if the user does not exist.
+
+    Versions are cached per worker for TOKEN_VERSION_CACHE_TTL_SECONDS, so a
+    bump made by another worker is seen at the latest after that delay.
+    """
+    token_version = token_versions.get(user_id)
+    if token_version is None:
+        statement = select(User.token_version).where(User.id == user_id)
+        token_version = session.exec(statement).first()
+        if token_version is None:
+            return None
+        token_versions.set(user_id, token_version)
+    return token_version
+
+
 def get_user_by_email(*, session: Session, email: str) -> User | None:
-    statement = select(User).where(User.email == email)
+    statement = select(User).where(func.lower(User.email) == func.lower(email))
     session_user = session.exec(statement).first()
     return session_user
 
@@ -40,9 +190,10 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
 
 
 def create_totp_qr(*, user: User, issuer_name: str):
-    totp = pyotp.TOTP(user.otp_secret)
-    uri = totp.provisioning_uri(name=user.username, issuer_name=issuer_name)
-    img = qrcode.make(uri)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+    with span("create_totp_qr"):
+        totp = pyotp.TOTP(user.otp_secret)
+        uri = totp.provisioning_uri(name=user.username, issuer_name=issuer_name)
+        img = qrcode.make(uri)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return buf.getvalue()
@@ -1,5 +1,7 @@
 from sqlmodel import SQLModel, Field, Relationship, Column, TIMESTAMP, func
+from sqlalchemy import DDL, Index, event, literal_column
 from datetime import datetime, timezone
+from typing import Literal
 import uuid
 
 
@@ -35,9 +37,55 @@ class CredentialsPublic(SQLModel):
     data: list[CredentialPublic]
 
 
+class CredentialSearchResult(SQLModel):
+    id: uuid.UUID
+    title: str
+    url: str | None
+    username: str
+    rank: float
+
+
+class CredentialAdminSearchResult(CredentialSearchResult):
+    user_id: uuid.UUID
+
+
+class CredentialsSearchPublic(SQLModel):
+    data: list[CredentialSearchResult]
+    next_cursor: str | None
+
+
+class CredentialsAdminSearchPublic(SQLModel):
+    data: list[CredentialAdminSearchResult]
+    next_cursor: str | None
+
+
+class CredentialMatch(SQLModel):
+    id: uuid.UUID
+    title: str
+    url: str | None
+    username: str
+    match: Literal["exact", "subdomain", "domain"]
+
+
+class CredentialsMatchPublic(SQLModel):
+    data: list[CredentialMatch]
+
+
+class CredentialReuseGroup(SQLModel):
+    count: int
+    data: list[CredentialPublic]
+
+
+class CredentialsReusePublic(SQLModel):
+    count: int
+    data: list[CredentialReuseGroup]
+
+
 class CredentialDetail(CredentialsBase):
     id: uuid.UUID
     username: str
+    is_breached: bool
+    is_weak: bool
     created_at: datetime
     updated_at: datetime | None
 
@@ -54,10 +102,60 @@ class Credentials(CredentialsBase, table=True):
     user: "User" = Relationship(back_populates="credentials")
     username: str
     hashed_password: str
+    # Derived from url on write, see app.core.urls
+    host_reversed: str | None = Field(default=None, max_length=255)
+    registrable_domain: str | None = Field(default=None, max_length=255)
+    # HMAC of the password, equal for reused passwords within a vault
+    password_fingerprint: str | None = Field(default=None, max_length=64)
+    is_breached: bool = Field(default=False)
+    is_weak: bool = Field(default=False)
+    password_changed_at: datetime | None = Field(default=None)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime | None = Field(
         default=None, sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)}
     )
 
 
+Index(
+    "ix_credentials_user_id_registrable_domain",
+    Credentials.__table__.c.user_id,
+    Credentials.__table__.c.registrable_domain,
+)
+
+Index(
+    "ix_credentials_user_id_password_fingerprint",
+    Credentials.__table__.c.user_id,
+    Credentials.__table__.c.password_fingerprint,
+)
+
+# Text matched by credential search. The trigram index below is built on this
+# exact expression, queries must use it unchanged for the index to apply.
+credentials_search_document = (
+    func.coalesce(Credentials.title, literal_column("''"))
+    + literal_column("' '")
+    + func.coalesce(Credentials.url, literal_column("''"))
+    + literal_column("' '")
+    + Credentials.username
+)
+
+# btree_gin lets user_id live in the same GIN index, so both per-user and
+# cross-tenant searches are served by it
+Index(
+    "ix_credentials_search",
+    Credentials.__table__.c.user_id,
+    credentials_search_document.label("search_document"),
+    postgresql_using="gin",
+    postgresql_ops={"search_document": "gin_trgm_ops"},
+)
+
+event.listen(
+    SQLModel.metadata,
+    "before_create",
+    DDL(
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm; "
+        "CREATE EXTENSION IF NOT EXISTS btree_gin"
+    ),
+)
+
+
 from app.db.users import User
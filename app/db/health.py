@@ -0,0 +1,36 @@
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy.dialects.postgresql import JSONB
+import uuid
+
+
+class VaultHealth(SQLModel, table=True):
+    """Per-user credential health counters, kept up to date on every write.
+
+    months counts credentials by the month their password was last changed
+    ("YYYY-MM"), so the number of old passwords can be derived for any age
+    without scanning the vault.
+    """
+
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", primary_key=True, ondelete="CASCADE"
+    )
+    total: int = Field(default=0)
+    weak: int = Field(default=0)
+    reused: int = Field(default=0)
+    breached: int = Field(default=0)
+    months: dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSONB, nullable=False, server_default="{}"),
+    )
+
+
+class VaultHealthPublic(SQLModel):
+    total: int = 0
+    weak: int = 0
+    reused: int = 0
+    breached: int = 0
+    old: int = 0
+
+
+class VaultHealthAdminPublic(VaultHealthPublic):
+    users: int = 0
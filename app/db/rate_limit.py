@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field, DateTime
+from datetime import datetime
+
+
+class RateLimitBucket(SQLModel, table=True):
+    """Token bucket shared between workers by the postgres rate limit backend."""
+
+    key: str = Field(primary_key=True, max_length=255)
+    tokens: float
+    allowed: bool = Field(default=True)
+    updated_at: datetime = Field(sa_type=DateTime(timezone=True), index=True)
@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field, DateTime
+from datetime import datetime, timezone
+import uuid
+
+
+class RevokedToken(SQLModel, table=True):
+    """Access token revoked before its expiry, kept until it would have expired."""
+
+    jti: str = Field(primary_key=True, max_length=64)
+    expires_at: datetime = Field(sa_type=DateTime(timezone=True), index=True)
+
+
+class RefreshToken(SQLModel, table=True):
+    """Opaque refresh token, stored hashed.
+
+    Every refresh rotates the token: the used one is marked and a new one is
+    issued in the same family. Presenting a used token again revokes the
+    whole family.
+    """
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    family_id: uuid.UUID = Field(index=True)
+    token_hash: str = Field(max_length=64, unique=True, index=True)
+    expires_at: datetime = Field(sa_type=DateTime(timezone=True))
+    used_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+    revoked_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
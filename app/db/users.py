@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship, Column, TIMESTAMP, func
+from sqlalchemy import Index
 from datetime import datetime, timezone
 from pydantic import EmailStr
 import uuid
@@ -6,7 +7,8 @@ import uuid
 
 class UserBase(SQLModel):
     username: str
-    email: EmailStr = Field(unique=True, index=True, max_length=255)
+    # Unique regardless of case through ix_user_email_lower below
+    email: EmailStr = Field(max_length=255)
     is_active: bool = Field(default=False)
     is_superuser: bool = Field(default=False)
 
@@ -47,12 +49,19 @@ class User(UserBase, table=True):
     hashed_password: str
     otp_secret: str | None = Field(default=None)
     is_otp: bool = Field(default=False)
+    token_version: int = Field(default=0)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime | None = Field(
         default=None, sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)}
     )
-    credentials: list["Credentials"] = Relationship(back_populates="user")
+    # Credentials are removed in batches by the purge worker or by the
+    # database cascade, never loaded just to be deleted
+    credentials: list["Credentials"] = Relationship(
+        back_populates="user", passive_deletes="all"
+    )
     last_login: datetime | None = Field(default=None)
+    # Set when deletion was requested, the purge worker removes the user later
+    deletion_requested_at: datetime | None = Field(default=None, index=True)
 
 
 class UserPublic(SQLModel):
@@ -76,10 +85,27 @@ class AdminPublic(UserBase):
     is_otp: bool
 
 
+class UserDeletionStatus(SQLModel):
+    id: uuid.UUID
+    email: EmailStr
+    deletion_requested_at: datetime
+    remaining_credentials: int
+
+
+class UserDeletionsPublic(SQLModel):
+    data: list[UserDeletionStatus]
+    count: int
+
+
 class UserSignUpResponse(UserPublic):
     message: str = Field(
         default="User created successfully and sending activation email. Please check your inbox."
     )
 
 
+# Emails are stored as entered and compared case-insensitively. Lookups must
+# use lower(email) to be served by this index, see crud.users.get_user_by_email
+Index("ix_user_email_lower", func.lower(User.__table__.c.email), unique=True)
+
+
 from app.db.credentials import Credentials
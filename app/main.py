@@ -1,6 +1,15 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.routing import APIRoute
 from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import MetricsMiddleware, register_pool_metrics, registry
+from app.core.profiling import ProfilingMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.tracing import TracingMiddleware
+from app.core.revocation import revocation_list
 from app.api import main
 
 
@@ -8,13 +17,38 @@ def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    if settings.TOKEN_REVOCATION_LISTENER_ENABLED:
+        revocation_list.start(engine)
+    yield
+    revocation_list.stop()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 app.include_router(
     main.api_router,
     prefix=settings.API_V1_STR,
 )
+
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TracingMiddleware)
+
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
+if settings.METRICS_ENABLED:
+    register_pool_metrics(engine)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", tags=["metrics"], include_in_schema=False)
+    def metrics() -> PlainTextResponse:
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 
 
@@ -5,3 +6,47 @@ class ChangePassword(BaseModel):
     new_password: str = Field(
         min_length=8, max_length=40, description="New password for the user."
     )
+
+
+class RateLimitCounters(BaseModel):
+    """Schema for the allowed/rejected counters of a rate limit scope."""
+
+    allowed: int = 0
+    rejected: int = 0
+
+
+class CacheStats(BaseModel):
+    """Schema for the counters of a per-worker cache."""
+
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class ProfileInfo(BaseModel):
+    """Schema for a saved request profile."""
+
+    name: str
+    size: int
+    created_at: datetime
+
+
+class ProfilesPublic(BaseModel):
+    data: list[ProfileInfo]
+    count: int
+
+
+class SlowQuery(BaseModel):
+    """Schema for a statement of the slow query log, aggregated."""
+
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    routes: list[str]
+    last_seen: datetime
+    explain: str | None = None
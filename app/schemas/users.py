@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
+import uuid
 
 
 class PasswordResetRequest(BaseModel):
@@ -27,13 +28,24 @@ class Token(BaseModel):
 
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+
+class RefreshTokenRequest(BaseModel):
+    """Schema for refresh token grant."""
+
+    refresh_token: str
 
 
 class TokenPayload(BaseModel):
     """Schema for token payload."""
 
-    sub: str
+    sub: uuid.UUID
     exp: int
+    is_superuser: bool
+    is_active: bool
+    token_version: int
+    jti: str
 
 
 class NewPassword(BaseModel):
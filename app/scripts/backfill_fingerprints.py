@@ -0,0 +1,32 @@
+import argparse
+import logging
+from sqlmodel import Session
+from app.core.db import engine
+from app.crud import credentials as crud_credentials
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compute password fingerprints of existing credentials."
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--recompute",
+        action="store_true",
+        help="rewrite every fingerprint, e.g. after changing the fingerprint key",
+    )
+    args = parser.parse_args()
+
+    logger.info("Backfilling credential password fingerprints")
+    with Session(engine) as session:
+        updated = crud_credentials.backfill_password_fingerprints(
+            session=session, batch_size=args.batch_size, recompute=args.recompute
+        )
+    logger.info("Updated %d credentials", updated)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Convert a HIBP style SHA-1 password list into a breach index file.
+
+Input lines are ``<40 hex chars>[:<count>]``, as in the Pwned Passwords
+downloads; other lines are skipped. The list does not need to be sorted:
+digests are sorted in memory bounded runs and merged, so any input size can
+be converted with constant memory.
+
+Usage: python -m app.scripts.build_breach_index pwned-passwords-sha1.txt breach.idx
+"""
+
+import argparse
+import heapq
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from typing import BinaryIO
+from app.core.breach import DIGEST_SIZE, MAGIC
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_digests(lines: Iterator[bytes], min_count: int = 1) -> Iterator[bytes]:
+    for line in lines:
+        hex_digest, _, count = line.strip().partition(b":")
+        if len(hex_digest) != DIGEST_SIZE * 2:
+            continue
+        try:
+            digest = bytes.fromhex(hex_digest.decode("ascii"))
+            if count and int(count) < min_count:
+                continue
+        except ValueError:
+            continue
+        yield digest
+
+
+def read_run(file: BinaryIO) -> Iterator[bytes]:
+    while digest := file.read(DIGEST_SIZE):
+        yield digest
+
+
+def write_sorted_runs(
+    digests: Iterator[bytes], run_size: int, directory: str
+) -> list[BinaryIO]:
+    runs = []
+    chunk: list[bytes] = []
+    for digest in digests:
+        chunk.append(digest)
+        if len(chunk) >= run_size:
+            runs.append(write_run(chunk, directory))
+            chunk = []
+    if chunk or not runs:
+        runs.append(write_run(chunk, directory))
+    return runs
+
+
+def write_run(chunk: list[bytes], directory: str) -> BinaryIO:
+    chunk.sort()
+    run = tempfile.TemporaryFile(dir=directory)
+    run.write(b"".join(chunk))
+    run.seek(0)
+    return run
+
+
+def build_index(
+    source: str, destination: str, *, min_count: int = 1, run_size: int = 5_000_000
+) -> int:
+    """Write the breach index of ``source`` to ``destination``.
+
+    Returns the number of unique digests written. The file is written next to
+    ``destination`` and renamed into place, so running workers never see a
+    partial index.
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    with open(source, "rb") as lines:
+        runs = write_sorted_runs(parse_digests(lines, min_count), run_size, directory)
+
+    count = 0
+    previous = None
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as output:
+        output.write(MAGIC)
+        for digest in heapq.merge(*(read_run(run) for run in runs)):
+            if digest != previous:
+                output.write(digest)
+                count += 1
+                previous = digest
+    for run in runs:
+        run.close()
+    os.replace(output.name, destination)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="SHA-1 password list")
+    parser.add_argument("destination", help="breach index file to write")
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=1,
+        help="skip passwords seen fewer times than this in breaches",
+    )
+    parser.add_argument(
+        "--run-size",
+        type=int,
+        default=5_000_000,
+        help="digests sorted in memory at once (about 70 bytes each)",
+    )
+    args = parser.parse_args()
+
+    logger.info("Building breach index from %s", args.source)
+    count = build_index(
+        args.source,
+        args.destination,
+        min_count=args.min_count,
+        run_size=args.run_size,
+    )
+    logger.info("Wrote %d digests to %s", count, args.destination)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import logging
+import time
+from sqlmodel import Session
+from app.core.db import engine
+from app.crud import users as crud_users
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Delete users whose deletion was requested."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="credentials deleted per transaction",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0,
+        help="keep running and check for pending users every INTERVAL seconds",
+    )
+    args = parser.parse_args()
+
+    while True:
+        with Session(engine) as session:
+            purged = crud_users.purge_pending_users(
+                session=session, batch_size=args.batch_size
+            )
+        if purged:
+            logger.info("Purged %d users", purged)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
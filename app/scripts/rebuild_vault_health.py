@@ -0,0 +1,59 @@
+import argparse
+import logging
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.core.security import decrypt_credential_password, is_weak_password
+from app.crud import health as crud_health
+from app.db.credentials import Credentials
+from app.db.users import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def recompute_weak_flags(*, session: Session, batch_size: int) -> int:
+    updated = 0
+    last_id = None
+    while True:
+        statement = select(Credentials).order_by(Credentials.id).limit(batch_size)
+        if last_id:
+            statement = statement.where(Credentials.id > last_id)
+        batch = session.exec(statement).all()
+        if not batch:
+            return updated
+        for credentials in batch:
+            credentials.is_weak = is_weak_password(
+                decrypt_credential_password(credentials.hashed_password)
+            )
+        last_id = batch[-1].id
+        session.commit()
+        updated += len(batch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Recompute the vault health counters of every user."
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--recompute-weak",
+        action="store_true",
+        help="decrypt every credential to refresh its is_weak flag first",
+    )
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        if args.recompute_weak:
+            logger.info("Recomputing weak password flags")
+            updated = recompute_weak_flags(session=session, batch_size=args.batch_size)
+            logger.info("Checked %d credentials", updated)
+
+        user_ids = session.exec(select(User.id)).all()
+        logger.info("Rebuilding vault health of %d users", len(user_ids))
+        for user_id in user_ids:
+            crud_health.rebuild_vault_health(session=session, user_id=user_id)
+    logger.info("Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Bulk load synthetic users and credentials for performance testing.
+
+Password hashes and credential ciphertexts are computed once for a small pool
+and shared by the generated rows, and rows are streamed to Postgres with
+COPY, so millions of credentials load in minutes. Vault sizes follow the
+chosen distribution, e.g. lognormal for a long tail of large vaults. The
+vault health rows are computed along the way.
+
+The same --seed always produces the same ids, emails, titles, urls, vault
+sizes and password assignments; bcrypt salts and Fernet IVs stay random.
+Every user logs in with --user-password.
+
+Usage: python -m app.scripts.seed --users 100000 --mean-credentials 40
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import math
+import random
+import string
+import time
+import uuid
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from sqlalchemy import Engine
+from app.core.breach import is_breached_password
+from app.core.db import engine
+from app.core.security import (
+    get_credential_password_fingerprint,
+    get_credential_password_hash,
+    get_password_hash,
+    is_weak_password,
+)
+from app.core.urls import url_match_columns
+from app.db.credentials import Credentials
+from app.db.health import VaultHealth
+from app.db.users import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "pareto")
+PARETO_ALPHA = 1.5
+HISTORY_DAYS = 3 * 365
+WORDS = (
+    "mail", "bank", "shop", "cloud", "news", "social", "music", "video",
+    "games", "travel", "health", "work", "school", "forum", "photos", "store",
+)  # fmt: skip
+
+
+@dataclass(frozen=True)
+class PoolPassword:
+    ciphertext: str
+    plaintext: str
+    is_weak: bool
+    is_breached: bool
+
+
+def vault_size(rng: random.Random, distribution: str, mean: float, maximum: int) -> int:
+    """Number of credentials of one user, averaging about ``mean``."""
+    if distribution == "fixed":
+        size = mean
+    elif distribution == "uniform":
+        size = rng.uniform(0, 2 * mean)
+    elif distribution == "lognormal":
+        sigma = 1.0
+        size = rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+    elif distribution == "pareto":
+        size = (
+            rng.paretovariate(PARETO_ALPHA) * mean * (PARETO_ALPHA - 1) / PARETO_ALPHA
+        )
+    else:
+        raise ValueError(f"Unknown distribution {distribution}")
+    return min(maximum, round(size))
+
+
+def random_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def make_password_pool(rng: random.Random, size: int) -> list[PoolPassword]:
+    """Encrypt ``size`` passwords once, a fifth of them weak."""
+    pool = []
+    for i in range(size):
+        if i % 5 == 0:
+            plaintext = rng.choice(WORDS) + str(rng.randrange(100))
+        else:
+            alphabet = string.ascii_letters + string.digits + string.punctuation
+            plaintext = "".join(rng.choices(alphabet, k=16))
+        pool.append(
+            PoolPassword(
+                ciphertext=get_credential_password_hash(plaintext),
+                plaintext=plaintext,
+                is_weak=is_weak_password(plaintext),
+                is_breached=is_breached_password(plaintext),
+            )
+        )
+    return pool
+
+
+def csv_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def copy_rows(
+    connection, table: Any, rows: Iterable[dict[str, Any]], batch_size: int
+) -> int:
+    """COPY ``rows`` into ``table`` in batches, committing after each one.
+
+    Columns missing from a row are loaded as NULL.
+    """
+    columns = [column.name for column in table.__table__.columns]
+    statement = (
+        f'COPY "{table.__tablename__}" ({", ".join(columns)}) '
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    count = 0
+    buffer = io.StringIO()
+    # Quoted empty strings stay strings, unquoted empty fields are NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+
+    def flush() -> None:
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(statement, buffer)
+        connection.commit()
+        buffer.seek(0)
+        buffer.truncate()
+
+    for row in rows:
+        writer.writerow([csv_value(row.get(column)) for column in columns])
+        count += 1
+        if count % batch_size == 0:
+            flush()
+    if buffer.tell():
+        flush()
+    return count
+
+
+def generate(
+    *,
+    seed: int,
+    users: int,
+    distribution: str,
+    mean_credentials: float,
+    max_credentials: int,
+    user_password: str,
+    hash_pool_size: int,
+    password_pool_size: int,
+) -> tuple[list[dict], Iterator[dict], list[dict]]:
+    """Rows of the users, their credentials and their vault health.
+
+    Credentials are generated lazily; the health rows are complete once the
+    credentials iterator is exhausted.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    hashes = [get_password_hash(user_password) for _ in range(hash_pool_size)]
+    pool = make_password_pool(rng, password_pool_size)
+
+    user_rows = []
+    for i in range(users):
+        created_at = now - timedelta(days=rng.uniform(0, HISTORY_DAYS))
+        user_rows.append(
+            {
+                "id": random_uuid(rng),
+                "username": f"seed{seed}-{i}",
+                "email": f"seed{seed}-{i}@example.com",
+                "hashed_password": hashes[i % len(hashes)],
+                "is_active": True,
+                "is_superuser": False,
+                "is_otp": False,
+                "token_version": 0,
+                "created_at": created_at,
+                "_vault_size": vault_size(
+                    rng, distribution, mean_credentials, max_credentials
+                ),
+            }
+        )
+    health_rows: list[dict] = []
+
+    def credential_rows() -> Iterator[dict]:
+        for user in user_rows:
+            user_id = user["id"]
+            passwords: Counter[str] = Counter()
+            months: Counter[str] = Counter()
+            weak = breached = 0
+            for j in range(user["_vault_size"]):
+                index = rng.randrange(len(pool))
+                password = pool[index]
+                site = f"{rng.choice(WORDS)}{rng.randrange(10_000)}"
+                url = f"https://login.{site}.com"
+                age = (now - user["created_at"]).total_seconds()
+                created_at = user["created_at"] + timedelta(seconds=rng.uniform(0, age))
+                # Reuse follows the fingerprint, the pool may repeat a plaintext
+                passwords[password.plaintext] += 1
+                months[created_at.strftime("%Y-%m")] += 1
+                weak += password.is_weak
+                breached += password.is_breached
+                yield {
+                    "id": random_uuid(rng),
+                    "user_id": user_id,
+                    "title": f"{site} {j}",
+                    "url": url,
+                    "username": user["email"],
+                    "hashed_password": password.ciphertext,
+                    **url_match_columns(url),
+                    "password_fingerprint": get_credential_password_fingerprint(
+                        password.plaintext, user_id
+                    ),
+                    "is_breached": password.is_breached,
+                    "is_weak": password.is_weak,
+                    "password_changed_at": created_at,
+                    "created_at": created_at,
+                }
+            health_rows.append(
+                {
+                    "user_id": user_id,
+                    "total": user["_vault_size"],
+                    "weak": weak,
+                    "breached": breached,
+                    "reused": sum(n for n in passwords.values() if n > 1),
+                    "months": dict(months),
+                }
+            )
+
+    return user_rows, credential_rows(), health_rows
+
+
+def seed_database(
+    *,
+    engine: Engine,
+    seed: int,
+    users: int,
+    distribution: str = "lognormal",
+    mean_credentials: float = 40,
+    max_credentials: int = 5_000,
+    user_password: str = "seed-password",
+    hash_pool_size: int = 8,
+    password_pool_size: int = 1_000,
+    batch_size: int = 50_000,
+) -> tuple[int, int]:
+    """Load the generated rows through ``engine``; returns the number of users
+    and credentials created."""
+    user_rows, credential_rows, health_rows = generate(
+        seed=seed,
+        users=users,
+        distribution=distribution,
+        mean_credentials=mean_credentials,
+        max_credentials=max_credentials,
+        user_password=user_password,
+        hash_pool_size=hash_pool_size,
+        password_pool_size=password_pool_size,
+    )
+    connection = engine.raw_connection()
+    try:
+        copy_rows(connection, User, user_rows, batch_size)
+        credentials = copy_rows(connection, Credentials, credential_rows, batch_size)
+        copy_rows(connection, VaultHealth, health_rows, batch_size)
+    finally:
+        connection.close()
+    return len(user_rows), credentials
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--distribution",
+        choices=DISTRIBUTIONS,
+        default="lognormal",
+        help="distribution of the number of credentials per user",
+    )
+    parser.add_argument("--mean-credentials", type=float, default=40)
+    parser.add_argument("--max-credentials", type=int, default=5_000)
+    parser.add_argument("--user-password", default="seed-password")
+    parser.add_argument(
+        "--hash-pool-size", type=int, default=8, help="bcrypt hashes to compute"
+    )
+    parser.add_argument(
+        "--password-pool-size",
+        type=int,
+        default=1_000,
+        help="distinct credential passwords to encrypt",
+    )
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    logger.info("Seeding %d users with seed %d", args.users, args.seed)
+    start = time.perf_counter()
+    users, credentials = seed_database(
+        engine=engine,
+        seed=args.seed,
+        users=args.users,
+        distribution=args.distribution,
+        mean_credentials=args.mean_credentials,
+        max_credentials=args.max_credentials,
+        user_password=args.user_password,
+        hash_pool_size=args.hash_pool_size,
+        password_pool_size=args.password_pool_size,
+        batch_size=args.batch_size,
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Created %d users and %d credentials in %.1fs (%.0f rows/s)",
+        users,
+        credentials,
+        elapsed,
+        (users + credentials) / elapsed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import pytest
 from sqlmodel import Session, select
 import uuid
 from fastapi.testclient import TestClient
@@ -6,6 +7,7 @@ from app.tests.utils.user import create_random_user
 from app.core.config import settings
 from app.crud import credentials as crud_credentials
 from app.db.credentials import Credentials
+from app.tests.utils.credentials import MALFORMED_CURSORS
 
 
 def test_get_credentials(
@@ -332,3 +334,65 @@ def test_delete_credential_permission_denied(
 
     assert r.status_code == 403
     assert response["detail"] == "The user doesn't have enough privileges"
+
+
+def test_search_credentials(
+    client: TestClient,
+    db: Session,
+    credential: Credentials,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/credentials/search",
+        headers=superuser_token_headers,
+        params={"q": credential.title[:10], "user_id": str(credential.user_id)},
+    )
+    response = r.json()
+
+    assert r.status_code == 200
+    assert [item["id"] for item in response["data"]] == [str(credential.id)]
+    assert response["data"][0]["user_id"] == str(credential.user_id)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/credentials/search",
+        headers=superuser_token_headers,
+        params={"q": credential.title[:10], "user_id": str(uuid.uuid4())},
+    )
+    assert r.json()["data"] == []
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", *MALFORMED_CURSORS])
+def test_search_credentials_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], cursor: str
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/credentials/search",
+        headers=superuser_token_headers,
+        params={"q": "mail", "cursor": cursor},
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_read_vault_health_summary(
+    client: TestClient,
+    credential: Credentials,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/credentials/health",
+        headers=superuser_token_headers,
+    )
+    response = r.json()
+
+    assert r.status_code == 200
+    assert response["users"] == 1
+    assert response["total"] == 1
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/credentials/health/{credential.user_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["total"] == 1
@@ -0,0 +1,132 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.core.config import settings
+
+
+def test_profile_request(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path
+) -> None:
+    with patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me",
+            headers={**superuser_token_headers, "X-Profile": "1"},
+        )
+        assert r.status_code == 200
+        name = r.headers["x-profile-id"]
+        assert "users-read_user" in name
+
+        r = client.get(
+            f"{settings.API_V1_STR}/admin/profiles/", headers=superuser_token_headers
+        )
+        assert r.status_code == 200
+        assert r.json()["count"] == 1
+        assert r.json()["data"][0]["name"] == name
+
+        r = client.get(
+            f"{settings.API_V1_STR}/admin/profiles/{name}",
+            headers=superuser_token_headers,
+        )
+        assert r.status_code == 200
+        # Collapsed stacks: "outer;inner count"
+        for line in r.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack and int(count) > 0
+
+
+def test_profile_request_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str], tmp_path
+) -> None:
+    with patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me",
+            headers={**normal_user_token_headers, "X-Profile": "1"},
+        )
+
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profile_retention(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path
+) -> None:
+    with (
+        patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)),
+        patch("app.core.config.settings.PROFILE_MAX_FILES", 2),
+    ):
+        for _ in range(3):
+            client.get(
+                f"{settings.API_V1_STR}/users/me",
+                headers={**superuser_token_headers, "X-Profile": "1"},
+            )
+
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_download_profile_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path
+) -> None:
+    with patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)):
+        r = client.get(
+            f"{settings.API_V1_STR}/admin/profiles/..%2Fsecret.folded",
+            headers=superuser_token_headers,
+        )
+
+    assert r.status_code == 404
+
+
+def test_read_profiles_permission_denied(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/profiles/", headers=normal_user_token_headers
+    )
+
+    assert r.status_code == 403
+    assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_memory_profile_request(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path
+) -> None:
+    with patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me",
+            headers={**superuser_token_headers, "X-Profile": "memory"},
+        )
+
+    assert r.status_code == 200
+    assert "-memory-" in r.headers["x-profile-id"]
+    assert int(r.headers["x-profile-peak-memory"]) > 0
+    # Collapsed stacks of allocation sites: "outer;inner bytes"
+    for line in (tmp_path / r.headers["x-profile-id"]).read_text().splitlines():
+        stack, size = line.rsplit(" ", 1)
+        assert stack and int(size) > 0
+
+
+def test_read_profiles_file_deleted_while_listing(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path
+) -> None:
+    (tmp_path / "kept.folded").write_text("main 1\n")
+    (tmp_path / "deleted.folded").write_text("main 1\n")
+    stat = Path.stat
+
+    # Another worker's retention deletes the file right after it was seen
+    def stat_then_delete(path, *args, **kwargs):
+        result = stat(path, *args, **kwargs)
+        if path.name == "deleted.folded":
+            os.unlink(path)
+        return result
+
+    with (
+        patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)),
+        patch.object(Path, "stat", stat_then_delete),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/admin/profiles/", headers=superuser_token_headers
+        )
+
+    assert r.status_code == 200
+    assert "kept.folded" in [profile["name"] for profile in r.json()["data"]]
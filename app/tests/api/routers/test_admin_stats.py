@@ -0,0 +1,134 @@
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.api.dependencies import decode_token_payload
+from app.core.slow_queries import redact_plan
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def test_read_rate_limit_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    email = random_email()
+    with patch("app.core.config.settings.LOGIN_RATE_LIMIT_EMAIL_CAPACITY", 1):
+        for _ in range(2):
+            data = {"username": email, "password": random_lower_string()}
+            client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/stats/rate-limits",
+        headers=superuser_token_headers,
+    )
+    stats = r.json()
+
+    assert r.status_code == 200
+    # superuser login and the first attempt pass, the second one is throttled
+    assert stats["login"]["allowed"] == 2
+    assert stats["login"]["rejected"] == 1
+
+
+def test_read_rate_limit_stats_permission_denied(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/stats/rate-limits",
+        headers=normal_user_token_headers,
+    )
+
+    assert r.status_code == 403
+    assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_read_cache_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    with patch(
+        "app.api.dependencies.decode_token_payload",
+        wraps=decode_token_payload,
+    ) as decode:
+        for _ in range(3):
+            r = client.get(
+                f"{settings.API_V1_STR}/admin/stats/caches",
+                headers=superuser_token_headers,
+            )
+            assert r.status_code == 200
+
+    stats = r.json()
+
+    assert decode.call_count == 1
+    assert stats["token_payloads"]["hits"] == 2
+    assert stats["token_payloads"]["misses"] == 1
+    assert stats["token_versions"]["hits"] >= 2
+
+
+def test_read_slow_queries(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path
+) -> None:
+    log_path = tmp_path / "slow_queries.log"
+    with (
+        patch("app.core.config.settings.SLOW_QUERY_LOG_PATH", str(log_path)),
+        patch("app.core.config.settings.SLOW_QUERY_THRESHOLD_MS", 0),
+        patch("app.core.config.settings.SLOW_QUERY_EXPLAIN", True),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/admin/users/", headers=superuser_token_headers
+        )
+        assert r.status_code == 200
+        r = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={
+                "username": settings.FIRST_SUPERUSER_EMAIL,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            },
+        )
+        assert r.status_code == 200
+
+        r = client.get(
+            f"{settings.API_V1_STR}/admin/stats/slow-queries",
+            headers=superuser_token_headers,
+        )
+
+    assert r.status_code == 200
+    queries = r.json()
+    users = [
+        q
+        for q in queries
+        if "admin:users-read_users" in q["routes"] and 'FROM "user"' in q["statement"]
+    ]
+    assert users
+    assert all("Execution Time" in q["explain"] for q in users)
+    # The email bound to the login lookup is redacted from its plan
+    lookups = [q for q in queries if "lower(" in q["statement"] and q["explain"]]
+    assert lookups
+    assert all("= '?'::text" in q["explain"] for q in lookups)
+    log = log_path.read_text()
+    assert settings.FIRST_SUPERUSER_EMAIL not in log
+    assert settings.FIRST_SUPERUSER_EMAIL.lower() not in log
+
+
+def test_redact_plan() -> None:
+    plan = redact_plan(
+        'Index Scan using ix_user_email_lower on "user"  (cost=0.28..8.30 rows=1)\n'
+        "  Index Cond: (lower((email)::text) = 'admin@example.com'::text)\n"
+        "  Filter: (token_version = 3)\n"
+        "  Rows Removed by Filter: 12"
+    )
+
+    assert plan.splitlines() == [
+        'Index Scan using ix_user_email_lower on "user"  (cost=0.28..8.30 rows=1)',
+        "  Index Cond: (lower((email)::text) = '?'::text)",
+        "  Filter: (token_version = ?)",
+        "  Rows Removed by Filter: 12",
+    ]
+
+
+def test_read_slow_queries_disabled(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/stats/slow-queries",
+        headers=superuser_token_headers,
+    )
+
+    assert r.status_code == 200
+    assert r.json() == []
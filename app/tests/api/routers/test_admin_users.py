@@ -4,8 +4,10 @@ from sqlmodel import Session, select
 from fastapi.testclient import TestClient
 from app.core.config import settings
 from app.tests.utils.utils import random_email, random_lower_string
+from app.tests.utils.user import create_random_user, user_authentication_headers
 from app.core.security import verify_password
 from app.db.users import User
+from app.crud import users as crud_users
 from app.utils import generate_reset_token
 
 
@@ -141,6 +143,28 @@ def test_create_user_existing_email(
     )
 
 
+def test_create_user_breached_password(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    breached_password: str,
+    db: Session,
+) -> None:
+    email = random_email()
+    data = {
+        "email": email,
+        "password": breached_password,
+        "username": random_lower_string(),
+    }
+
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/users", json=data, headers=superuser_token_headers
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == {"password": "Password has appeared in a data breach"}
+    assert db.exec(select(User).where(User.email == email)).first() is None
+
+
 def test_create_user_permission_denied(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -350,6 +374,58 @@ def test_update_user(
     assert db_user.is_active is False
 
 
+def test_update_user_pending_deletion(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    crud_users.request_user_deletion(session=db, db_user=user)
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/admin/users/{user.id}",
+        json={"is_active": True},
+        headers=superuser_token_headers,
+    )
+
+    assert r.status_code == 409
+    db.refresh(user)
+    assert user.is_active is False
+    assert user.deletion_requested_at is not None
+
+
+def test_update_user_privileges_invalidates_tokens(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    data = {
+        "email": email,
+        "password": password,
+        "username": random_lower_string(),
+        "is_active": True,
+        "is_superuser": True,
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/users", json=data, headers=superuser_token_headers
+    )
+    assert r.status_code == 201
+    user_id = r.json()["id"]
+
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.get(f"{settings.API_V1_STR}/admin/users", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/admin/users/{user_id}",
+        json={"is_superuser": False},
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/admin/users", headers=headers)
+    assert r.status_code == 403
+    assert r.json() == {"detail": "Could not validate credentials"}
+
+
 def test_update_user_permission_denied(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -445,6 +521,28 @@ def test_change_password(
     assert verify_password(new_password, db_user.hashed_password)
 
 
+def test_change_password_breached_password(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    breached_password: str,
+    db: Session,
+) -> None:
+    user = create_random_user(db=db)
+
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/users/{user.id}/change-password",
+        json={"new_password": breached_password},
+        headers=superuser_token_headers,
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == {
+        "new_password": "Password has appeared in a data breach"
+    }
+    db.refresh(user)
+    assert not verify_password(breached_password, user.hashed_password)
+
+
 def test_change_password_permission_denied(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -523,8 +621,19 @@ def test_delete_user(
     response2 = r2.json()
 
     assert r2.status_code == 200
-    assert response2["message"] == "User deleted successfully."
+    assert response2["message"] == "User scheduled for deletion."
+
+    r3 = client.get(
+        f"{settings.API_V1_STR}/admin/users/deletions", headers=superuser_token_headers
+    )
+    response3 = r3.json()
+
+    assert r3.status_code == 200
+    assert response3["count"] == 1
+    assert response3["data"][0]["id"] == response["id"]
+    assert response3["data"][0]["remaining_credentials"] == 0
 
+    crud_users.purge_pending_users(session=db)
     statement = select(User).where(User.email == email)
     db_user = db.exec(statement).first()
 
@@ -1,20 +1,30 @@
+import pytest
 from sqlmodel import Session, select
 import uuid
 from fastapi.testclient import TestClient
-from app.tests.utils.utils import random_email, random_lower_string
+from app.tests.utils.utils import (
+    random_email,
+    random_lower_string,
+    record_statements,
+)
 from app.core.config import settings
+from app.tests.utils.credentials import MALFORMED_CURSORS, create_random_credentials
 from app.crud import credentials as crud_credentials
-from app.db.credentials import Credentials
+from app.crud import users as crud_users
+from app.db.credentials import Credentials, CredentialsCreate
 
 
 def test_get_credentials(
     client: TestClient,
     credential: Credentials,
     normal_user_token_headers: dict[str, str],
+    query_budget,
 ) -> None:
-    r = client.get(
-        f"{settings.API_V1_STR}/credentials", headers=normal_user_token_headers
-    )
+    # Token version, revocation check, count and page
+    with query_budget(4):
+        r = client.get(
+            f"{settings.API_V1_STR}/credentials", headers=normal_user_token_headers
+        )
     credentials_response = r.json()
 
     assert 200 <= r.status_code < 300
@@ -25,11 +35,13 @@ def test_get_credential_by_id(
     client: TestClient,
     credential: Credentials,
     normal_user_token_headers: dict[str, str],
+    query_budget,
 ) -> None:
-    r = client.get(
-        f"{settings.API_V1_STR}/credentials/{credential.id}",
-        headers=normal_user_token_headers,
-    )
+    with query_budget(3):
+        r = client.get(
+            f"{settings.API_V1_STR}/credentials/{credential.id}",
+            headers=normal_user_token_headers,
+        )
     credentials_response = r.json()
 
     assert 200 <= r.status_code < 300
@@ -149,3 +161,238 @@ def test_delete_credential_not_found(
 
     r.status_code == 200
     response["detail"] == "Credential not found"
+
+
+def test_search_credentials(
+    client: TestClient,
+    credential: Credentials,
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/search",
+        headers=normal_user_token_headers,
+        params={"q": credential.title[:10]},
+    )
+    response = r.json()
+
+    assert r.status_code == 200
+    assert [item["id"] for item in response["data"]] == [str(credential.id)]
+    assert "password" not in response["data"][0]
+    assert response["next_cursor"] is None
+
+
+def test_search_credentials_only_own(
+    client: TestClient, db: Session, normal_user_token_headers: dict[str, str]
+) -> None:
+    other = create_random_credentials(db=db)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/search",
+        headers=normal_user_token_headers,
+        params={"q": other.title[:10]},
+    )
+
+    assert r.status_code == 200
+    assert r.json()["data"] == []
+
+
+def test_search_credentials_cursor(
+    client: TestClient, db: Session, normal_user_token_headers: dict[str, str]
+) -> None:
+    user = crud_users.get_user_by_email(session=db, email=settings.TEST_USER_EMAIL)
+    tag = random_lower_string()[:12]
+    for _ in range(3):
+        crud_credentials.create_credentials(
+            session=db,
+            credentials_create=CredentialsCreate(
+                title=f"{tag} {random_lower_string()}",
+                username=random_email(),
+                password=random_lower_string(),
+            ),
+            user_id=user.id,
+        )
+
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/search",
+        headers=normal_user_token_headers,
+        params={"q": tag, "limit": 2},
+    )
+    first_page = r.json()
+    assert len(first_page["data"]) == 2
+    assert first_page["next_cursor"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/search",
+        headers=normal_user_token_headers,
+        params={"q": tag, "limit": 2, "cursor": first_page["next_cursor"]},
+    )
+    second_page = r.json()
+    assert len(second_page["data"]) == 1
+    assert second_page["next_cursor"] is None
+    assert second_page["data"][0]["id"] not in {
+        item["id"] for item in first_page["data"]
+    }
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", *MALFORMED_CURSORS])
+def test_search_credentials_invalid_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str], cursor: str
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/search",
+        headers=normal_user_token_headers,
+        params={"q": "mail", "cursor": cursor},
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_match_credentials(
+    client: TestClient, db: Session, normal_user_token_headers: dict[str, str]
+) -> None:
+    user = crud_users.get_user_by_email(session=db, email=settings.TEST_USER_EMAIL)
+    domain = f"{random_lower_string()[:12]}.co.uk"
+    credential = crud_credentials.create_credentials(
+        session=db,
+        credentials_create=CredentialsCreate(
+            title=random_lower_string(),
+            url=f"https://{domain}",
+            username=random_email(),
+            password=random_lower_string(),
+        ),
+        user_id=user.id,
+    )
+    create_random_credentials(db=db, user_id=user.id)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/match",
+        headers=normal_user_token_headers,
+        params={"url": f"https://accounts.{domain}/login?next=/"},
+    )
+    response = r.json()
+
+    assert r.status_code == 200
+    assert response["data"] == [
+        {
+            "id": str(credential.id),
+            "title": credential.title,
+            "url": credential.url,
+            "username": credential.username,
+            "match": "subdomain",
+        }
+    ]
+
+
+def test_match_credentials_invalid_url(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/match",
+        headers=normal_user_token_headers,
+        params={"url": "https://"},
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid URL"
+
+
+def test_read_reused_credentials(
+    client: TestClient, db: Session, normal_user_token_headers: dict[str, str]
+) -> None:
+    user = crud_users.get_user_by_email(session=db, email=settings.TEST_USER_EMAIL)
+    password = random_lower_string()
+    reused = [
+        crud_credentials.create_credentials(
+            session=db,
+            credentials_create=CredentialsCreate(
+                title=random_lower_string(),
+                username=random_email(),
+                password=password,
+            ),
+            user_id=user.id,
+        )
+        for _ in range(2)
+    ]
+    create_random_credentials(db=db, user_id=user.id)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/reuse", headers=normal_user_token_headers
+    )
+    response = r.json()
+
+    assert r.status_code == 200
+    assert response["count"] == 1
+    assert response["data"][0]["count"] == 2
+    assert {item["id"] for item in response["data"][0]["data"]} == {
+        str(credentials.id) for credentials in reused
+    }
+
+
+def test_read_vault_health(
+    client: TestClient,
+    credential: Credentials,
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/health", headers=normal_user_token_headers
+    )
+    response = r.json()
+
+    assert r.status_code == 200
+    assert response["total"] == 1
+    assert response["reused"] == 0
+    assert response["old"] == 0
+
+
+def test_create_credential_statements(
+    client: TestClient, db: Session, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "title": random_lower_string(),
+        "username": random_email(),
+        "password": random_lower_string(),
+    }
+    with record_statements(db) as statements:
+        r = client.post(
+            f"{settings.API_V1_STR}/credentials/",
+            headers=normal_user_token_headers,
+            json=data,
+        )
+
+    assert r.status_code == 201
+    assert r.json()["title"] == data["title"]
+    # The commit flushes the credential and its owner's health counters, the
+    # response is built without reading the row back
+    assert sorted(" ".join(statement.split()[:2]) for statement in statements[-2:]) == [
+        "INSERT INTO",
+        "UPDATE vaulthealth",
+    ]
+    assert any(s.startswith("INSERT INTO credentials") for s in statements[-2:])
+
+
+def test_update_credential_statements(
+    client: TestClient,
+    db: Session,
+    normal_user_token_headers: dict[str, str],
+    credential: Credentials,
+) -> None:
+    # Warm the per-worker token version cache
+    client.get(
+        f"{settings.API_V1_STR}/credentials/{credential.id}",
+        headers=normal_user_token_headers,
+    )
+    new_title = random_lower_string()
+
+    with record_statements(db) as statements:
+        r = client.patch(
+            f"{settings.API_V1_STR}/credentials/{credential.id}",
+            headers=normal_user_token_headers,
+            json={"title": new_title},
+        )
+
+    assert r.status_code == 200
+    assert r.json()["title"] == new_title
+    # Token revocation check and the UPDATE ... RETURNING itself
+    assert len(statements) == 2
+    assert statements[1].startswith("UPDATE credentials")
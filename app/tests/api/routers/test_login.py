@@ -1,8 +1,10 @@
 from unittest.mock import patch
+from jose import jwt
 from sqlmodel import Session, select
 from fastapi.testclient import TestClient
 from app.core.config import settings
 from app.tests.utils.utils import random_email, random_lower_string
+from app.tests.utils.user import user_authentication_headers
 from app.core.security import verify_password
 from app.db.users import User
 from app.utils import generate_reset_token
@@ -23,6 +25,40 @@ def test_get_access_token(
     assert r.status_code == 200
 
 
+def test_get_access_token_email_case_insensitive(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "username": settings.TEST_USER_EMAIL.upper(),
+        "password": settings.TEST_USER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+
+    assert r.status_code == 200
+    assert r.json()["access_token"]
+
+
+def test_access_token_claims(client: TestClient, db: Session) -> None:
+    data = {
+        "username": settings.FIRST_SUPERUSER_EMAIL,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+    assert r.status_code == 200
+
+    payload = jwt.decode(
+        r.json()["access_token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+    user = db.exec(
+        select(User).where(User.email == settings.FIRST_SUPERUSER_EMAIL)
+    ).one()
+
+    assert payload["sub"] == str(user.id)
+    assert payload["is_superuser"] is True
+    assert payload["is_active"] is True
+    assert payload["token_version"] == user.token_version
+
+
 def test_get_access_token_with_wrong_credentials(client: TestClient) -> None:
     email = random_email()
     password = random_lower_string()
@@ -64,6 +100,147 @@ def test_get_access_token_inactive_user(client: TestClient, db: Session):
         assert response["detail"] == "Inactive user"
 
 
+def test_logout(client: TestClient, normal_user_token_headers: dict[str, str]) -> None:
+    r = client.post(f"{settings.API_V1_STR}/logout", headers=normal_user_token_headers)
+
+    assert r.status_code == 200
+    assert r.json()["message"] == "Logged out successfully."
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+
+    assert r.status_code == 403
+    assert r.json() == {"detail": "Could not validate credentials"}
+
+    headers = user_authentication_headers(
+        client=client,
+        email=settings.TEST_USER_EMAIL,
+        password=settings.TEST_USER_PASSWORD,
+    )
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+
+    assert r.status_code == 200
+
+
+def login(client: TestClient, email: str, password: str) -> dict[str, str]:
+    data = {"username": email, "password": password}
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_refresh_token(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    tokens = login(client, settings.TEST_USER_EMAIL, settings.TEST_USER_PASSWORD)
+    assert tokens["refresh_token"]
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    refreshed = r.json()
+
+    assert r.status_code == 200
+    assert refreshed["refresh_token"] != tokens["refresh_token"]
+
+    headers = {"Authorization": f"Bearer {refreshed['access_token']}"}
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+
+    assert r.status_code == 200
+    assert r.json()["email"] == settings.TEST_USER_EMAIL
+
+
+def test_refresh_token_does_not_verify_password(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    tokens = login(client, settings.TEST_USER_EMAIL, settings.TEST_USER_PASSWORD)
+
+    with patch("app.crud.users.verify_password") as verify:
+        r = client.post(
+            f"{settings.API_V1_STR}/login/refresh-token",
+            json={"refresh_token": tokens["refresh_token"]},
+        )
+
+    assert r.status_code == 200
+    verify.assert_not_called()
+
+
+def test_refresh_token_invalid(client: TestClient) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": random_lower_string()},
+    )
+
+    assert r.status_code == 401
+    assert r.json()["detail"] == "Invalid refresh token"
+
+
+def test_refresh_token_reuse_revokes_family(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    tokens = login(client, settings.TEST_USER_EMAIL, settings.TEST_USER_PASSWORD)
+    first = tokens["refresh_token"]
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token", json={"refresh_token": first}
+    )
+    assert r.status_code == 200
+    second = r.json()["refresh_token"]
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token", json={"refresh_token": first}
+    )
+    assert r.status_code == 401
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token", json={"refresh_token": second}
+    )
+    assert r.status_code == 401
+
+
+def test_change_password_revokes_refresh_tokens(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    tokens = login(client, settings.TEST_USER_EMAIL, settings.TEST_USER_PASSWORD)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    data = {
+        "old_password": settings.TEST_USER_PASSWORD,
+        "new_password": random_lower_string(),
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/change-password", headers=headers, json=data
+    )
+    assert r.status_code == 200
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+
+    assert r.status_code == 401
+
+
+def test_logout_revokes_refresh_token(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    tokens = login(client, settings.TEST_USER_EMAIL, settings.TEST_USER_PASSWORD)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    r = client.post(
+        f"{settings.API_V1_STR}/logout",
+        headers=headers,
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 200
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+
+    assert r.status_code == 401
+
+
 def test_password_recovery_with_wrong_email(client: TestClient) -> None:
     email = random_email()
 
@@ -174,3 +351,79 @@ def test_reset_password_token(
     db_user = db.exec(statement).first()
 
     assert verify_password(password, db_user.hashed_password)
+
+
+def test_get_access_token_rate_limited_by_email(client: TestClient) -> None:
+    email = random_email()
+    data = {"username": email, "password": random_lower_string()}
+    with (
+        patch("app.core.config.settings.LOGIN_RATE_LIMIT_EMAIL_CAPACITY", 2),
+        patch("app.api.routers.v1.login.authenticate", return_value=None) as auth,
+    ):
+        for _ in range(2):
+            r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+            assert r.status_code == 400
+
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+
+    assert r.status_code == 429
+    assert r.json()["detail"] == "Too many requests. Please try again later."
+    assert int(r.headers["Retry-After"]) >= 1
+    assert auth.call_count == 2
+
+
+def test_get_access_token_rate_limited_by_ip(client: TestClient) -> None:
+    with patch("app.core.config.settings.LOGIN_RATE_LIMIT_IP_CAPACITY", 3):
+        for _ in range(3):
+            data = {"username": random_email(), "password": random_lower_string()}
+            r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+            assert r.status_code == 400
+
+        data = {"username": random_email(), "password": random_lower_string()}
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+
+    assert r.status_code == 429
+
+
+def test_get_access_token_email_rate_limit_is_case_insensitive(
+    client: TestClient,
+) -> None:
+    email = random_email()
+    with patch("app.core.config.settings.LOGIN_RATE_LIMIT_EMAIL_CAPACITY", 1):
+        data = {"username": email, "password": random_lower_string()}
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+        assert r.status_code == 400
+
+        data = {"username": email.upper(), "password": random_lower_string()}
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+
+    assert r.status_code == 429
+
+
+def test_password_recovery_rate_limited(client: TestClient) -> None:
+    email = random_email()
+    with (
+        patch(
+            "app.core.config.settings.PASSWORD_RECOVERY_RATE_LIMIT_EMAIL_CAPACITY", 1
+        ),
+        patch("app.api.routers.v1.login.get_user_by_email", return_value=None) as get,
+    ):
+        r = client.post(f"{settings.API_V1_STR}/password-recovery/{email}")
+        assert r.status_code == 404
+
+        r = client.post(f"{settings.API_V1_STR}/password-recovery/{email}")
+
+    assert r.status_code == 429
+    assert get.call_count == 1
+
+
+def test_rate_limit_disabled(client: TestClient) -> None:
+    email = random_email()
+    with (
+        patch("app.core.config.settings.RATE_LIMIT_ENABLED", False),
+        patch("app.core.config.settings.LOGIN_RATE_LIMIT_EMAIL_CAPACITY", 1),
+    ):
+        for _ in range(3):
+            data = {"username": email, "password": random_lower_string()}
+            r = client.post(f"{settings.API_V1_STR}/login/access-token", data=data)
+            assert r.status_code == 400
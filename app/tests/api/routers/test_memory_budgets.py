@@ -0,0 +1,73 @@
+from unittest.mock import patch
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.security import get_credential_password_hash
+from app.crud import users as crud_users
+from app.db.credentials import Credentials
+
+VAULT_SIZES = (100, 1_000, 10_000)
+# Peak Python memory a listing may reach while handling the request. On
+# Postgres 16 both listings peak at about 2.4 KiB per credential (24 MB for
+# 10k), while the body of a credential is about 70 bytes in JSON.
+BASE_BUDGET = 2 * 1024 * 1024
+CREDENTIAL_BUDGET = 4 * 1024
+
+
+def create_vault(db: Session, size: int) -> str:
+    """Give the first superuser ``size`` credentials and return its id."""
+    user = crud_users.get_user_by_email(
+        session=db, email=settings.FIRST_SUPERUSER_EMAIL
+    )
+    hashed_password = get_credential_password_hash("password")
+    db.add_all(
+        Credentials(
+            user_id=user.id,
+            title=f"Credential {i}",
+            url=f"https://login{i}.example.com",
+            username=f"user{i}@example.com",
+            hashed_password=hashed_password,
+        )
+        for i in range(size)
+    )
+    db.commit()
+    # The route shares this session, it has to build the rows it lists
+    db.expunge_all()
+    return str(user.id)
+
+
+def peak_memory(client: TestClient, url: str, headers: dict[str, str]) -> int:
+    """Peak memory of the request in bytes, measured by the memory profiler."""
+    r = client.get(url, headers={**headers, "X-Profile": "memory"})
+    assert r.status_code == 200
+    return int(r.headers["x-profile-peak-memory"])
+
+
+@pytest.mark.parametrize("size", VAULT_SIZES)
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/credentials/?limit={size}",
+        "/admin/credentials/?user_id={user_id}&limit={size}",
+    ],
+)
+def test_list_credentials_memory_budget(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    tmp_path,
+    path: str,
+    size: int,
+) -> None:
+    user_id = create_vault(db, size)
+    url = settings.API_V1_STR + path.format(user_id=user_id, size=size)
+
+    with (
+        patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)),
+        patch("app.core.config.settings.PROFILE_MEMORY_FRAMES", 1),
+    ):
+        peak = peak_memory(client, url, superuser_token_headers)
+
+    budget = BASE_BUDGET + CREDENTIAL_BUDGET * size
+    assert peak <= budget, f"{url} peaked at {peak} bytes, budget is {budget}"
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.metrics import (
+    Histogram,
+    email_queue_depth,
+    emails_sent_total,
+    http_request_duration_seconds,
+    http_requests_total,
+    password_hash_duration_seconds,
+)
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def test_metrics(client: TestClient) -> None:
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_requests_total counter" in r.text
+    assert "# TYPE http_request_duration_seconds histogram" in r.text
+    assert 'db_pool_connections{state="size"}' in r.text
+
+
+def test_metrics_route_labels(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    labels = ("credentials-read_credentials", "GET", "200")
+    before = http_requests_total.get(labels)
+    count = http_request_duration_seconds.get_count(labels)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 200
+
+    assert http_requests_total.get(labels) == before + 1
+    assert http_request_duration_seconds.get_count(labels) == count + 1
+    r = client.get("/metrics")
+    assert (
+        'http_requests_total{route="credentials-read_credentials",'
+        'method="GET",status="200"}'
+    ) in r.text
+
+
+def test_metrics_unmatched_route(client: TestClient) -> None:
+    labels = ("unmatched", "GET", "404")
+    before = http_requests_total.get(labels)
+
+    r = client.get(f"{settings.API_V1_STR}/{random_lower_string()}")
+    assert r.status_code == 404
+
+    assert http_requests_total.get(labels) == before + 1
+
+
+def test_metrics_password_hash_and_email_queue(client: TestClient, db: Session) -> None:
+    hashes = password_hash_duration_seconds.get_count(("hash",))
+    sent = emails_sent_total.get(("success",))
+    data = {
+        "email": random_email(),
+        "username": random_lower_string(),
+        "password": random_lower_string(),
+    }
+    with patch("app.utils.send_email", return_value=None):
+        r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+    assert r.status_code == 201
+
+    assert password_hash_duration_seconds.get_count(("hash",)) == hashes + 1
+    assert emails_sent_total.get(("success",)) == sent + 1
+    assert email_queue_depth.get() == 0
+
+
+def test_histogram_render() -> None:
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, ("a",))
+    histogram.observe(0.5, ("a",))
+    histogram.observe(5, ("a",))
+
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="a",le="0.1"} 1',
+        'test_seconds_bucket{route="a",le="1.0"} 2',
+        'test_seconds_bucket{route="a",le="+Inf"} 3',
+        'test_seconds_sum{route="a"} 5.55',
+        'test_seconds_count{route="a"} 3',
+    ]
@@ -0,0 +1,38 @@
+import logging
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.query_stats import collect_query_stats
+from app.db.users import User
+from app.tests.utils.utils import random_email
+
+
+def test_server_timing(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/credentials/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 200
+    name, duration, description = r.headers["server-timing"].split(";")
+    assert name == "db"
+    assert float(duration.removeprefix("dur=")) >= 0
+    # At least the revocation check, count and page
+    count = int(description.removeprefix('desc="').split()[0])
+    assert count >= 3
+
+
+def test_query_stats_n_plus_one(db: Session, caplog) -> None:
+    with (
+        patch("app.core.config.settings.QUERY_STATS_N_PLUS_ONE_THRESHOLD", 3),
+        caplog.at_level(logging.WARNING, logger="app.core.query_stats"),
+        collect_query_stats() as stats,
+    ):
+        for _ in range(4):
+            db.exec(select(User).where(User.email == random_email())).first()
+
+    assert stats.count == 4
+    assert stats.repeated(3)[0][1] == 4
+    assert len(caplog.records) == 1
+    assert "Possible N+1 query" in caplog.records[0].getMessage()
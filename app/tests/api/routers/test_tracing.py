@@ -0,0 +1,45 @@
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.tracing import memory_exporter
+from app.db.credentials import Credentials
+
+
+def test_tracing(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    credential: Credentials,
+) -> None:
+    memory_exporter.clear()
+    with patch("app.core.config.settings.TRACING_EXPORTER", "memory"):
+        r = client.get(
+            f"{settings.API_V1_STR}/credentials/{credential.id}/show-password",
+            headers=normal_user_token_headers,
+        )
+    assert r.status_code == 200
+
+    spans = memory_exporter.traces[-1]
+    root = spans[0]
+    assert root.name == "GET credentials-show_password"
+    assert root.parent_span_id is None
+    assert root.attributes["http.status_code"] == 200
+    names = {span.name for span in spans}
+    assert {"get_current_claims", "db.query", "fernet.decrypt"} <= names
+    span_ids = {span.span_id for span in spans}
+    assert all(span.parent_span_id in span_ids for span in spans[1:])
+    assert all(span.trace_id == root.trace_id for span in spans)
+
+    otlp = root.to_otlp()
+    assert otlp["kind"] == 2
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in otlp[
+        "attributes"
+    ]
+
+
+def test_tracing_disabled(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    memory_exporter.clear()
+    client.get(f"{settings.API_V1_STR}/credentials/", headers=normal_user_token_headers)
+
+    assert len(memory_exporter.traces) == 0
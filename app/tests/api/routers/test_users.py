@@ -2,16 +2,25 @@ from unittest.mock import patch
 from sqlmodel import Session, select
 from fastapi.testclient import TestClient
 from app.core.config import settings
-from app.tests.utils.utils import random_email, random_lower_string
+from app.tests.utils.utils import (
+    random_email,
+    random_lower_string,
+    record_statements,
+)
+from app.tests.utils.user import create_random_user
 from app.core.security import verify_password
 from app.db.users import User
+from app.crud import users as crud_users
 from app.utils import generate_reset_token
 
 
 def test_get_users_me(
-    client: TestClient, normal_user_token_headers: dict[str, str]
+    client: TestClient, normal_user_token_headers: dict[str, str], query_budget
 ) -> None:
-    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    with query_budget(3):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+        )
     current_user = r.json()
     assert current_user
     assert current_user["is_active"] is True
@@ -64,6 +73,19 @@ def test_register_and_activate_users(client: TestClient, db: Session) -> None:
         assert activated_user["is_active"] is True
 
 
+def test_activate_user_pending_deletion(client: TestClient, db: Session) -> None:
+    user = create_random_user(db)
+    crud_users.request_user_deletion(session=db, db_user=user)
+    token = generate_reset_token(email=user.email)
+
+    r = client.post(f"{settings.API_V1_STR}/users/activate?token={token}")
+
+    assert r.status_code == 409
+    db.refresh(user)
+    assert user.is_active is False
+    assert user.deletion_requested_at is not None
+
+
 def test_register_with_existing_email(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -157,6 +179,25 @@ def test_change_password(
     assert verify_password(new_password, updated_user.hashed_password)
 
 
+def test_change_password_invalidates_tokens(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "old_password": settings.TEST_USER_PASSWORD,
+        "new_password": random_lower_string(),
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/change-password",
+        headers=normal_user_token_headers,
+        json=data,
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert r.status_code == 403
+    assert r.json() == {"detail": "Could not validate credentials"}
+
+
 def test_update_user(
     client: TestClient, db: Session, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -222,6 +263,70 @@ def test_delete_user_me(
         f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
     )
     assert r.status_code == 200
+    assert r.json()["message"] == "User scheduled for deletion"
     statement = select(User).where(User.email == settings.TEST_USER_EMAIL)
+    pending_user = db.exec(statement).first()
+    db.refresh(pending_user)
+    assert pending_user.deletion_requested_at is not None
+    assert pending_user.is_active is False
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert r.status_code == 403
+
+    crud_users.purge_pending_users(session=db)
     deleted_user = db.exec(statement).first()
     assert deleted_user is None
+
+
+def test_register_with_breached_password(
+    client: TestClient, breached_password: str
+) -> None:
+    data = {
+        "email": random_email(),
+        "username": random_lower_string(),
+        "password": breached_password,
+    }
+    r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == {"password": "Password has appeared in a data breach"}
+
+
+def test_change_password_to_breached_password(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    breached_password: str,
+) -> None:
+    data = {
+        "old_password": settings.TEST_USER_PASSWORD,
+        "new_password": breached_password,
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/change-password",
+        headers=normal_user_token_headers,
+        json=data,
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == {
+        "new_password": "Password has appeared in a data breach"
+    }
+
+
+def test_register_statements(client: TestClient, db: Session) -> None:
+    data = {
+        "email": random_email(),
+        "username": random_lower_string(),
+        "password": random_lower_string(),
+    }
+    with (
+        patch("app.utils.send_email", return_value=None),
+        record_statements(db) as statements,
+    ):
+        r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+
+    assert r.status_code == 201
+    assert r.json()["email"] == data["email"]
+    # A single INSERT ... ON CONFLICT DO NOTHING RETURNING
+    assert len(statements) == 1
+    assert statements[0].startswith('INSERT INTO "user"')
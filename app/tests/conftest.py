@@ -1,82 +1,40 @@
-from collections.abc import Generator
-from sqlalchemy.exc import ProgrammingError, OperationalError
-from sqlalchemy.engine.url import make_url
+from collections.abc import Callable, Generator, Iterator
+from contextlib import AbstractContextManager, contextmanager
+import hashlib
+from unittest.mock import patch
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, delete, create_engine, SQLModel, text
+from sqlmodel import Session, delete, create_engine, SQLModel
 from app.main import app
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, token_payloads
 from app.core.config import settings
 from app.core.db import init_db
+from app.core.rate_limit import rate_limiter
 from app.db.users import User
 from app.db.credentials import Credentials
+from app.db.tokens import RevokedToken
 from app.crud import users as crud_users
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
 from app.tests.utils.credentials import create_random_credentials
+from app.tests.utils.db import create_database, delete_database, get_admin_engine
+from app.tests.utils.utils import random_lower_string, record_statements
+from app.scripts.build_breach_index import build_index
 
 
 TEST_DATABASE_URL = str(settings.SQLALCHEMY_TEST_DATABASE_URI)
-admin_engine = create_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI),
-    isolation_level="AUTOCOMMIT",
-    # Add pool settings to ensure connections are properly closed
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+admin_engine = get_admin_engine()
 engine = create_engine(TEST_DATABASE_URL)
 
 
-def get_database_name_from_url(database_url: str) -> str:
-    """Extract database name from URL properly."""
-    url = make_url(database_url)
-    return url.database
-
-
 def create_test_database():
     """Create the test database if it doesn't exist."""
-    db_name = get_database_name_from_url(TEST_DATABASE_URL)
-
-    with admin_engine.connect() as connection:
-        try:
-            # For PostgreSQL, use proper quoting
-            connection.execute(text(f'CREATE DATABASE "{db_name}"'))
-            print(f"Created test database: {db_name}")
-        except ProgrammingError as e:
-            if "already exists" in str(e).lower():
-                print(f"Database {db_name} already exists, continuing...")
-            else:
-                raise
-        except OperationalError as e:
-            print(f"Database cannot be created: {e}")
-            raise
+    create_database(admin_engine, TEST_DATABASE_URL)
 
 
 def delete_test_database():
     """Delete the test database if it exists."""
-    db_name = get_database_name_from_url(TEST_DATABASE_URL)
-
-    with admin_engine.connect() as connection:
-        try:
-            # Terminate active connections to the test database first
-            connection.execute(
-                text(f"""
-                SELECT pg_terminate_backend(pid)
-                FROM pg_stat_activity
-                WHERE datname = '{db_name}' AND pid <> pg_backend_pid()
-            """)
-            )
-
-            # Now drop the database
-            connection.execute(text(f'DROP DATABASE "{db_name}"'))
-            print(f"Deleted test database: {db_name}")
-        except ProgrammingError as e:
-            if "does not exist" in str(e).lower():
-                print(f"Database {db_name} does not exist, continuing...")
-            else:
-                print(f"Error dropping database: {e}")
-        except OperationalError as e:
-            print(f"Database cannot be deleted: {e}")
+    delete_database(admin_engine, TEST_DATABASE_URL)
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -106,7 +64,7 @@ def db() -> Generator[Session, None, None]:
     """
     global _current_session
 
-    with Session(engine) as session:
+    with Session(engine, expire_on_commit=False) as session:
         init_db(session=session)
         _current_session = session
         yield session
@@ -114,6 +72,7 @@ def db() -> Generator[Session, None, None]:
         # Ensure proper cleanup
         try:
             session.exec(delete(Credentials))
+            session.exec(delete(RevokedToken))
             session.exec(delete(User))
             session.commit()
         except Exception as e:
@@ -125,13 +84,64 @@ def db() -> Generator[Session, None, None]:
             _current_session = None
 
 
+@pytest.fixture(scope="function", autouse=True)
+def reset_worker_state() -> Generator[None, None, None]:
+    """Start every test with empty per-worker caches and full rate limit buckets."""
+    rate_limiter.reset()
+    crud_users.token_versions.clear()
+    token_payloads.clear()
+    yield
+
+
+@pytest.fixture(scope="function")
+def breached_password(tmp_path) -> Generator[str, None, None]:
+    """Enable the breach check with an index containing the returned password."""
+    password = random_lower_string()
+    source = tmp_path / "breached.txt"
+    source.write_text(f"{hashlib.sha1(password.encode()).hexdigest().upper()}:7\n")
+    build_index(str(source), str(tmp_path / "breached.idx"))
+    with patch(
+        "app.core.config.settings.BREACHED_PASSWORDS_PATH",
+        str(tmp_path / "breached.idx"),
+    ):
+        yield password
+
+
+@pytest.fixture(scope="function")
+def query_budget(
+    db: Session,
+) -> Callable[[int], AbstractContextManager[list[str]]]:
+    """Fail the test when the block executes more than ``budget`` statements.
+
+    with query_budget(2):
+        client.get(...)
+    """
+
+    @contextmanager
+    def check(budget: int) -> Iterator[list[str]]:
+        with record_statements(db) as statements:
+            yield statements
+        if len(statements) > budget:
+            pytest.fail(
+                f"{len(statements)} statements executed, budget is {budget}:\n"
+                + "\n".join(" ".join(s.split()) for s in statements)
+            )
+
+    return check
+
+
 @pytest.fixture(scope="function")
 def client() -> Generator[TestClient, None, None]:
     def override_get_db():
         return _current_session
 
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
+    # The revocation listener would connect to the main database, without it
+    # every revocation check goes to the test database instead
+    with (
+        patch("app.core.config.settings.TOKEN_REVOCATION_LISTENER_ENABLED", False),
+        TestClient(app) as c,
+    ):
         yield c
     app.dependency_overrides.clear()
 
@@ -68,7 +68,7 @@ def test_update_credentials(db: Session) -> None:
     new_password = random_lower_string()
     credentials_update = CredentialsAdminUpdate(title=new_title, password=new_password)
     updated_credentials = crud_credentials.update_credentials(
-        session=db, db_credentials=credentials, credentials_in=credentials_update
+        session=db, credential_id=credentials.id, credentials_in=credentials_update
     )
     db_credentials = crud_credentials.get_credentials_by_id(
         session=db, credential_id=credentials.id
@@ -94,7 +94,7 @@ def test_update_credentials_by_admin(db: Session) -> None:
     )
 
     updated_credentials = crud_credentials.update_credentials(
-        session=db, db_credentials=credentials, credentials_in=credentials_update
+        session=db, credential_id=credentials.id, credentials_in=credentials_update
     )
     db_credentials = crud_credentials.get_credentials_by_id(
         session=db, credential_id=credentials.id
@@ -133,3 +133,241 @@ def test_get_credentials_password(db: Session) -> None:
 
     assert credentials_password is not None
     assert credentials_password == password
+
+
+def test_search_credentials(db: Session) -> None:
+    user = create_random_user(db=db)
+    other_user = create_random_user(db=db)
+    tag = random_lower_string()[:12]
+
+    matching = crud_credentials.create_credentials(
+        session=db,
+        credentials_create=CredentialsCreate(
+            title=f"{tag} mail",
+            url="https://mail.example.com",
+            username=random_email(),
+            password=random_lower_string(),
+        ),
+        user_id=user.id,
+    )
+    utils_credentials.create_random_credentials(db=db, user_id=user.id)
+    utils_credentials.create_random_credentials(db=db, user_id=other_user.id)
+    crud_credentials.create_credentials(
+        session=db,
+        credentials_create=CredentialsCreate(
+            title=f"{tag} mail",
+            username=random_email(),
+            password=random_lower_string(),
+        ),
+        user_id=other_user.id,
+    )
+
+    results = crud_credentials.search_credentials(
+        session=db, query=tag, user_id=user.id
+    )
+
+    assert [credentials.id for credentials, _ in results] == [matching.id]
+    assert results[0][1] > 0
+
+
+def test_search_credentials_paging(db: Session) -> None:
+    user = create_random_user(db=db)
+    tag = random_lower_string()[:12]
+    for _ in range(5):
+        crud_credentials.create_credentials(
+            session=db,
+            credentials_create=CredentialsCreate(
+                title=f"{tag} {random_lower_string()}",
+                username=random_email(),
+                password=random_lower_string(),
+            ),
+            user_id=user.id,
+        )
+
+    seen = []
+    after = None
+    while True:
+        page = crud_credentials.search_credentials(
+            session=db, query=tag, user_id=user.id, limit=2, after=after
+        )
+        seen.extend(credentials.id for credentials, _ in page)
+        if len(page) < 2:
+            break
+        last, rank = page[-1]
+        after = (rank, last.id)
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+def test_create_credentials_sets_url_match_columns(db: Session) -> None:
+    user = create_random_user(db=db)
+    credentials = crud_credentials.create_credentials(
+        session=db,
+        credentials_create=CredentialsCreate(
+            title=random_lower_string(),
+            url="https://Login.Example.co.uk:8443/signin",
+            username=random_email(),
+            password=random_lower_string(),
+        ),
+        user_id=user.id,
+    )
+
+    assert credentials.host_reversed == "uk.co.example.login."
+    assert credentials.registrable_domain == "example.co.uk"
+
+    credentials = crud_credentials.update_credentials(
+        session=db,
+        credential_id=credentials.id,
+        credentials_in=CredentialsAdminUpdate(url="example.org"),
+    )
+
+    assert credentials.host_reversed == "org.example."
+    assert credentials.registrable_domain == "example.org"
+
+
+def test_match_credentials(db: Session) -> None:
+    user = create_random_user(db=db)
+    other_user = create_random_user(db=db)
+    domain = f"{random_lower_string()[:12]}.com"
+
+    def create(url: str, user_id=user.id):
+        return crud_credentials.create_credentials(
+            session=db,
+            credentials_create=CredentialsCreate(
+                title=random_lower_string(),
+                url=url,
+                username=random_email(),
+                password=random_lower_string(),
+            ),
+            user_id=user_id,
+        )
+
+    exact = create(f"https://login.{domain}/path")
+    parent = create(f"https://{domain}")
+    sibling = create(f"https://www.{domain}")
+    create(f"https://{domain}.evil.net")
+    create(f"https://login.{domain}", user_id=other_user.id)
+
+    matches = crud_credentials.match_credentials(
+        session=db, host=f"login.{domain}", user_id=user.id
+    )
+
+    assert [(credentials.id, match) for credentials, match in matches] == [
+        (exact.id, "exact"),
+        (parent.id, "subdomain"),
+        (sibling.id, "domain"),
+    ]
+
+
+def test_get_reused_credentials(db: Session) -> None:
+    user = create_random_user(db=db)
+    other_user = create_random_user(db=db)
+    password = random_lower_string()
+
+    def create(password: str, user_id=user.id):
+        return crud_credentials.create_credentials(
+            session=db,
+            credentials_create=CredentialsCreate(
+                title=random_lower_string(),
+                username=random_email(),
+                password=password,
+            ),
+            user_id=user_id,
+        )
+
+    first = create(password)
+    second = create(password)
+    create(random_lower_string())
+    create(password, user_id=other_user.id)
+
+    groups = crud_credentials.get_reused_credentials(session=db, user_id=user.id)
+
+    assert len(groups) == 1
+    assert {credentials.id for credentials in groups[0]} == {first.id, second.id}
+
+
+def test_update_credentials_updates_fingerprint(db: Session) -> None:
+    credentials = utils_credentials.create_random_credentials(db=db)
+    fingerprint = credentials.password_fingerprint
+    assert fingerprint
+
+    other_user = create_random_user(db=db)
+    credentials = crud_credentials.update_credentials(
+        session=db,
+        credential_id=credentials.id,
+        credentials_in=CredentialsAdminUpdate(user_id=other_user.id),
+    )
+    moved_fingerprint = credentials.password_fingerprint
+    assert moved_fingerprint not in (None, fingerprint)
+
+    credentials = crud_credentials.update_credentials(
+        session=db,
+        credential_id=credentials.id,
+        credentials_in=CredentialsAdminUpdate(password=random_lower_string()),
+    )
+    assert credentials.password_fingerprint not in (None, moved_fingerprint)
+
+
+def test_backfill_password_fingerprints(db: Session) -> None:
+    credentials = utils_credentials.create_random_credentials(db=db)
+    fingerprint = credentials.password_fingerprint
+    credentials.password_fingerprint = None
+    db.commit()
+
+    updated = crud_credentials.backfill_password_fingerprints(session=db, batch_size=1)
+
+    db.refresh(credentials)
+    assert updated >= 1
+    assert credentials.password_fingerprint == fingerprint
+
+
+def test_create_credentials_flags_breached_password(
+    db: Session, breached_password: str
+) -> None:
+    user = create_random_user(db=db)
+
+    credentials = crud_credentials.create_credentials(
+        session=db,
+        credentials_create=CredentialsCreate(
+            title=random_lower_string(),
+            username=random_email(),
+            password=breached_password,
+        ),
+        user_id=user.id,
+    )
+    assert credentials.is_breached is True
+
+    credentials = crud_credentials.update_credentials(
+        session=db,
+        credential_id=credentials.id,
+        credentials_in=CredentialsAdminUpdate(password=random_lower_string()),
+    )
+    assert credentials.is_breached is False
+
+
+def test_update_and_delete_credentials_scoped_by_owner(db: Session) -> None:
+    credentials = utils_credentials.create_random_credentials(db=db)
+    other_user = create_random_user(db=db)
+
+    updated = crud_credentials.update_credentials(
+        session=db,
+        credential_id=credentials.id,
+        credentials_in=CredentialsAdminUpdate(title=random_lower_string()),
+        user_id=other_user.id,
+    )
+    assert updated is None
+
+    deleted = crud_credentials.delete_credentials(
+        session=db, credential_id=credentials.id, user_id=other_user.id
+    )
+    assert deleted is False
+
+    deleted = crud_credentials.delete_credentials(
+        session=db, credential_id=credentials.id, user_id=credentials.user_id
+    )
+    assert deleted is True
+    assert (
+        crud_credentials.get_credentials_by_id(session=db, credential_id=credentials.id)
+        is None
+    )
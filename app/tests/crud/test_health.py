@@ -0,0 +1,93 @@
+from sqlmodel import Session
+from app.crud import credentials as crud_credentials
+from app.crud import health as crud_health
+from app.db.credentials import CredentialsCreate, CredentialsAdminUpdate
+from app.db.health import VaultHealth
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_email, random_lower_string
+
+STRONG_PASSWORD = "Correct-Horse-42"
+
+
+def create_credentials(db: Session, user_id, password: str):
+    return crud_credentials.create_credentials(
+        session=db,
+        credentials_create=CredentialsCreate(
+            title=random_lower_string(),
+            username=random_email(),
+            password=password,
+        ),
+        user_id=user_id,
+    )
+
+
+def test_vault_health_counts_writes(db: Session) -> None:
+    user = create_random_user(db=db)
+
+    create_credentials(db, user.id, "weakpass")
+    first = create_credentials(db, user.id, STRONG_PASSWORD)
+    second = create_credentials(db, user.id, STRONG_PASSWORD)
+    third = create_credentials(db, user.id, STRONG_PASSWORD)
+
+    health = crud_health.get_vault_health(session=db, user_id=user.id)
+    assert health.total == 4
+    assert health.weak == 1
+    assert health.reused == 3
+    assert health.breached == 0
+    assert health.old == 0
+
+    crud_credentials.delete_credentials(session=db, credential_id=third.id)
+    health = crud_health.get_vault_health(session=db, user_id=user.id)
+    assert health.total == 3
+    assert health.reused == 2
+
+    crud_credentials.update_credentials(
+        session=db,
+        credential_id=second.id,
+        credentials_in=CredentialsAdminUpdate(password="shortpw1"),
+    )
+    health = crud_health.get_vault_health(session=db, user_id=user.id)
+    assert health.weak == 2
+    assert health.reused == 0
+
+    other_user = create_random_user(db=db)
+    crud_credentials.update_credentials(
+        session=db,
+        credential_id=first.id,
+        credentials_in=CredentialsAdminUpdate(user_id=other_user.id),
+    )
+    assert crud_health.get_vault_health(session=db, user_id=user.id).total == 2
+    assert crud_health.get_vault_health(session=db, user_id=other_user.id).total == 1
+
+
+def test_vault_health_old_passwords(db: Session) -> None:
+    user = create_random_user(db=db)
+    create_credentials(db, user.id, STRONG_PASSWORD)
+
+    vault_health = db.get(VaultHealth, user.id)
+    vault_health.months = {**vault_health.months, "2001-01": 2}
+    db.add(vault_health)
+    db.commit()
+
+    health = crud_health.get_vault_health(session=db, user_id=user.id)
+    assert health.old == 2
+
+
+def test_rebuild_vault_health_matches_incremental(db: Session) -> None:
+    user = create_random_user(db=db)
+    create_credentials(db, user.id, "weakpass")
+    create_credentials(db, user.id, STRONG_PASSWORD)
+    create_credentials(db, user.id, STRONG_PASSWORD)
+    incremental = crud_health.get_vault_health(session=db, user_id=user.id)
+
+    crud_health.rebuild_vault_health(session=db, user_id=user.id)
+
+    assert crud_health.get_vault_health(session=db, user_id=user.id) == incremental
+
+
+def test_get_vault_health_without_credentials(db: Session) -> None:
+    user = create_random_user(db=db)
+
+    health = crud_health.get_vault_health(session=db, user_id=user.id)
+
+    assert health.total == 0
@@ -0,0 +1,232 @@
+"""Plan shape tests of the hot queries against a seeded database.
+
+The statements are captured from the real crud and route functions and
+planned with ``EXPLAIN (FORMAT JSON)``. Besides the shape, the cost of each
+index driven plan is compared to the plan Postgres falls back to without
+index scans, so an index that stops fitting the query is reported even
+when the planner still picks it.
+"""
+
+from collections.abc import Callable, Generator
+from typing import Any, NamedTuple
+from uuid import UUID
+import pytest
+from sqlalchemy import Engine
+from sqlalchemy.engine.url import make_url
+from sqlmodel import Session, SQLModel, create_engine, func, select, text, update
+from app.api.routers.v1 import credentials as credentials_routes
+from app.api.routers.v1.admin import credentials as admin_credentials_routes
+from app.api.routers.v1.admin import users as admin_users_routes
+from app.core.config import settings
+from app.crud import credentials as crud_credentials
+from app.crud import users as crud_users
+from app.db.credentials import Credentials
+from app.db.users import User
+from app.schemas.users import TokenPayload
+from app.scripts.seed import seed_database
+from app.tests.utils.db import create_database, delete_database, get_admin_engine
+from app.tests.utils.plans import (
+    INDEX_SCANS,
+    explain,
+    format_plan,
+    plan_nodes,
+)
+from app.tests.utils.utils import record_statements
+
+SEED_USERS = 2_000
+SEED_MEAN_CREDENTIALS = 10
+PENDING_DELETIONS = 5
+# Share of the cost of the plan without index scans an index driven plan may
+# reach, a plan that lost its index costs about as much as the fallback
+MAX_COST_RATIO = 0.5
+
+
+class PlannedStatement(NamedTuple):
+    statement: str
+    parameters: Any
+    plan: dict[str, Any]
+
+
+@pytest.fixture(scope="module")
+def plans_engine() -> Generator[Engine, None, None]:
+    """A database of its own, seeded and analyzed once for the module."""
+    url = make_url(str(settings.SQLALCHEMY_TEST_DATABASE_URI))
+    database_url = url.set(database=f"{url.database}_plans").render_as_string(
+        hide_password=False
+    )
+    admin_engine = get_admin_engine()
+    create_database(admin_engine, database_url)
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(bind=engine)
+    seed_database(
+        engine=engine,
+        seed=0,
+        users=SEED_USERS,
+        mean_credentials=SEED_MEAN_CREDENTIALS,
+        hash_pool_size=1,
+        password_pool_size=100,
+    )
+    with Session(engine) as session:
+        pending = select(User.id).order_by(User.id).limit(PENDING_DELETIONS)
+        session.exec(
+            update(User)
+            .where(User.id.in_(pending.scalar_subquery()))
+            .values(deletion_requested_at=func.now())
+        )
+        session.exec(text("ANALYZE"))
+        session.commit()
+    yield engine
+
+    engine.dispose()
+    delete_database(admin_engine, database_url)
+    admin_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def plans_db(plans_engine: Engine) -> Generator[Session, None, None]:
+    with Session(plans_engine) as session:
+        yield session
+        session.rollback()
+
+
+@pytest.fixture(scope="function")
+def vault_owner(plans_db: Session) -> UUID:
+    """A user whose vault has about the mean number of credentials."""
+    size = func.count()
+    return plans_db.exec(
+        select(Credentials.user_id)
+        .group_by(Credentials.user_id)
+        .order_by(func.abs(size - SEED_MEAN_CREDENTIALS), Credentials.user_id)
+        .limit(1)
+    ).one()
+
+
+def plan_selects(db: Session, call: Callable[[], Any]) -> list[PlannedStatement]:
+    """Run ``call`` and plan the SELECT statements it issued."""
+    with record_statements(db, with_parameters=True) as executions:
+        call()
+    planned = [
+        PlannedStatement(statement, parameters, explain(db, statement, parameters))
+        for statement, parameters in executions
+        if statement.lstrip().upper().startswith("SELECT")
+    ]
+    assert planned, "no SELECT statement was executed"
+    return planned
+
+
+def assert_no_seq_scan(planned: PlannedStatement, relation: str) -> None:
+    for node in plan_nodes(planned.plan):
+        assert (node["Node Type"], node.get("Relation Name")) != (
+            "Seq Scan",
+            relation,
+        ), f"{relation} is scanned:\n{format_plan(planned.plan)}"
+
+
+def assert_no_sort(planned: PlannedStatement) -> None:
+    for node in plan_nodes(planned.plan):
+        assert node["Node Type"] != "Sort", (
+            f"Sort in plan:\n{format_plan(planned.plan)}"
+        )
+
+
+def assert_uses_index(planned: PlannedStatement, index: str) -> None:
+    indexes = {node.get("Index Name") for node in plan_nodes(planned.plan)}
+    assert index in indexes, f"{index} is not used:\n{format_plan(planned.plan)}"
+
+
+def assert_index_cost(db: Session, planned: PlannedStatement) -> None:
+    fallback = explain(db, planned.statement, planned.parameters, INDEX_SCANS)
+    cost = planned.plan["Total Cost"]
+    assert cost <= fallback["Total Cost"] * MAX_COST_RATIO, (
+        f"Plan costs {cost}, {fallback['Total Cost']} without index scans:\n"
+        f"{format_plan(planned.plan)}"
+    )
+
+
+def test_read_credentials_plan(plans_db: Session, vault_owner: UUID) -> None:
+    claims = TokenPayload(
+        sub=vault_owner,
+        exp=0,
+        is_superuser=False,
+        is_active=True,
+        token_version=0,
+        jti="",
+    )
+
+    count, page = plan_selects(
+        plans_db,
+        lambda: credentials_routes.read_credentials(
+            session=plans_db, claims=claims, skip=0, limit=100
+        ),
+    )
+    for planned in (count, page):
+        assert_no_seq_scan(planned, "credentials")
+        assert_index_cost(plans_db, planned)
+    assert_no_sort(page)
+
+
+def test_get_credentials_by_id_plan(plans_db: Session, vault_owner: UUID) -> None:
+    credential_id = plans_db.exec(
+        select(Credentials.id).where(Credentials.user_id == vault_owner).limit(1)
+    ).one()
+
+    for user_id in (vault_owner, None):
+        (planned,) = plan_selects(
+            plans_db,
+            lambda: crud_credentials.get_credentials_by_id(
+                session=plans_db, credential_id=credential_id, user_id=user_id
+            ),
+        )
+        assert_uses_index(planned, "credentials_pkey")
+        assert_index_cost(plans_db, planned)
+
+
+def test_get_user_by_email_plan(plans_db: Session) -> None:
+    email = plans_db.exec(select(User.email).limit(1)).one()
+
+    (planned,) = plan_selects(
+        plans_db,
+        lambda: crud_users.get_user_by_email(session=plans_db, email=email.upper()),
+    )
+    assert_uses_index(planned, "ix_user_email_lower")
+    assert_index_cost(plans_db, planned)
+
+
+def test_admin_read_credentials_plan(plans_db: Session, vault_owner: UUID) -> None:
+    count, page = plan_selects(
+        plans_db,
+        lambda: admin_credentials_routes.read_credentials(
+            session=plans_db, user_id=vault_owner, skip=0, limit=100
+        ),
+    )
+    for planned in (count, page):
+        assert_no_seq_scan(planned, "credentials")
+        assert_index_cost(plans_db, planned)
+    assert_no_sort(page)
+
+    # Unfiltered pages read the table in its stored order and stop early
+    _, page = plan_selects(
+        plans_db,
+        lambda: admin_credentials_routes.read_credentials(
+            session=plans_db, user_id=None, skip=0, limit=100
+        ),
+    )
+    assert page.plan["Node Type"] == "Limit"
+    assert_no_sort(page)
+
+
+def test_admin_read_users_plan(plans_db: Session) -> None:
+    _, page = plan_selects(
+        plans_db,
+        lambda: admin_users_routes.read_users(session=plans_db, skip=0, limit=100),
+    )
+    assert page.plan["Node Type"] == "Limit"
+    assert_no_sort(page)
+
+
+def test_admin_pending_deletions_plan(plans_db: Session) -> None:
+    (planned,) = plan_selects(
+        plans_db, lambda: crud_users.get_pending_deletions(session=plans_db)
+    )
+    assert_no_seq_scan(planned, "credentials")
+    assert_index_cost(plans_db, planned)
@@ -0,0 +1,113 @@
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from sqlmodel import Session
+from app.core.revocation import BloomFilter, revocation_list
+from app.crud import tokens as crud_tokens
+from app.tests.utils.user import create_random_user
+
+
+def test_revoke_token(db: Session) -> None:
+    jti = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+
+    crud_tokens.revoke_token(session=db, jti=jti, expires_at=expires_at)
+
+    assert crud_tokens.is_token_revoked(session=db, jti=jti)
+    assert not crud_tokens.is_token_revoked(session=db, jti=uuid.uuid4().hex)
+
+
+def test_revoke_token_twice(db: Session) -> None:
+    jti = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+
+    crud_tokens.revoke_token(session=db, jti=jti, expires_at=expires_at)
+    crud_tokens.revoke_token(session=db, jti=jti, expires_at=expires_at)
+
+    assert crud_tokens.is_token_revoked(session=db, jti=jti)
+
+
+def test_is_token_revoked_skips_database_when_filter_is_ready(db: Session) -> None:
+    revoked_jti = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    crud_tokens.revoke_token(session=db, jti=revoked_jti, expires_at=expires_at)
+
+    revocation_list.rebuild(db.get_bind())
+    try:
+        with patch.object(db, "get", wraps=db.get) as get:
+            assert not crud_tokens.is_token_revoked(session=db, jti=uuid.uuid4().hex)
+            assert get.call_count == 0
+
+            assert crud_tokens.is_token_revoked(session=db, jti=revoked_jti)
+            assert get.call_count == 1
+    finally:
+        revocation_list.stop()
+
+
+def test_rebuild_prunes_expired_revocations(db: Session) -> None:
+    jti = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    crud_tokens.revoke_token(session=db, jti=jti, expires_at=expires_at)
+
+    revocation_list.rebuild(db.get_bind())
+    try:
+        assert not crud_tokens.is_token_revoked(session=db, jti=jti)
+    finally:
+        revocation_list.stop()
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10_000))
+    assert false_positives < 300
+
+
+def test_bloom_filter_concurrent_adds() -> None:
+    bloom = BloomFilter(capacity=16_000, error_rate=0.01)
+    batches = [[uuid.uuid4().hex for _ in range(2000)] for _ in range(8)]
+
+    def add_all(items: list[str]) -> None:
+        for item in items:
+            bloom.add(item)
+
+    threads = [threading.Thread(target=add_all, args=(items,)) for items in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(item in bloom for items in batches for item in items)
+
+
+def test_rotate_refresh_token(db: Session) -> None:
+    user = create_random_user(db=db)
+    user.is_active = True
+    db.add(user)
+    token = crud_tokens.issue_refresh_token(session=db, user_id=user.id)
+    db.commit()
+
+    rotated = crud_tokens.rotate_refresh_token(session=db, token=token)
+
+    assert rotated
+    owner, new_token = rotated
+    assert owner.id == user.id
+    assert new_token != token
+    old = crud_tokens.get_refresh_token(session=db, token=token)
+    new = crud_tokens.get_refresh_token(session=db, token=new_token)
+    assert old.used_at is not None
+    assert new.family_id == old.family_id
+    assert new.token_hash != new_token
+
+
+def test_rotate_refresh_token_inactive_user(db: Session) -> None:
+    user = create_random_user(db=db)
+    token = crud_tokens.issue_refresh_token(session=db, user_id=user.id)
+    db.commit()
+
+    assert crud_tokens.rotate_refresh_token(session=db, token=token) is None
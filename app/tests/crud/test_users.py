@@ -1,6 +1,9 @@
 from fastapi.encoders import jsonable_encoder
-from sqlmodel import Session
+from sqlmodel import Session, select
 from app.db.users import User, UserCreate, UserUpdate, UserUpdateMe
+from app.db.credentials import Credentials
+from app.tests.utils.credentials import create_random_credentials
+from app.tests.utils.user import create_random_user
 from app.tests.utils.utils import random_lower_string, random_email
 from app.crud import users as crud_users
 
@@ -23,6 +26,17 @@ def test_create_user(db: Session) -> None:
     assert hasattr(user, "hashed_password")
 
 
+def test_create_user_duplicate_email(db: Session) -> None:
+    user = create_random_user(db=db)
+    user_in = UserCreate(
+        username=random_lower_string(),
+        email=user.email,
+        password=random_lower_string(),
+    )
+
+    assert crud_users.create_user(session=db, user_create=user_in) is None
+
+
 def test_create_admin_user(db: Session) -> None:
     email = random_email()
     password = random_lower_string()
@@ -153,3 +167,68 @@ def test_update_user(db: Session) -> None:
 
     assert user_2.email != original_email
     assert user_2.username != original_username
+
+
+def test_request_user_deletion(db: Session) -> None:
+    user = create_random_user(db=db)
+    token_version = user.token_version
+
+    crud_users.request_user_deletion(session=db, db_user=user)
+
+    db.refresh(user)
+    assert user.deletion_requested_at is not None
+    assert user.is_active is False
+    assert user.token_version == token_version + 1
+
+
+def test_purge_user_in_batches(db: Session) -> None:
+    user = create_random_user(db=db)
+    user_id = user.id
+    for _ in range(5):
+        create_random_credentials(db=db, user_id=user_id)
+    crud_users.request_user_deletion(session=db, db_user=user)
+
+    pending = crud_users.get_pending_deletions(session=db)
+    assert [(pending_user.id, remaining) for pending_user, remaining in pending] == [
+        (user_id, 5)
+    ]
+
+    deleted = crud_users.purge_user(session=db, user_id=user_id, batch_size=2)
+
+    assert deleted == 5
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+    assert (
+        db.exec(select(Credentials).where(Credentials.user_id == user_id)).first()
+        is None
+    )
+
+
+def test_purge_user_keeps_active_user(db: Session) -> None:
+    user = create_random_user(db=db)
+    create_random_credentials(db=db, user_id=user.id)
+
+    deleted = crud_users.purge_user(session=db, user_id=user.id)
+
+    assert deleted == 0
+    assert db.exec(select(User).where(User.id == user.id)).first() is not None
+    assert db.exec(select(Credentials).where(Credentials.user_id == user.id)).first()
+
+
+def test_get_user_by_email_ignores_case(db: Session) -> None:
+    user = create_random_user(db=db)
+
+    found = crud_users.get_user_by_email(session=db, email=user.email.upper())
+
+    assert found is not None
+    assert found.id == user.id
+
+
+def test_create_user_duplicate_email_different_case(db: Session) -> None:
+    user = create_random_user(db=db)
+    user_in = UserCreate(
+        username=random_lower_string(),
+        email=user.email.upper(),
+        password=random_lower_string(),
+    )
+
+    assert crud_users.create_user(session=db, user_create=user_in) is None
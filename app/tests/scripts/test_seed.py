@@ -0,0 +1,80 @@
+import random
+from collections import Counter
+from sqlmodel import Session, func, select
+from app.crud import health as crud_health
+from app.db.credentials import Credentials
+from app.db.health import VaultHealth
+from app.db.users import User
+from app.scripts.seed import generate, make_password_pool, seed_database
+
+SEED_OPTIONS = {
+    "users": 5,
+    "distribution": "uniform",
+    "mean_credentials": 6,
+    "max_credentials": 20,
+    "user_password": "seed-password",
+    "hash_pool_size": 1,
+    "password_pool_size": 4,
+}
+
+
+def test_generate_is_deterministic() -> None:
+    first_users, first_credentials, _ = generate(seed=1, **SEED_OPTIONS)
+    second_users, second_credentials, _ = generate(seed=1, **SEED_OPTIONS)
+    other_users, _, _ = generate(seed=2, **SEED_OPTIONS)
+
+    assert [user["id"] for user in first_users] == [user["id"] for user in second_users]
+    assert [user["id"] for user in first_users] != [user["id"] for user in other_users]
+    assert [
+        (credentials["id"], credentials["url"], credentials["password_fingerprint"])
+        for credentials in first_credentials
+    ] == [
+        (credentials["id"], credentials["url"], credentials["password_fingerprint"])
+        for credentials in second_credentials
+    ]
+
+
+def test_seed_database(db: Session) -> None:
+    users, credentials = seed_database(
+        engine=db.get_bind(), seed=1, batch_size=7, **SEED_OPTIONS
+    )
+
+    seeded = db.exec(select(User).where(User.email.like("seed1-%"))).all()
+    assert len(seeded) == users == 5
+    user_ids = [user.id for user in seeded]
+    count = db.exec(select(func.count()).where(Credentials.user_id.in_(user_ids))).one()
+    assert count == credentials
+
+    # The health rows computed while seeding match a rebuild from the vault
+    for user_id in user_ids:
+        seeded_health = db.get(VaultHealth, user_id).model_dump()
+        rebuilt_health = crud_health.rebuild_vault_health(
+            session=db, user_id=user_id
+        ).model_dump()
+        assert seeded_health == rebuilt_health
+
+
+def test_seed_database_reused_by_plaintext(db: Session) -> None:
+    # Weak pool passwords are drawn from a small space, this pool encrypts one
+    # of them twice and each vault is large enough to pick both entries
+    pool = make_password_pool(random.Random(0), 200)
+    plaintexts = Counter(password.plaintext for password in pool)
+    assert any(count > 1 for count in plaintexts.values())
+
+    seed_database(
+        engine=db.get_bind(),
+        seed=0,
+        users=3,
+        distribution="fixed",
+        mean_credentials=400,
+        max_credentials=400,
+        hash_pool_size=1,
+        password_pool_size=200,
+    )
+
+    for user in db.exec(select(User).where(User.email.like("seed0-%"))).all():
+        seeded_health = db.get(VaultHealth, user.id).model_dump()
+        rebuilt_health = crud_health.rebuild_vault_health(
+            session=db, user_id=user.id
+        ).model_dump()
+        assert seeded_health == rebuilt_health
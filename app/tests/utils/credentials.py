@@ -1,10 +1,18 @@
+import base64
+import json
 from sqlmodel import Session
-from uuid import UUID
+from uuid import UUID, uuid4
 from app.tests.utils.user import create_random_user
 from app.db.credentials import Credentials, CredentialsCreate
 from app.tests.utils.utils import random_lower_string, random_email
 from app.crud import credentials as crud_credentials
 
+# Search cursors that decode to JSON without a numeric rank and a string id
+MALFORMED_CURSORS = [
+    base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+    for value in ([1, 2], [1, {}], [1, [1]], [1, 1.5], ["1", str(uuid4())])
+]
+
 
 def create_random_credentials(db: Session, user_id: UUID = None) -> Credentials:
     owner_id = user_id
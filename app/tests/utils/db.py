@@ -0,0 +1,69 @@
+from sqlalchemy import Engine
+from sqlalchemy.exc import ProgrammingError, OperationalError
+from sqlalchemy.engine.url import make_url
+from sqlmodel import create_engine, text
+
+from app.core.config import settings
+
+
+def get_admin_engine() -> Engine:
+    """Engine on the main database, used to create and drop other databases."""
+    return create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        isolation_level="AUTOCOMMIT",
+        # Add pool settings to ensure connections are properly closed
+        pool_pre_ping=True,
+        pool_recycle=300,
+    )
+
+
+def get_database_name_from_url(database_url: str) -> str:
+    """Extract database name from URL properly."""
+    url = make_url(database_url)
+    return url.database
+
+
+def create_database(admin_engine: Engine, database_url: str) -> None:
+    """Create the database of ``database_url`` if it doesn't exist."""
+    db_name = get_database_name_from_url(database_url)
+
+    with admin_engine.connect() as connection:
+        try:
+            # For PostgreSQL, use proper quoting
+            connection.execute(text(f'CREATE DATABASE "{db_name}"'))
+            print(f"Created test database: {db_name}")
+        except ProgrammingError as e:
+            if "already exists" in str(e).lower():
+                print(f"Database {db_name} already exists, continuing...")
+            else:
+                raise
+        except OperationalError as e:
+            print(f"Database cannot be created: {e}")
+            raise
+
+
+def delete_database(admin_engine: Engine, database_url: str) -> None:
+    """Delete the database of ``database_url`` if it exists."""
+    db_name = get_database_name_from_url(database_url)
+
+    with admin_engine.connect() as connection:
+        try:
+            # Terminate active connections to the test database first
+            connection.execute(
+                text(f"""
+                SELECT pg_terminate_backend(pid)
+                FROM pg_stat_activity
+                WHERE datname = '{db_name}' AND pid <> pg_backend_pid()
+            """)
+            )
+
+            # Now drop the database
+            connection.execute(text(f'DROP DATABASE "{db_name}"'))
+            print(f"Deleted test database: {db_name}")
+        except ProgrammingError as e:
+            if "does not exist" in str(e).lower():
+                print(f"Database {db_name} does not exist, continuing...")
+            else:
+                print(f"Error dropping database: {e}")
+        except OperationalError as e:
+            print(f"Database cannot be deleted: {e}")
@@ -0,0 +1,45 @@
+from collections.abc import Iterator
+from typing import Any
+
+from sqlmodel import Session
+
+# Planner methods turned off to price the plan a query would fall back to
+# without its indexes
+INDEX_SCANS = ("indexscan", "indexonlyscan", "bitmapscan")
+
+
+def explain(
+    db: Session, statement: str, parameters: Any, disable: tuple[str, ...] = ()
+) -> dict[str, Any]:
+    """The root node of the ``EXPLAIN (FORMAT JSON)`` plan of ``statement``,
+    planned with the ``enable_<method>`` settings in ``disable`` off."""
+    cursor = db.connection().connection.cursor()
+    try:
+        for method in disable:
+            cursor.execute(f"SET enable_{method} = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        return cursor.fetchone()[0][0]["Plan"]
+    finally:
+        for method in disable:
+            cursor.execute(f"RESET enable_{method}")
+        cursor.close()
+
+
+def plan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Every node of ``plan``, depth first."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def format_plan(plan: dict[str, Any], depth: int = 0) -> str:
+    """Indented outline of ``plan`` for assertion messages."""
+    line = "  " * depth + plan["Node Type"]
+    if "Index Name" in plan:
+        line += f" using {plan['Index Name']}"
+    if "Relation Name" in plan:
+        line += f" on {plan['Relation Name']}"
+    line += f" (cost={plan['Total Cost']})"
+    return "\n".join(
+        [line] + [format_plan(child, depth + 1) for child in plan.get("Plans", [])]
+    )
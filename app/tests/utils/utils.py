@@ -1,7 +1,11 @@
 import string
 import random
+from collections.abc import Iterator
+from contextlib import contextmanager
 
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
 
 from app.core.config import settings
 
@@ -27,3 +31,20 @@ def get_superuser_token_headers(client: TestClient) -> dict[str, str]:
     a_token = tokens["access_token"]
     headers = {"Authorization": f"Bearer {a_token}"}
     return headers
+
+
+@contextmanager
+def record_statements(db: Session, with_parameters: bool = False) -> Iterator[list]:
+    """Collect the SQL statements executed through the engine of ``db``, as
+    ``(statement, parameters)`` tuples with ``with_parameters``."""
+    statements: list = []
+    engine = db.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args) -> None:
+        statements.append((statement, parameters) if with_parameters else statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
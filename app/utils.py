@@ -1,7 +1,9 @@
 import logging
 from app.core.config import settings
+from app.core.metrics import email_queue_depth, emails_sent_total
+from app.core.tracing import SPAN_KIND_CLIENT, span
 from typing import Any
-from fastapi import Form
+from fastapi import BackgroundTasks, Form
 from fastapi.security import OAuth2PasswordRequestForm
 from dataclasses import dataclass
 from pathlib import Path
@@ -9,6 +11,9 @@ from jinja2 import Template
 from jose import jwt
 from jose.exceptions import JWTError
 import emails
+import base64
+import json
+import uuid
 from datetime import timedelta, timezone, datetime
 
 logging.basicConfig(level=logging.INFO)
@@ -44,11 +49,12 @@ class EmailData:
 
 
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_string = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_string).render(**context)
-    return html_content
+    with span("render_email_template", template=template_name):
+        template_string = (
+            Path(__file__).parent / "email-templates" / "build" / template_name
+        ).read_text()
+        html_content = Template(template_string).render(**context)
+        return html_content
 
 
 def send_email(*, email_to: str, subject: str = "", html_content: str = "") -> None:
@@ -70,10 +76,40 @@ def send_email(*, email_to: str, subject: str = "", html_content: str = "") -> N
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
 
-    response = message.send(to=email_to, smtp=smtp_options)
+    with span("smtp.send", SPAN_KIND_CLIENT, **{"server.address": settings.SMTP_HOST}):
+        response = message.send(to=email_to, smtp=smtp_options)
     logger.info(f"send email result: {response}")
 
 
+def queue_email(
+    background_tasks: BackgroundTasks,
+    *,
+    email_to: str,
+    subject: str = "",
+    html_content: str = "",
+) -> None:
+    """Send an email after the response, tracked by the email_queue_depth gauge."""
+    email_queue_depth.inc()
+    background_tasks.add_task(
+        _send_queued_email,
+        email_to=email_to,
+        subject=subject,
+        html_content=html_content,
+    )
+
+
+def _send_queued_email(**kwargs: Any) -> None:
+    try:
+        send_email(**kwargs)
+    except Exception:
+        emails_sent_total.inc(("error",))
+        raise
+    else:
+        emails_sent_total.inc(("success",))
+    finally:
+        email_queue_depth.dec()
+
+
 def _generate_email(
     *,
     email_to: str,
@@ -153,3 +189,26 @@ def verify_reset_token(*, token: str) -> str | None:
         return decoded_jwt["sub"]
     except JWTError:
         return None
+
+
+def encode_search_cursor(*, rank: float, id: uuid.UUID) -> str:
+    data = json.dumps([rank, str(id)]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID] | None:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+    if not isinstance(data, list) or len(data) != 2:
+        return None
+    rank, id = data
+    if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+        return None
+    if not isinstance(id, str):
+        return None
+    try:
+        return float(rank), uuid.UUID(id)
+    except ValueError:
+        return None
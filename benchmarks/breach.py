@@ -0,0 +1,62 @@
+"""Lookup throughput of the memory-mapped breach index.
+
+Builds an index of random digests in a temporary directory and measures
+lookups of known and unknown passwords.
+Run with ``python -m benchmarks.breach [--digests N] [--lookups N]``.
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from app.core.breach import BreachIndex
+from app.scripts.build_breach_index import build_index
+
+
+def write_source(path: str, passwords: list[str], digests: int) -> None:
+    with open(path, "w") as source:
+        for password in passwords:
+            source.write(f"{hashlib.sha1(password.encode()).hexdigest().upper()}:1\n")
+        for _ in range(digests - len(passwords)):
+            source.write(f"{os.urandom(20).hex().upper()}:1\n")
+
+
+def measure(index: BreachIndex, passwords: list[str], lookups: int) -> float:
+    """Return lookups per second."""
+    start = time.perf_counter()
+    for i in range(lookups):
+        passwords[i % len(passwords)] in index
+    return lookups / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--digests", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    known = [f"password{i}" for i in range(1000)]
+    unknown = [f"not-breached-{i}" for i in range(1000)]
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.txt")
+        destination = os.path.join(directory, "breach.idx")
+        write_source(source, known, args.digests)
+
+        start = time.perf_counter()
+        build_index(source, destination)
+        build_seconds = time.perf_counter() - start
+
+        index = BreachIndex(destination)
+        hits = measure(index, known, args.lookups)
+        misses = measure(index, unknown, args.lookups)
+        index.close()
+
+    print(f"digests: {args.digests}, lookups: {args.lookups}")
+    print(f"build:   {build_seconds:10.2f} s")
+    print(f"hits:    {hits:10,.0f} lookups/s")
+    print(f"misses:  {misses:10,.0f} lookups/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+"""End-to-end load test of the API served by uvicorn against a local Postgres.
+
+A dedicated database next to the test database is created and seeded the way
+the test suite does it (app.tests.utils.db), the app is started under
+uvicorn on it, and virtual users send a weighted mix of login, list, detail,
+show-password, create and admin requests. Concurrency is ramped through the
+given stages; throughput and p50/p95/p99 latency are reported per route id,
+and the stage after which throughput stops growing is reported as the knee.
+
+    python -m benchmarks.load --stages 1,2,4,8,16,32 --duration 20
+    python -m benchmarks.load --workers 4 --env DB_POOL_SIZE=20
+    python -m benchmarks.load --url http://localhost:8000 --email ... --password ...
+
+Settings are passed to the server with --env, so runs with different pool
+sizes, cache sizes or worker counts can be compared; --url drives a server
+started separately instead, e.g. another stack.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+import httpx
+from sqlalchemy.engine.url import make_url
+from sqlmodel import Session, SQLModel, create_engine
+from app.core.config import settings
+from app.core.db import init_db
+from app.crud import credentials as crud_credentials
+from app.crud import users as crud_users
+from app.db.credentials import CredentialsCreate
+from app.db.users import UserCreate
+import app.main  # noqa: F401 - registers every table on the metadata
+from app.tests.utils.db import create_database, delete_database, get_admin_engine
+
+API = settings.API_V1_STR
+LOAD_USER_PASSWORD = "load-test-password"
+
+# Relative weight of each action in the traffic mix
+DEFAULT_MIX = {
+    "login": 5,
+    "list": 30,
+    "detail": 25,
+    "show_password": 15,
+    "create": 10,
+    "admin": 5,
+}
+
+# Route id reported for each action, as in the /metrics labels
+ROUTE_IDS = {
+    "login": "login-login_access_token",
+    "list": "credentials-read_credentials",
+    "detail": "credentials-read_credential",
+    "show_password": "credentials-show_password",
+    "create": "credentials-create_credential",
+    "admin": "admin:users-read_users",
+}
+
+
+@dataclass
+class Account:
+    email: str
+    password: str
+    headers: dict[str, str] = field(default_factory=dict)
+    credential_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Sample:
+    route: str
+    latency: float
+    status: int
+
+
+def load_database_url() -> str:
+    url = make_url(str(settings.SQLALCHEMY_TEST_DATABASE_URI))
+    return url.set(database=f"{url.database}_load").render_as_string(
+        hide_password=False
+    )
+
+
+def seed_database(database_url: str, users: int, credentials: int) -> list[Account]:
+    """Create the schema, the first superuser and ``users`` users owning
+    ``credentials`` credentials each."""
+    create_database(get_admin_engine(), database_url)
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(bind=engine)
+    accounts = []
+    with Session(engine, expire_on_commit=False) as session:
+        init_db(session=session)
+        for i in range(users):
+            email = f"load{i}@example.com"
+            user = crud_users.get_user_by_email(session=session, email=email)
+            if user is None:
+                user = crud_users.create_user(
+                    session=session,
+                    user_create=UserCreate(
+                        username=f"load{i}",
+                        email=email,
+                        password=LOAD_USER_PASSWORD,
+                        is_active=True,
+                    ),
+                )
+                for j in range(credentials):
+                    crud_credentials.create_credentials(
+                        session=session,
+                        credentials_create=CredentialsCreate(
+                            title=f"Credential {j}",
+                            url=f"https://login.site{j}.example.com",
+                            username=email,
+                            password=f"password-{i}-{j}",
+                        ),
+                        user_id=user.id,
+                    )
+            accounts.append(Account(email=email, password=LOAD_USER_PASSWORD))
+    engine.dispose()
+    return accounts
+
+
+def start_server(
+    database_url: str, port: int, workers: int, env: dict[str, str]
+) -> subprocess.Popen:
+    url = make_url(database_url)
+    server_env = {
+        **os.environ,
+        "POSTGRES_SERVER": url.host or "localhost",
+        "POSTGRES_PORT": str(url.port or 5432),
+        "POSTGRES_USER": url.username or "",
+        "POSTGRES_PASSWORD": url.password or "",
+        "POSTGRES_DB": url.database or "",
+        # Every virtual user logs in from the same address
+        "RATE_LIMIT_ENABLED": "false",
+        **env,
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=server_env,
+    )
+
+
+def wait_for_server(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}{API}/openapi.json").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start in {timeout}s")
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        account: Account,
+        admin: Account,
+        samples: list[Sample],
+    ) -> None:
+        self.client = client
+        self.account = account
+        self.admin = admin
+        self.samples = samples
+
+    async def request(self, action: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.TransportError:
+            response, status = None, 0
+        self.samples.append(
+            Sample(ROUTE_IDS[action], time.perf_counter() - start, status)
+        )
+        return response
+
+    async def login(self, account: Account | None = None) -> None:
+        account = account or self.account
+        response = await self.request(
+            "login",
+            "POST",
+            f"{API}/login/access-token",
+            data={"username": account.email, "password": account.password},
+        )
+        if response is not None and response.status_code == 200:
+            token = response.json()["access_token"]
+            account.headers = {"Authorization": f"Bearer {token}"}
+
+    async def list(self) -> None:
+        response = await self.request(
+            "list",
+            "GET",
+            f"{API}/credentials/",
+            params={"limit": 50},
+            headers=self.account.headers,
+        )
+        if response is not None and response.status_code == 200:
+            self.account.credential_ids = [c["id"] for c in response.json()["data"]]
+
+    def credential_id(self) -> str | None:
+        ids = self.account.credential_ids
+        return random.choice(ids) if ids else None
+
+    async def detail(self) -> None:
+        if credential_id := self.credential_id():
+            await self.request(
+                "detail",
+                "GET",
+                f"{API}/credentials/{credential_id}",
+                headers=self.account.headers,
+            )
+        else:
+            await self.list()
+
+    async def show_password(self) -> None:
+        if credential_id := self.credential_id():
+            await self.request(
+                "show_password",
+                "GET",
+                f"{API}/credentials/{credential_id}/show-password",
+                headers=self.account.headers,
+            )
+        else:
+            await self.list()
+
+    async def create(self) -> None:
+        suffix = random.getrandbits(32)
+        await self.request(
+            "create",
+            "POST",
+            f"{API}/credentials/",
+            json={
+                "title": f"Load {suffix}",
+                "url": f"https://load{suffix}.example.com",
+                "username": self.account.email,
+                "password": f"load-password-{suffix}",
+            },
+            headers=self.account.headers,
+        )
+
+    async def admin_list(self) -> None:
+        await self.request(
+            "admin",
+            "GET",
+            f"{API}/admin/users/",
+            params={"limit": 50},
+            headers=self.admin.headers,
+        )
+
+    async def run(self, mix: dict[str, int], deadline: float) -> None:
+        actions = {
+            "login": self.login,
+            "list": self.list,
+            "detail": self.detail,
+            "show_password": self.show_password,
+            "create": self.create,
+            "admin": self.admin_list,
+        }
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.monotonic() < deadline:
+            action = random.choices(names, weights)[0]
+            await actions[action]()
+
+
+async def run_stage(
+    base_url: str,
+    accounts: list[Account],
+    admin: Account,
+    mix: dict[str, int],
+    concurrency: int,
+    duration: float,
+) -> dict:
+    samples: list[Sample] = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        users = [
+            VirtualUser(client, accounts[i % len(accounts)], admin, samples)
+            for i in range(concurrency)
+        ]
+        # Logins of the ramp up are not part of the measured window
+        for account in {id(user.account): user.account for user in users}.values():
+            if not account.headers:
+                await users[0].login(account)
+        if not admin.headers:
+            await users[0].login(admin)
+        samples.clear()
+
+        start = time.monotonic()
+        await asyncio.gather(*(user.run(mix, start + duration) for user in users))
+        elapsed = time.monotonic() - start
+    return summarize(samples, concurrency, elapsed)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, round(p / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarize(samples: list[Sample], concurrency: int, elapsed: float) -> dict:
+    by_route: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_route[sample.route].append(sample)
+
+    routes = {}
+    for route, route_samples in sorted(by_route.items()):
+        latencies = sorted(sample.latency * 1000 for sample in route_samples)
+        routes[route] = {
+            "requests": len(route_samples),
+            "errors": sum(1 for s in route_samples if not 200 <= s.status < 300),
+            "throughput": len(route_samples) / elapsed,
+            "mean_ms": statistics.fmean(latencies),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+    latencies = sorted(sample.latency * 1000 for sample in samples)
+    return {
+        "concurrency": concurrency,
+        "duration": elapsed,
+        "requests": len(samples),
+        "errors": sum(route["errors"] for route in routes.values()),
+        "throughput": len(samples) / elapsed,
+        "p50_ms": percentile(latencies, 50) if latencies else None,
+        "p95_ms": percentile(latencies, 95) if latencies else None,
+        "p99_ms": percentile(latencies, 99) if latencies else None,
+        "routes": routes,
+    }
+
+
+def find_knee(stages: list[dict], min_gain: float = 0.1) -> int | None:
+    """Concurrency of the last stage before throughput grew by less than
+    ``min_gain``: more clients past it only add latency."""
+    for previous, stage in zip(stages, stages[1:]):
+        if stage["throughput"] < previous["throughput"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+
+def print_stage(stage: dict) -> None:
+    print(
+        f"\nconcurrency {stage['concurrency']}: {stage['throughput']:.1f} req/s, "
+        f"{stage['requests']} requests, {stage['errors']} errors, "
+        f"p50 {stage['p50_ms']:.1f} ms, p95 {stage['p95_ms']:.1f} ms, "
+        f"p99 {stage['p99_ms']:.1f} ms"
+    )
+    print(
+        f"  {'route':32} {'req/s':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for route, result in stage["routes"].items():
+        print(
+            f"  {route:32} {result['throughput']:8.1f} {result['errors']:7d} "
+            f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}"
+        )
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--stages",
+        default="1,2,4,8,16,32",
+        help="comma separated concurrency levels to ramp through",
+    )
+    parser.add_argument("--duration", type=float, default=20, help="seconds per stage")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="action weights to override, e.g. login=0,create=20",
+    )
+    parser.add_argument("--users", type=int, default=20, help="seeded users")
+    parser.add_argument(
+        "--credentials", type=int, default=100, help="credentials per seeded user"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="setting passed to the server, e.g. DB_POOL_SIZE=20",
+    )
+    parser.add_argument("--url", help="load an already running server instead")
+    parser.add_argument("--email", help="user to log in as with --url")
+    parser.add_argument("--password", help="password of --email")
+    parser.add_argument(
+        "--keep-database", action="store_true", help="do not drop the load database"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    admin = Account(
+        email=settings.FIRST_SUPERUSER_EMAIL,
+        password=settings.FIRST_SUPERUSER_PASSWORD,
+    )
+    server = None
+    database_url = load_database_url()
+    if args.url:
+        if not args.email or not args.password:
+            parser.error("--url requires --email and --password")
+        base_url = args.url.rstrip("/")
+        accounts = [Account(email=args.email, password=args.password)]
+    else:
+        print(f"Seeding {args.users} users with {args.credentials} credentials each")
+        accounts = seed_database(database_url, args.users, args.credentials)
+        env = dict(item.split("=", 1) for item in args.env)
+        server = start_server(database_url, args.port, args.workers, env)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    stages = []
+    try:
+        wait_for_server(base_url)
+        for concurrency in (int(level) for level in args.stages.split(",")):
+            stage = asyncio.run(
+                run_stage(
+                    base_url, accounts, admin, args.mix, concurrency, args.duration
+                )
+            )
+            print_stage(stage)
+            stages.append(stage)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            if not args.keep_database:
+                delete_database(get_admin_engine(), database_url)
+
+    knee = find_knee(stages)
+    if knee is not None:
+        print(f"\nKnee: throughput stops growing past concurrency {knee}")
+    if args.output:
+        result = {
+            "workers": args.workers,
+            "env": args.env,
+            "mix": args.mix,
+            "stages": stages,
+            "knee": knee,
+        }
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Microbenchmarks of the security primitives and response serialization.
+
+Results can be saved as a JSON baseline and compared against one, so a
+change that slows a primitive down shows up in review:
+
+    python -m benchmarks.suite --output benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+
+Timings only compare on the same machine; regenerate the baseline on the base
+branch before comparing on another one. ``--filter`` runs the benchmarks
+whose name contains the given text.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import pyotp
+from pydantic import TypeAdapter
+from app.api.dependencies import decode_token_payload
+from app.core.security import (
+    create_access_token,
+    decrypt_credential_password,
+    get_credential_password_hash,
+    get_password_hash,
+    verify_password,
+)
+from app.crud.users import create_totp_qr
+from app.db.credentials import Credentials, CredentialsPublic
+from app.db.users import User
+from app.utils import render_email_template
+
+PASSWORD = "correct horse battery staple"
+SERIALIZATION_SIZES = (100, 1_000, 10_000)
+
+# Setup functions by benchmark name, each returns the callable to time
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@benchmark("bcrypt.hash")
+def bench_password_hash() -> Callable[[], object]:
+    return lambda: get_password_hash(PASSWORD)
+
+
+@benchmark("bcrypt.verify")
+def bench_verify_password() -> Callable[[], object]:
+    hashed_password = get_password_hash(PASSWORD)
+    return lambda: verify_password(PASSWORD, hashed_password)
+
+
+@benchmark("fernet.encrypt")
+def bench_credential_password_hash() -> Callable[[], object]:
+    return lambda: get_credential_password_hash(PASSWORD)
+
+
+@benchmark("fernet.decrypt")
+def bench_decrypt_credential_password() -> Callable[[], object]:
+    hashed_password = get_credential_password_hash(PASSWORD)
+    return lambda: decrypt_credential_password(hashed_password)
+
+
+def make_access_token() -> str:
+    return create_access_token(
+        subject=uuid.uuid4(),
+        expires_delta=timedelta(minutes=15),
+        is_superuser=False,
+        is_active=True,
+        token_version=0,
+    )
+
+
+@benchmark("jwt.encode")
+def bench_create_access_token() -> Callable[[], object]:
+    return make_access_token
+
+
+@benchmark("jwt.decode")
+def bench_decode_token_payload() -> Callable[[], object]:
+    token = make_access_token()
+    return lambda: decode_token_payload(token)
+
+
+@benchmark("totp.qr")
+def bench_create_totp_qr() -> Callable[[], object]:
+    user = User(
+        username="benchmark",
+        email="benchmark@example.com",
+        hashed_password="",
+        otp_secret=pyotp.random_base32(),
+    )
+    return lambda: create_totp_qr(user=user, issuer_name="Benchmark")
+
+
+@benchmark("email.render")
+def bench_render_email_template() -> Callable[[], object]:
+    context = {
+        "project_name": "Benchmark",
+        "username": "benchmark@example.com",
+        "email": "benchmark@example.com",
+        "valid_hours": 48,
+        "link": "https://example.com/reset-password?token=token",
+    }
+    try:
+        render_email_template(template_name="reset_password.html", context=context)
+    except FileNotFoundError:
+        raise SkipBenchmark("email templates are not built")
+    return lambda: render_email_template(
+        template_name="reset_password.html", context=context
+    )
+
+
+def make_credentials(count: int) -> list[Credentials]:
+    user_id = uuid.uuid4()
+    return [
+        Credentials(
+            user_id=user_id,
+            title=f"Credential {i}",
+            url=f"https://login{i}.example.com",
+            username=f"user{i}@example.com",
+            hashed_password="",
+        )
+        for i in range(count)
+    ]
+
+
+def serialize_credentials(count: int) -> Callable[[], Callable[[], object]]:
+    def setup() -> Callable[[], object]:
+        credentials = make_credentials(count)
+        adapter = TypeAdapter(CredentialsPublic)
+
+        # What the list route does: build the response model from table rows,
+        # FastAPI validates it against response_model and serializes it
+        def run() -> bytes:
+            response = CredentialsPublic(count=count, data=credentials)
+            return adapter.dump_json(
+                adapter.validate_python(response, from_attributes=True)
+            )
+
+        return run
+
+    return setup
+
+
+for size in SERIALIZATION_SIZES:
+    benchmark(f"serialize.credentials[{size}]")(serialize_credentials(size))
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """Time ``func`` ``repeat`` times over enough loops to last ``min_time``
+    seconds each; per call timings are in microseconds."""
+    timer = timeit.Timer(func)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(1, int(loops * min_time / elapsed))
+    timings = [t / loops * 1_000_000 for t in timer.repeat(repeat, loops)]
+    return {
+        "median_us": statistics.median(timings),
+        "min_us": min(timings),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run(names: list[str], repeat: int, min_time: float) -> dict:
+    results = {}
+    for name in names:
+        try:
+            func = BENCHMARKS[name]()
+        except SkipBenchmark as e:
+            print(f"{name:32} skipped: {e}")
+            continue
+        results[name] = measure(func, repeat, min_time)
+        print(f"{name:32} {format_time(results[name]['median_us'])}")
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print the change of every benchmark in both runs and return the names
+    of the ones whose median is more than ``threshold`` slower."""
+    regressions = []
+    print()
+    print(f"{'benchmark':32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:32} {'-':>12} {format_time(result['median_us'])}")
+            continue
+        ratio = result["median_us"] / before["median_us"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:32} {format_time(before['median_us'])} "
+            f"{format_time(result['median_us'])} {ratio - 1:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def format_time(microseconds: float) -> str:
+    if microseconds >= 1000:
+        return f"{microseconds / 1000:9.2f} ms"
+    return f"{microseconds:9.2f} us"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run matching benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="minimum duration of each repeat in seconds",
+    )
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slowdown reported as a regression, 0.2 is 20%%",
+    )
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    current = run(names, args.repeat, args.min_time)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2) + "\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()